@@ -7,16 +7,18 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Sum, Count
+from django.db.models import Sum, Count
 from django.utils import timezone
 from datetime import datetime, timedelta
-from decimal import Decimal
 
 from subscription.decorators import subscription_required, contract_required
 from .decorators import chatbot_required
+from core.activity import activity_totals
+from core.timeseries import next_month
 from doctors.models import Doctor, DoctorPayment
+from doctors.services.ledger import balance_at, month_end
+from doctors.services.search import filter_by_doctor_search, search_doctor_ids
 from prescriptions.models import Prescription, PrescriptionItem
-from sales.models import Sale, SaleItem
 
 # Import archived report models if they exist
 try:
@@ -140,18 +142,26 @@ def handle_doctor_debt_query(request, parameters):
     doctor_name = parameters.get('doctor_name', '').strip()
     month = parameters.get('month')
     year = parameters.get('year')
+    balance_date = parameters.get('date')  # YYYY-MM-DD, jurnal üzrə qalıq
     
     if not doctor_name:
         return JsonResponse({
             'success': False,
             'error': 'doctor_name parameter is required'
         }, status=400)
+
+    if balance_date:
+        try:
+            balance_date = datetime.strptime(str(balance_date), '%Y-%m-%d').date()
+        except ValueError:
+            return JsonResponse({
+                'success': False,
+                'error': 'date must be in YYYY-MM-DD format'
+            }, status=400)
     
     try:
         # Search for doctor by name (partial match)
-        doctors = Doctor.objects.filter(
-            Q(ad__icontains=doctor_name) | Q(code__icontains=doctor_name)
-        )
+        doctors = filter_by_doctor_search(Doctor.objects.all(), doctor_name)
         
         if not doctors.exists():
             return JsonResponse({
@@ -215,14 +225,32 @@ def handle_doctor_debt_query(request, parameters):
                     'final_debt': float(archived_entry.yekun_borc) if archived_entry.yekun_borc else 0.0,
                     'calculated_amount': float(archived_entry.hesablanan) if archived_entry.hesablanan else 0.0,
                     'previous_debt': float(archived_entry.evvelki_borc) if archived_entry.evvelki_borc else 0.0,
+                    'drugs': {
+                        item.drug.ad: item.quantity
+                        for item in archived_entry.items.select_related('drug')
+                    },
                 }
             except MonthlyDoctorReport.DoesNotExist:
                 result['archived_month'] = None
                 result['message'] = f'{year} ilinin {month} ayı hələ arxivləşdirilməyib.'
+                # Arxivləşdirilməyib - ay sonuna jurnal qalığı
+                try:
+                    result['ledger_month_end'] = float(balance_at(doctor.id, month_end(int(year), int(month))))
+                except (TypeError, ValueError):
+                    pass
+
+        if balance_date:
+            result['balance_at_date'] = {
+                'date': balance_date.strftime('%Y-%m-%d'),
+                'balance': float(balance_at(doctor.id, balance_date)),
+            }
         
         # Format response message
         debt_amount = result['doctor']['current_debt']
-        if month and year and result.get('archived_month'):
+        if balance_date:
+            debt_amount = result['balance_at_date']['balance']
+            result['message'] = f'{doctor.ad} həkiminin {balance_date:%d.%m.%Y} tarixinə borcu: {debt_amount:.2f} ₼'
+        elif month and year and result.get('archived_month'):
             debt_amount = result['archived_month']['final_debt']
             result['message'] = f'{doctor.ad} həkiminin {year} ilinin {month} ayındakı yekun borcu: {debt_amount:.2f} ₼'
         else:
@@ -252,7 +280,7 @@ def handle_doctor_info_query(request, parameters):
     
     try:
         doctor = Doctor.objects.filter(
-            Q(ad__icontains=doctor_name) | Q(code__icontains=doctor_name)
+            id__in=search_doctor_ids(doctor_name, limit=1)
         ).select_related('region', 'city', 'clinic', 'ixtisas').first()
         
         if not doctor:
@@ -264,8 +292,8 @@ def handle_doctor_info_query(request, parameters):
                 }
             })
         
-        # Get prescription count
-        prescription_count = Prescription.objects.filter(doctor=doctor).count()
+        # Stored KPI (doctors.services.stats)
+        prescription_count = doctor.prescription_count
         
         # Get recent payments
         recent_payments = DoctorPayment.objects.filter(
@@ -314,6 +342,14 @@ def handle_doctor_info_query(request, parameters):
         }, status=500)
 
 
+def _month_bounds(year, month):
+    """(start, end) of the month for activity_totals, (None, None) for all time"""
+    if not (month and year):
+        return None, None
+    start = datetime(int(year), int(month), 1).date()
+    return start, next_month(start)
+
+
 def handle_prescription_count_query(request, parameters):
     """Get prescription count for a doctor or period"""
     doctor_name = parameters.get('doctor_name', '').strip()
@@ -324,9 +360,7 @@ def handle_prescription_count_query(request, parameters):
         query = Prescription.objects.all()
         
         if doctor_name:
-            doctor = Doctor.objects.filter(
-                Q(ad__icontains=doctor_name) | Q(code__icontains=doctor_name)
-            ).first()
+            doctor = Doctor.objects.filter(id__in=search_doctor_ids(doctor_name, limit=1)).first()
             if doctor:
                 query = query.filter(doctor=doctor)
             else:
@@ -341,7 +375,11 @@ def handle_prescription_count_query(request, parameters):
         if month and year:
             query = query.filter(date__year=year, date__month=month)
         
-        count = query.count()
+        if doctor_name:
+            count = query.count()
+        else:
+            # Tenant-wide counts come from the per-day rollup
+            count = activity_totals(*_month_bounds(year, month))['prescription_count']
         
         message = f'Ümumi qeydiyyat sayı: {count}'
         if doctor_name and month and year:
@@ -409,7 +447,7 @@ def handle_monthly_report_query(request, parameters):
         )
         
         doctors_with_prescriptions = prescriptions.values('doctor').distinct().count()
-        total_prescriptions = prescriptions.count()
+        total_prescriptions = activity_totals(*_month_bounds(year, month))['prescription_count']
         
         # Calculate total debt from current doctor data
         total_debt = sum(
@@ -446,9 +484,7 @@ def handle_doctor_list_query(request, parameters):
         query = Doctor.objects.all()
         
         if search_term:
-            query = query.filter(
-                Q(ad__icontains=search_term) | Q(code__icontains=search_term)
-            )
+            query = filter_by_doctor_search(query, search_term)
         
         doctors = query.select_related('region', 'ixtisas')[:limit]
         
@@ -491,9 +527,7 @@ def handle_recent_prescriptions_query(request, parameters):
         query = Prescription.objects.select_related('doctor', 'region').order_by('-date')
         
         if doctor_name:
-            doctor = Doctor.objects.filter(
-                Q(ad__icontains=doctor_name) | Q(code__icontains=doctor_name)
-            ).first()
+            doctor = Doctor.objects.filter(id__in=search_doctor_ids(doctor_name, limit=1)).first()
             if doctor:
                 query = query.filter(doctor=doctor)
         
@@ -533,27 +567,9 @@ def handle_sales_summary_query(request, parameters):
     year = parameters.get('year')
     
     try:
-        query = Sale.objects.all()
-        
-        if month and year:
-            query = query.filter(date__year=year, date__month=month)
-        
-        total_sales = query.count()
-        
-        # Calculate total revenue
-        total_revenue = Decimal('0.00')
-        for sale in query:
-            try:
-                # Calculate from sale items
-                sale_items = SaleItem.objects.filter(sale=sale)
-                sale_total = sum(
-                    float(item.quantity * item.unit_price) 
-                    for item in sale_items 
-                    if item.quantity and item.unit_price
-                )
-                total_revenue += Decimal(str(sale_total))
-            except Exception:
-                continue
+        totals = activity_totals(*_month_bounds(year, month))
+        total_sales = totals['sales_count']
+        total_revenue = totals['revenue']
         
         message = f'Ümumi satış sayı: {total_sales}, Ümumi gəlir: {float(total_revenue):.2f} ₼'
         if month and year:
@@ -0,0 +1,191 @@
+"""
+Günlük fəaliyyət yekunları (core.models.DailyActivity)
+- One row per day for the whole tenant (region empty) plus one row per day
+  and region, so a series over any window reads at most one row per day
+- Write paths call refresh_daily_activity(dates) after changing prescriptions
+  or sales: the touched days are rebuilt from the stored header totals
+  (core.totals) with two grouped queries, however many rows changed.
+  Inside a transaction the days are collected and rebuilt once, on commit,
+  so a prescription or sale with many items rebuilds its day only once
+- Rebuilds of the same day are serialized (per-day advisory locks on
+  PostgreSQL, the database write lock on SQLite) and read the totals only
+  once they hold the lock, so concurrent writes on "today" neither
+  collide on the unique constraints nor store stale totals
+- Every rebuild invalidates the tenant's cached dashboard widgets that
+  read the rollup (core.dashboard_cache)
+- rebuild_daily_activity rebuilds a date range (backfill / repair)
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import Count, Min, Max, Sum
+
+from core.dashboard_cache import bump_dashboard_version
+from core.models import DailyActivity
+from prescriptions.models import Prescription
+from sales.models import Sale
+
+
+ACTIVITY_FIELDS = ('prescription_count', 'prescription_quantity', 'sales_count', 'units_sold', 'revenue')
+
+REBUILD_CHUNK_DAYS = 92
+
+# First key of the (key, day) advisory locks taken on PostgreSQL
+ACTIVITY_LOCK_KEY = 4601
+
+ZERO = Decimal('0.00')
+
+
+def _as_amount(value):
+    return Decimal(value or 0).quantize(ZERO)
+
+
+def _empty_totals():
+    return {'prescription_count': 0, 'prescription_quantity': 0, 'sales_count': 0, 'units_sold': 0, 'revenue': ZERO}
+
+
+def _grouped(queryset, **aggregates):
+    return queryset.order_by().values('date', 'region_id').annotate(**aggregates)
+
+
+def _activity_rows(activity_model, prescriptions, sales):
+    """Unsaved activity rows (tenant total + per region) for the two querysets"""
+    totals = {}
+
+    def add(row, values):
+        keys = [(row['date'], None)]
+        if row['region_id']:
+            keys.append((row['date'], row['region_id']))
+        for key in keys:
+            day = totals.setdefault(key, _empty_totals())
+            for field, value in values.items():
+                day[field] += value or 0
+
+    for row in _grouped(prescriptions, count=Count('pk'), quantity=Sum('total_quantity')):
+        add(row, {'prescription_count': row['count'], 'prescription_quantity': row['quantity']})
+    for row in _grouped(sales, count=Count('pk'), quantity=Sum('total_quantity'), amount=Sum('total_amount')):
+        add(row, {'sales_count': row['count'], 'units_sold': row['quantity'], 'revenue': _as_amount(row['amount'])})
+
+    return [
+        activity_model(date=day, region_id=region_id, **values)
+        for (day, region_id), values in sorted(totals.items(), key=lambda item: (item[0][0], item[0][1] or 0))
+    ]
+
+
+def _lock_days(using, days):
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        # SQLite: the DELETE in _replace_days takes the database write lock before any read
+        return
+    with connection.cursor() as cursor:
+        # Sorted, so two rebuilds sharing days cannot deadlock
+        for day in sorted(days):
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [ACTIVITY_LOCK_KEY, day.toordinal()])
+
+
+def _replace_days(activity_model, prescription_model, sale_model, days, using=None, **day_filter):
+    """Rebuild the activity rows of days (day_filter selects the same days)"""
+    using = using or router.db_for_write(activity_model)
+    with transaction.atomic(using=using):
+        _lock_days(using, days)
+        activity_model.objects.using(using).filter(**day_filter).delete()
+        # Read under the lock, so rows committed by a rebuild we waited for are counted
+        rows = _activity_rows(
+            activity_model,
+            prescription_model.objects.using(using).filter(**day_filter),
+            sale_model.objects.using(using).filter(**day_filter),
+        )
+        activity_model.objects.using(using).bulk_create(rows, batch_size=500)
+    bump_dashboard_version('activity', using)
+    return len(rows)
+
+
+class _PendingRebuild:
+    """on_commit callback rebuilding the days collected in one transaction"""
+
+    def __init__(self, using):
+        self.using = using
+        self.days = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        _replace_days(DailyActivity, Prescription, Sale, self.days, using=self.using, date__in=list(self.days))
+
+
+def refresh_daily_activity(dates):
+    """
+    Rebuild the activity rows of the given days (None values are ignored)
+    once the tenant transaction commits; at once outside a transaction.
+    A failed rebuild is logged, not raised (the writes are already
+    committed) - rebuild_daily_activity repairs the days.
+    """
+    dates = {day for day in dates if day}
+    if not dates:
+        return
+    using = router.db_for_write(DailyActivity)
+    connection = transaction.get_connection(using)
+    if connection.in_atomic_block:
+        for _, callback, _ in connection.run_on_commit:
+            if isinstance(callback, _PendingRebuild) and not callback.done:
+                callback.days.update(dates)
+                return
+    pending = _PendingRebuild(using)
+    pending.days.update(dates)
+    transaction.on_commit(pending, using=using, robust=True)
+
+
+def rebuild_daily_activity(start=None, end=None, chunk_days=REBUILD_CHUNK_DAYS, using=None,
+                           activity_model=DailyActivity, prescription_model=Prescription, sale_model=Sale):
+    """
+    Rebuild every day from start to end (inclusive; defaults to the first /
+    last prescription, sale or activity date), chunk_days at a time. The
+    models may be historical ones (migrations). Returns the rows written.
+    """
+    using = using or router.db_for_write(activity_model)
+    if start is None or end is None:
+        # Existing activity rows count too, so days with no rows left get cleared
+        bounds = [
+            model.objects.using(using).aggregate(first=Min('date'), last=Max('date'))
+            for model in (prescription_model, sale_model, activity_model)
+        ]
+        firsts = [bound['first'] for bound in bounds if bound['first']]
+        lasts = [bound['last'] for bound in bounds if bound['last']]
+        if not firsts:
+            return 0
+        start = start or min(firsts)
+        end = end or max(lasts)
+
+    written = 0
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+        days = [chunk_start + timedelta(days=offset) for offset in range((chunk_end - chunk_start).days + 1)]
+        written += _replace_days(
+            activity_model, prescription_model, sale_model, days, using=using,
+            date__gte=chunk_start, date__lte=chunk_end,
+        )
+        chunk_start = chunk_end + timedelta(days=1)
+    return written
+
+
+def tenant_activity(region_id=None):
+    """DailyActivity rows of the whole tenant, or of one region"""
+    if region_id:
+        return DailyActivity.objects.filter(region_id=region_id)
+    return DailyActivity.objects.filter(region__isnull=True)
+
+
+def activity_totals(start=None, end=None, region_id=None):
+    """Summed activity for start <= date < end (either bound optional)"""
+    queryset = tenant_activity(region_id)
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lt=end)
+    totals = queryset.aggregate(**{field: Sum(field) for field in ACTIVITY_FIELDS})
+    result = {field: totals[field] or 0 for field in ACTIVITY_FIELDS}
+    result['revenue'] = _as_amount(totals['revenue'])
+    return result
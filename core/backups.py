@@ -0,0 +1,331 @@
+"""
+Tenant database backups (core.views.create_backup)
+- SQLite: the online backup API copies the live database page by page
+  into a snapshot file. A read transaction is held on the source for the
+  copy, so a concurrent write never restarts it and the snapshot is
+  consistent; in WAL mode writers keep going, in rollback-journal mode
+  they wait only for the page copy, never for the compression
+- The snapshot is gzip-compressed in fixed-size chunks while its SHA-256
+  and size are computed, so memory use does not depend on the database
+  size; restoring is gunzip + using the file as the tenant database
+- PostgreSQL: pg_dump writes a directory-format dump itself (-F d), with
+  parallel jobs and per-table compression, so nothing passes through
+  Python memory; the directory is then packed into one uncompressed tar
+  (the table files are compressed already) for download
+- restore_* are the matching restores (manage.py restore_tenant_backup);
+  pg_restore runs with the same number of parallel jobs
+- create_company_backup is the one entry point for the settings page and
+  manage.py run_scheduled_backups; scheduled runs start in a per-company
+  slot of the nightly window (next_backup_time) and old files are pruned
+  by the company's retention_days (prune_backups)
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import subprocess
+import tarfile
+import tempfile
+import zlib
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_STEP_SLEEP = 0  # seconds between steps; the read snapshot is held throughout
+COPY_CHUNK_SIZE = 1024 * 1024
+
+PG_DUMP_JOBS = min(4, os.cpu_count() or 1)
+PG_DUMP_COMPRESSION = 6
+PG_DUMP_TIMEOUT = 60 * 60  # seconds
+
+# Scheduled backups start between 01:00 and 05:00 (TIME_ZONE), one slot per company
+BACKUP_WINDOW_START = time(1, 0)
+BACKUP_WINDOW_MINUTES = 4 * 60
+BACKUP_INTERVAL_DAYS = {'daily': 1, 'weekly': 7, 'monthly': 30}
+
+BackupFile = namedtuple('BackupFile', 'path file_name file_size checksum')
+
+
+class _HashingWriter:
+    """File wrapper that hashes and counts the bytes written through it"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.raw.write(data)
+
+    def flush(self):
+        self.raw.flush()
+
+
+def _snapshot_sqlite(db_path, snapshot_path):
+    source = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, isolation_level=None)
+    try:
+        target = sqlite3.connect(snapshot_path)
+        try:
+            # Pin one read snapshot; otherwise every step that sees a write
+            # restarts the copy and a busy tenant never finishes
+            source.execute('BEGIN')
+            source.execute('SELECT count(*) FROM sqlite_master').fetchone()
+            source.backup(target, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP)
+            source.execute('COMMIT')
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+def _compress(source_path, target_path):
+    """gzip source_path into target_path; returns (size, sha256 hex) of the result"""
+    with open(target_path, 'wb') as raw:
+        writer = _HashingWriter(raw)
+        # mtime=0 keeps the output byte-identical for identical snapshots
+        with gzip.GzipFile(filename='', mode='wb', fileobj=writer, mtime=0) as compressed, \
+                open(source_path, 'rb') as source:
+            while True:
+                chunk = source.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                compressed.write(chunk)
+    return writer.size, writer.sha256.hexdigest()
+
+
+def backup_sqlite_database(db_path, backup_dir, base_name):
+    """
+    Consistent, compressed copy of the SQLite database at db_path as
+    backup_dir/<base_name>.sqlite3.gz. Returns a BackupFile; nothing is
+    left behind on failure.
+    """
+    file_name = f'{base_name}.sqlite3.gz'
+    path = os.path.join(backup_dir, file_name)
+    snapshot_path = os.path.join(backup_dir, f'.{base_name}.snapshot')
+    try:
+        _snapshot_sqlite(db_path, snapshot_path)
+        file_size, checksum = _compress(snapshot_path, path)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    finally:
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+    return BackupFile(path, file_name, file_size, checksum)
+
+
+def file_checksum(path):
+    """SHA-256 hex of a file, read in chunks"""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as source:
+        while True:
+            chunk = source.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _pg_command(program, db_config, db_name):
+    command = [
+        program,
+        '-h', db_config.get('HOST') or 'localhost',
+        '-p', str(db_config.get('PORT') or '5432'),
+        '-U', db_config.get('USER', ''),
+        '-d', db_name,
+        '--no-owner',
+        '--no-acl',
+    ]
+    env = os.environ.copy()
+    env['PGPASSWORD'] = db_config.get('PASSWORD', '')
+    return command, env
+
+
+def _run_pg(command, env):
+    # Output goes to files (-f / the target database); only stderr is kept
+    subprocess.run(
+        command,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        errors='replace',
+        check=True,
+        timeout=PG_DUMP_TIMEOUT,
+        env=env,
+    )
+
+
+def _pack(source_dir, arcname, target_path):
+    """tar source_dir into target_path; returns (size, sha256 hex) of the result"""
+    with open(target_path, 'wb') as raw:
+        writer = _HashingWriter(raw)
+        # 'w|' streams block by block, so the archive is never held in memory
+        with tarfile.open(fileobj=writer, mode='w|') as archive:
+            archive.add(source_dir, arcname=arcname)
+    return writer.size, writer.sha256.hexdigest()
+
+
+def backup_postgres_database(db_config, db_name, backup_dir, base_name, jobs=PG_DUMP_JOBS):
+    """
+    Parallel directory-format pg_dump of db_name, packed as
+    backup_dir/<base_name>.dump.tar. Returns a BackupFile; nothing is
+    left behind on failure. Raises FileNotFoundError without pg_dump and
+    CalledProcessError (stderr attached) when the dump fails.
+    """
+    file_name = f'{base_name}.dump.tar'
+    path = os.path.join(backup_dir, file_name)
+    dump_dir = tempfile.mkdtemp(prefix=f'.{base_name}.', dir=backup_dir)
+    try:
+        command, env = _pg_command('pg_dump', db_config, db_name)
+        dump_path = os.path.join(dump_dir, base_name)
+        _run_pg(command + ['-F', 'd', '-j', str(jobs), '-Z', str(PG_DUMP_COMPRESSION), '-f', dump_path], env)
+        file_size, checksum = _pack(dump_path, base_name, path)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    finally:
+        shutil.rmtree(dump_dir, ignore_errors=True)
+    return BackupFile(path, file_name, file_size, checksum)
+
+
+def restore_sqlite_database(backup_path, db_path):
+    """
+    Replace the SQLite database at db_path with a .sqlite3.gz backup. The
+    backup is unpacked and checked next to the database first, then
+    swapped in atomically.
+    """
+    fd, restored_path = tempfile.mkstemp(prefix='.restore.', dir=os.path.dirname(db_path))
+    try:
+        with os.fdopen(fd, 'wb') as target, gzip.open(backup_path, 'rb') as source:
+            shutil.copyfileobj(source, target, COPY_CHUNK_SIZE)
+        connection = sqlite3.connect(restored_path)
+        try:
+            result = connection.execute('PRAGMA integrity_check').fetchone()[0]
+        finally:
+            connection.close()
+        if result != 'ok':
+            raise ValueError(f'Backup integrity check failed: {result}')
+        os.replace(restored_path, db_path)
+    finally:
+        if os.path.exists(restored_path):
+            os.remove(restored_path)
+
+
+def restore_postgres_database(db_config, db_name, backup_path, jobs=PG_DUMP_JOBS):
+    """Restore a .dump.tar backup into db_name with a parallel pg_restore (existing objects are dropped)"""
+    restore_dir = tempfile.mkdtemp(prefix='.restore.', dir=os.path.dirname(backup_path))
+    try:
+        with tarfile.open(backup_path, mode='r|') as archive:
+            archive.extractall(restore_dir, filter='data')
+        dump_dirs = os.listdir(restore_dir)
+        if len(dump_dirs) != 1:
+            raise ValueError('Backup archive must hold exactly one dump directory')
+        command, env = _pg_command('pg_restore', db_config, db_name)
+        _run_pg(command + ['--clean', '--if-exists', '-j', str(jobs), os.path.join(restore_dir, dump_dirs[0])], env)
+    finally:
+        shutil.rmtree(restore_dir, ignore_errors=True)
+
+
+def create_company_backup(company, created_by=None):
+    """
+    Back up the company's tenant database into backups/<slug>/ and record a
+    Backup row. A failure is recorded as a failed Backup row and re-raised.
+    """
+    from decouple import config
+    from subscription.models import Backup, BackupSettings
+
+    db_name = company.db_name
+    try:
+        backup_dir = Path(settings.BASE_DIR) / 'backups' / company.slug
+        backup_dir.mkdir(parents=True, exist_ok=True)
+        base_name = f'{db_name}_{timezone.now().strftime("%Y%m%d_%H%M%S")}'
+
+        use_pg = getattr(settings, 'USE_POSTGRESQL', None)
+        if use_pg is None:
+            use_pg = config('USE_POSTGRESQL', default=False, cast=bool)
+        if use_pg:
+            db_config = settings.DATABASES.get(db_name, settings.DATABASES['default'])
+            backup_file = backup_postgres_database(db_config, db_name, str(backup_dir), base_name)
+        else:
+            db_path = Path(settings.BASE_DIR) / 'tenant_databases' / f'{db_name}.sqlite3'
+            if not db_path.exists():
+                raise FileNotFoundError(f'Verilənlər bazası tapılmadı: {db_path.name}')
+            backup_file = backup_sqlite_database(str(db_path), str(backup_dir), base_name)
+    except Exception as e:
+        Backup.objects.create(
+            company=company,
+            file_path='',
+            file_name='',
+            file_size=0,
+            status='failed',
+            error_message=getattr(e, 'stderr', None) or str(e),
+            created_by=created_by,
+        )
+        raise
+
+    try:
+        backup = Backup.objects.create(
+            company=company,
+            file_path=backup_file.path,
+            file_name=backup_file.file_name,
+            file_size=backup_file.file_size,
+            checksum=backup_file.checksum,
+            status='success',
+            created_by=created_by,
+        )
+    except Exception:
+        # A file without a row would never be pruned
+        os.remove(backup_file.path)
+        raise
+    # update(), so a scheduler that has already moved next_backup is not overwritten
+    if not BackupSettings.objects.filter(company=company).update(last_backup=backup.created_at):
+        BackupSettings.objects.create(company=company, last_backup=backup.created_at)
+    return backup
+
+
+def next_backup_time(interval, company_id, after=None):
+    """
+    Start of the next scheduled backup: interval days after `after` (now),
+    at the company's fixed slot in the nightly window. None when disabled.
+    """
+    days = BACKUP_INTERVAL_DAYS.get(interval)
+    if not days:
+        return None
+    after = timezone.localtime(after or timezone.now())
+    # Stable per company, so tenants are spread over the window
+    slot = zlib.crc32(str(company_id).encode()) % BACKUP_WINDOW_MINUTES
+    start = datetime.combine(after.date() + timedelta(days=days), BACKUP_WINDOW_START) + timedelta(minutes=slot)
+    return timezone.make_aware(start)
+
+
+def prune_backups(company, retention_days, now=None):
+    """
+    Delete the company's backups (rows and files) older than retention_days;
+    the newest successful backup is always kept. Returns the number deleted.
+    """
+    from subscription.models import Backup
+
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    expired = Backup.objects.filter(company=company, created_at__lt=cutoff)
+    newest = Backup.objects.filter(company=company, status='success').order_by('-created_at').first()
+    if newest:
+        expired = expired.exclude(pk=newest.pk)
+    deleted = 0
+    for backup in expired:
+        if backup.file_path and os.path.exists(backup.file_path):
+            os.remove(backup.file_path)
+        backup.delete()
+        deleted += 1
+    return deleted
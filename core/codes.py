@@ -0,0 +1,168 @@
+"""
+Collision-free 6-character codes (doctors, regions)
+- Each tenant database keeps one counter per code kind (CodeSequence)
+- Sequence number n is mapped to a code by a fixed bijective shuffle of
+  [0, 36**6): a 4-round Feistel network on 32 bits with cycle walking,
+  then base-36 (A-Z, 0-9). Distinct numbers always give distinct codes,
+  and consecutive numbers give unrelated-looking codes
+- Numbers are reserved in blocks with one UPDATE, so bulk creation costs
+  a few queries per block instead of an exists() probe per row
+- Codes written before the allocator (random codes) are dropped from
+  each block with one code__in query
+"""
+
+import string
+
+from django.db import transaction
+from django.db.models import F
+
+from core.models import CodeSequence
+
+
+ALPHABET = string.ascii_uppercase + string.digits
+CODE_LENGTH = 6
+CODE_SPACE = len(ALPHABET) ** CODE_LENGTH
+
+# Never handed out: Doctor.save() treats '000000' as "no code yet"
+RESERVED_CODES = frozenset({'000000'})
+
+DEFAULT_BLOCK_SIZE = 100
+
+# CodeSequence names
+DOCTOR_CODE_SEQUENCE = 'doctor'
+REGION_CODE_SEQUENCE = 'region'
+
+# Sequence numbers a seed looks at above the number of existing codes
+# (room for codes of deleted rows)
+SEED_SLACK = 10000
+
+_HALF_BITS = 16
+_HALF_MASK = (1 << _HALF_BITS) - 1
+_ROUND_KEYS = (0x5A17, 0x3C6B, 0x71E3, 0x2D99)
+
+
+def _round(value, key):
+    return ((value * 0x9E37 + key) ^ (value >> 5)) & _HALF_MASK
+
+
+def _feistel(value):
+    left, right = value >> _HALF_BITS, value & _HALF_MASK
+    for key in _ROUND_KEYS:
+        left, right = right, left ^ _round(right, key)
+    return (left << _HALF_BITS) | right
+
+
+def _feistel_inverse(value):
+    left, right = value >> _HALF_BITS, value & _HALF_MASK
+    for key in reversed(_ROUND_KEYS):
+        left, right = right ^ _round(left, key), left
+    return (left << _HALF_BITS) | right
+
+
+def number_to_code(number):
+    """Code for sequence number (0 <= number < CODE_SPACE)"""
+    if not 0 <= number < CODE_SPACE:
+        raise ValueError('Kod ardıcıllığı tükənib')
+    value = _feistel(number)
+    while value >= CODE_SPACE:
+        value = _feistel(value)
+
+    chars = []
+    for _ in range(CODE_LENGTH):
+        value, index = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[index])
+    return ''.join(reversed(chars))
+
+
+def code_to_number(code):
+    """Sequence number of a code, or None if it is not a well-formed code"""
+    if not code or len(code) != CODE_LENGTH or any(char not in ALPHABET for char in code):
+        return None
+    value = 0
+    for char in code:
+        value = value * len(ALPHABET) + ALPHABET.index(char)
+    value = _feistel_inverse(value)
+    while value >= CODE_SPACE:
+        value = _feistel_inverse(value)
+    return value
+
+
+def reserve_numbers(name, count, using=None):
+    """Reserve count consecutive sequence numbers; returns the first one"""
+    manager = CodeSequence.objects.db_manager(using)
+    with transaction.atomic(using=manager.db):
+        manager.get_or_create(name=name)
+        # The UPDATE locks the row until commit, so blocks never overlap
+        manager.filter(name=name).update(next_value=F('next_value') + count)
+        end = manager.filter(name=name).values_list('next_value', flat=True).get()
+    return end - count
+
+
+def allocate_codes(name, count, model, field='code', using=None):
+    """
+    count unused codes for model.field. The sequence guarantees
+    uniqueness among allocated codes; one query per block drops codes
+    that already exist from before the allocator.
+    """
+    codes = []
+    while len(codes) < count:
+        needed = count - len(codes)
+        start = reserve_numbers(name, needed, using=using)
+        block = [number_to_code(number) for number in range(start, start + needed)]
+        taken = set(
+            model._default_manager.db_manager(using)
+            .filter(**{f'{field}__in': block})
+            .values_list(field, flat=True)
+        )
+        codes.extend(code for code in block if code not in taken and code not in RESERVED_CODES)
+    return codes
+
+
+class CodeBlock:
+    """
+    Iterator handing out codes from blocks allocated on demand, for bulk
+    creation: codes = CodeBlock('doctor', Doctor); Doctor(code=next(codes), ...)
+    Unused codes of the last block are simply skipped.
+    """
+
+    def __init__(self, name, model, field='code', block_size=DEFAULT_BLOCK_SIZE, using=None):
+        self.name = name
+        self.model = model
+        self.field = field
+        self.block_size = block_size
+        self.using = using
+        self._codes = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._codes:
+            self._codes = allocate_codes(
+                self.name, self.block_size, self.model, self.field, using=self.using
+            )
+            self._codes.reverse()
+        return self._codes.pop()
+
+
+def seed_sequence_value(codes, current=0):
+    """
+    Next sequence value that skips every allocator code already in use.
+    Allocated codes map back to a dense prefix of numbers; random legacy
+    codes map to scattered numbers and only matter inside the window.
+    """
+    codes = list(codes)
+    window = len(codes) + SEED_SLACK + current
+    numbers = [number for number in map(code_to_number, codes) if number is not None and number < window]
+    return max([current] + [number + 1 for number in numbers])
+
+
+def seed_code_sequence(name, model, field='code', using=None):
+    """Move the sequence past codes already stored in model.field (safe to rerun)"""
+    manager = CodeSequence.objects.db_manager(using)
+    with transaction.atomic(using=manager.db):
+        sequence, _ = manager.select_for_update().get_or_create(name=name)
+        codes = model._default_manager.db_manager(using).values_list(field, flat=True)
+        sequence.next_value = seed_sequence_value(codes.iterator(), current=sequence.next_value)
+        sequence.save(using=manager.db, update_fields=['next_value'])
+    return sequence.next_value
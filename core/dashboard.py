@@ -0,0 +1,181 @@
+"""
+Dashboard widgets (core.views.dashboard_widget)
+- The dashboard page is a shell; each widget is a JSON endpoint the
+  browser loads in parallel
+- Every widget lists the plans that may see it, its cache timeout and the
+  data groups it reads (core.dashboard_cache)
+- Builders return JSON-ready dicts (dates as strings, amounts as floats)
+"""
+
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.activity import tenant_activity
+from core.dashboard_cache import cached_widget
+from core.reference_cache import get_active_drugs
+from core.timeseries import cumulative_counts, grouped_series, last_days, last_months
+from doctors.models import Doctor
+from prescriptions.models import Prescription
+from regions.models import Region
+
+
+ALL_PLANS = ('basic', 'professional', 'enterprise')
+PAID_PLANS = ('professional', 'enterprise')
+
+RECENT_PRESCRIPTIONS_SHOWN = 5
+TOP_DOCTORS_SHOWN = 5
+TOP_REGIONS_SHOWN = 5
+
+Widget = namedtuple('Widget', 'build plans timeout groups')
+
+
+def _date(value):
+    return value.strftime('%d.%m.%Y') if value else None
+
+
+def build_summary(plan_type):
+    """Top counters; sales figures only for the paid plans"""
+    today = timezone.now().date()
+    last_30_days = today - timedelta(days=30)
+    last_7_days = today - timedelta(days=7)
+    activity = tenant_activity().aggregate(
+        total_prescriptions=Sum('prescription_count'),
+        prescriptions_last_30=Sum('prescription_count', filter=Q(date__gte=last_30_days)),
+        prescriptions_last_7=Sum('prescription_count', filter=Q(date__gte=last_7_days)),
+        total_sales=Sum('sales_count'),
+        sales_last_30=Sum('sales_count', filter=Q(date__gte=last_30_days)),
+        sales_revenue=Sum('revenue'),
+    )
+    summary = {
+        'total_doctors': Doctor.objects.count(),
+        'total_drugs': len(get_active_drugs()),
+        'total_prescriptions': activity['total_prescriptions'] or 0,
+        'prescriptions_last_30': activity['prescriptions_last_30'] or 0,
+        'prescriptions_last_7': activity['prescriptions_last_7'] or 0,
+    }
+    if plan_type in PAID_PLANS:
+        summary.update(
+            total_sales=activity['total_sales'] or 0,
+            sales_last_30=activity['sales_last_30'] or 0,
+            sales_revenue=float(activity['sales_revenue'] or 0),
+        )
+    return summary
+
+
+def build_recent_prescriptions(plan_type):
+    """Latest prescriptions - totals are stored on the header row"""
+    return {'prescriptions': [
+        {
+            'id': prescription.id,
+            'date': _date(prescription.date),
+            'is_active': prescription.is_active,
+            'doctor': prescription.doctor.ad if prescription.doctor else None,
+            'doctor_code': prescription.doctor.code if prescription.doctor else None,
+            'region': prescription.region.name if prescription.region else None,
+            'drug_count': prescription.item_count,
+            'total_amount': float(prescription.total_amount or 0),
+        }
+        for prescription in Prescription.objects.select_related(
+            'doctor', 'region'
+        ).order_by('-date', '-id')[:RECENT_PRESCRIPTIONS_SHOWN]
+    ]}
+
+
+def build_top_doctors(plan_type):
+    """Stored KPI column, read through the (prescription_count, id) index"""
+    return {'doctors': [
+        {
+            'id': doctor.id,
+            'ad': doctor.ad,
+            'code': doctor.code,
+            'region': doctor.region.name if doctor.region else None,
+            'prescription_count': doctor.prescription_count or 0,
+        }
+        for doctor in Doctor.objects.select_related('region').order_by(
+            '-prescription_count', '-id'
+        )[:TOP_DOCTORS_SHOWN]
+    ]}
+
+
+def build_region_stats(plan_type):
+    """Prescriptions per region from the per-region rollup rows"""
+    regions = Region.objects.annotate(
+        prescription_count=Coalesce(Sum('daily_activity__prescription_count'), 0)
+    ).order_by('-prescription_count', 'id')[:TOP_REGIONS_SHOWN]
+    total = tenant_activity().aggregate(total=Sum('prescription_count'))['total'] or 0
+    return {
+        'total_prescriptions': total,
+        'regions': [
+            {'id': region.id, 'name': region.name, 'prescription_count': region.prescription_count}
+            for region in regions
+        ],
+    }
+
+
+def build_daily_charts(plan_type):
+    """Last 30 days - one rollup row per day"""
+    days = last_days(timezone.now().date(), 30)
+    daily = grouped_series(
+        tenant_activity(), 'date', 'day', days,
+        prescriptions=Sum('prescription_count'), sales=Sum('sales_count'), revenue=Sum('revenue'),
+    )
+    return {
+        'labels': [day.strftime('%d.%m') for day in days],
+        'prescriptions': daily['prescriptions'],
+        'sales': daily['sales'],
+        'revenue': [float(value) for value in daily['revenue']],
+    }
+
+
+def build_monthly_charts(plan_type):
+    """Last 12 months (sparklines and monthly chart), oldest first"""
+    months = last_months(timezone.now().date(), 12)
+    monthly = grouped_series(
+        tenant_activity(), 'date', 'month', months,
+        prescriptions=Sum('prescription_count'), sales=Sum('sales_count'), revenue=Sum('revenue'),
+    )
+    return {
+        'labels': [month.strftime('%b') for month in months],
+        'months': [month.strftime('%Y-%m-%d') for month in months],
+        'prescriptions': monthly['prescriptions'],
+        'sales': monthly['sales'],
+        'revenue': [float(value) for value in monthly['revenue']],
+        # Doctors created up to the end of each month
+        'doctors': cumulative_counts(Doctor.objects.all(), 'created_at', 'month', months),
+    }
+
+
+DASHBOARD_WIDGETS = {
+    'summary': Widget(build_summary, ALL_PLANS, 60, ('activity', 'doctors', 'reference')),
+    'recent_prescriptions': Widget(build_recent_prescriptions, ALL_PLANS, 60, ('activity', 'doctors', 'reference')),
+    'top_doctors': Widget(build_top_doctors, PAID_PLANS, 300, ('activity', 'doctors', 'reference')),
+    'region_stats': Widget(build_region_stats, ('enterprise',), 300, ('activity', 'reference')),
+    'daily_charts': Widget(build_daily_charts, PAID_PLANS, 300, ('activity',)),
+    'monthly_charts': Widget(build_monthly_charts, PAID_PLANS, 900, ('activity', 'doctors')),
+}
+
+
+def _known_plan(plan_type):
+    # The dashboard template falls back to the basic layout as well
+    return plan_type if plan_type in ALL_PLANS else 'basic'
+
+
+def widget_allowed(name, plan_type):
+    return _known_plan(plan_type) in DASHBOARD_WIDGETS[name].plans
+
+
+def widgets_for_plan(plan_type):
+    return [name for name in DASHBOARD_WIDGETS if widget_allowed(name, plan_type)]
+
+
+def get_widget_data(name, plan_type):
+    """Cached data of one widget; the caller checks widget_allowed() first"""
+    widget = DASHBOARD_WIDGETS[name]
+    plan_type = _known_plan(plan_type)
+    # summary differs by plan, the rest only by tenant
+    cache_name = f'{name}:{plan_type}' if name == 'summary' else name
+    return cached_widget(cache_name, widget.groups, widget.timeout, lambda: widget.build(plan_type))
@@ -0,0 +1,44 @@
+"""
+Per-tenant cache for dashboard widgets (core.dashboard)
+- Each widget is cached on its own, with its own timeout
+- Widgets name the data groups they read ('activity', 'doctors', 'reference');
+  each tenant database keeps a version per group and the cache key holds
+  the versions, so bumping a group drops exactly the widgets built from it
+- core.activity bumps 'activity' whenever the daily rollup changes;
+  core.signals bumps 'doctors' / 'reference' when those rows change
+
+The versions are kept (and bumped after commit) with the helpers of
+core.reference_cache, in the configured cache backend, so with LocMemCache
+other workers may serve a widget for up to its timeout.
+"""
+
+from django.core.cache import cache
+
+from core.reference_cache import bump_cache_version, get_cache_version
+from subscription.db_router import get_tenant_db
+
+
+def _version_key(db_alias, group):
+    return f'dashboard:{db_alias}:{group}:version'
+
+
+def get_dashboard_version(group, db_alias=None):
+    return get_cache_version(_version_key(db_alias or get_tenant_db() or 'default', group))
+
+
+def bump_dashboard_version(group, db_alias=None):
+    """Invalidate every cached widget of one tenant database that reads group"""
+    db_alias = db_alias or get_tenant_db() or 'default'
+    bump_cache_version(_version_key(db_alias, group), db_alias)
+
+
+def cached_widget(name, groups, timeout, build):
+    """build() through the cache, keyed by tenant, widget and group versions"""
+    db_alias = get_tenant_db() or 'default'
+    versions = '.'.join(str(get_dashboard_version(group, db_alias)) for group in groups)
+    key = f'dashboard:{db_alias}:{name}:v{versions}'
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout=timeout)
+    return data
@@ -0,0 +1,77 @@
+"""
+Management command to rebuild the per-day activity rollup (DailyActivity)
+from the stored Prescription / Sale header totals
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from subscription.models import Company
+from subscription.db_router import set_tenant_db, clear_tenant_db
+from core.activity import REBUILD_CHUNK_DAYS, rebuild_daily_activity
+import sys
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date: {value} (expected YYYY-MM-DD)')
+
+
+class Command(BaseCommand):
+    help = 'Backfill / repair daily activity totals across all tenant databases'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            help='First day to rebuild (YYYY-MM-DD, default: earliest data)',
+        )
+        parser.add_argument(
+            '--end',
+            help='Last day to rebuild (YYYY-MM-DD, default: latest data)',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=REBUILD_CHUNK_DAYS,
+            help='Days rebuilt per transaction',
+        )
+
+    def handle(self, *args, **options):
+        sys.stdout.reconfigure(encoding='utf-8')
+        start = _parse_date(options['start']) if options['start'] else None
+        end = _parse_date(options['end']) if options['end'] else None
+        if start and end and start > end:
+            raise CommandError('--start must not be after --end')
+
+        companies = Company.objects.all()
+
+        if not companies.exists():
+            self.stdout.write(self.style.ERROR('No companies found!'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Found {companies.count()} companies\n'))
+
+        total_rows = 0
+
+        for company in companies:
+            if not company.db_name:
+                self.stdout.write(self.style.WARNING(f'Skipping {company.name} (no database)'))
+                continue
+
+            self.stdout.write(self.style.WARNING(f'\n=== Rebuilding {company.name} ({company.db_name}) ==='))
+
+            # Set tenant database context
+            set_tenant_db(company.db_name)
+
+            try:
+                count = rebuild_daily_activity(start=start, end=end, chunk_days=options['chunk_days'])
+                total_rows += count
+                self.stdout.write(self.style.SUCCESS(f'  [OK] {count} activity rows'))
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'  Error: {str(e)}'))
+            finally:
+                clear_tenant_db()
+
+        self.stdout.write(self.style.SUCCESS(f'\n[SUCCESS] Wrote {total_rows} activity rows'))
@@ -0,0 +1,158 @@
+"""
+Management command to repair malformed Decimal values in tenant databases
+
+Old SQLite data can hold text in decimal columns ("12,50", " 3.4 ", "")
+which makes Django's decimal converter raise on load. Such values are
+parsed leniently (comma as decimal separator, surrounding spaces) and
+written back as numbers; unparseable values become NULL when the column
+allows it, otherwise the field default (or 0).
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections, models, transaction
+from subscription.models import Company
+from subscription.db_router import set_tenant_db, clear_tenant_db, TenantDatabaseRouter
+import sys
+
+
+def _tenant_decimal_fields():
+    """(model, [decimal fields]) for every concrete tenant model"""
+    for model in apps.get_models():
+        if model._meta.app_label in TenantDatabaseRouter.MASTER_APPS:
+            continue
+        if model._meta.proxy or not model._meta.managed:
+            continue
+        fields = [
+            field for field in model._meta.concrete_fields
+            if isinstance(field, models.DecimalField)
+        ]
+        if fields:
+            yield model, fields
+
+
+def _fallback_value(field):
+    if field.null:
+        return None
+    default = field.get_default()
+    try:
+        return Decimal(str(default if default not in (None, '') else 0))
+    except (InvalidOperation, ValueError):
+        return Decimal('0')
+
+
+def parse_decimal(raw, field):
+    """Decimal for a stored text value, quantized to the field; None if unparseable"""
+    text = str(raw).strip().replace(' ', '').replace(',', '.')
+    try:
+        value = Decimal(text)
+    except (InvalidOperation, ValueError):
+        return None
+    if not value.is_finite():
+        return None
+    try:
+        value = value.quantize(Decimal(1).scaleb(-field.decimal_places))
+    except InvalidOperation:
+        return None
+    if len(value.as_tuple().digits) > field.max_digits:
+        return None
+    return value
+
+
+def find_malformed_values(connection, model, field):
+    """(pk, raw value) rows whose column holds text instead of a number"""
+    if connection.vendor != 'sqlite':
+        # Other backends store decimals in a typed numeric column
+        return []
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(field.column)
+    pk_column = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {pk_column}, {column} FROM {table} "
+            f"WHERE {column} IS NOT NULL AND typeof({column}) NOT IN ('integer', 'real')"
+        )
+        return cursor.fetchall()
+
+
+class Command(BaseCommand):
+    help = 'Find and fix malformed Decimal values across all tenant databases'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report malformed values, do not write',
+        )
+
+    def handle(self, *args, **options):
+        sys.stdout.reconfigure(encoding='utf-8')
+        dry_run = options['dry_run']
+
+        companies = Company.objects.all()
+
+        if not companies.exists():
+            self.stdout.write(self.style.ERROR('No companies found!'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Found {companies.count()} companies\n'))
+
+        total_fixed = 0
+
+        for company in companies:
+            if not company.db_name:
+                self.stdout.write(self.style.WARNING(f'Skipping {company.name} (no database)'))
+                continue
+
+            self.stdout.write(self.style.WARNING(f'\n=== Checking {company.name} ({company.db_name}) ==='))
+
+            # Set tenant database context
+            set_tenant_db(company.db_name)
+
+            try:
+                total_fixed += self._repair_database(company.db_name, dry_run)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'  Error: {str(e)}'))
+            finally:
+                clear_tenant_db()
+
+        action = 'Found' if dry_run else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(f'\n[SUCCESS] {action} {total_fixed} malformed decimal values'))
+
+    def _repair_database(self, db_alias, dry_run):
+        connection = connections[db_alias]
+        table_names = set(connection.introspection.table_names())
+        fixed = 0
+
+        for model, fields in _tenant_decimal_fields():
+            if model._meta.db_table not in table_names:
+                continue
+
+            for field in fields:
+                rows = find_malformed_values(connection, model, field)
+                if not rows:
+                    continue
+
+                label = f'{model._meta.label}.{field.name}'
+                self.stdout.write(f'  {label}: {len(rows)} malformed values')
+                fixed += len(rows)
+
+                if dry_run:
+                    for pk, raw in rows[:5]:
+                        self.stdout.write(f'    #{pk}: {raw!r}')
+                    continue
+
+                with transaction.atomic(using=db_alias):
+                    for pk, raw in rows:
+                        value = parse_decimal(raw, field)
+                        if value is None:
+                            value = _fallback_value(field)
+                        model._base_manager.using(db_alias).filter(pk=pk).update(**{field.name: value})
+
+                self.stdout.write(self.style.SUCCESS(f'  [OK] Fixed: {label}'))
+
+        if not fixed:
+            self.stdout.write('  [OK] No malformed decimal values found')
+        return fixed
@@ -0,0 +1,74 @@
+"""
+Management command to restore a tenant database from a Backup made by
+core.views.create_backup (.sqlite3.gz or pg_dump .dump.tar)
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from subscription.models import Backup
+from subscription.utils import get_db_path
+from core.backups import PG_DUMP_JOBS, file_checksum, restore_postgres_database, restore_sqlite_database
+import os
+import subprocess
+import sys
+
+
+class Command(BaseCommand):
+    help = 'Restore a tenant database from a backup (replaces the current data)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('backup_id', type=int, help='Backup id')
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=PG_DUMP_JOBS,
+            help='Parallel pg_restore jobs (PostgreSQL)',
+        )
+        parser.add_argument(
+            '--noinput',
+            action='store_true',
+            help='Do not ask for confirmation',
+        )
+
+    def handle(self, *args, **options):
+        sys.stdout.reconfigure(encoding='utf-8')
+        try:
+            backup = Backup.objects.select_related('company').get(id=options['backup_id'], status='success')
+        except Backup.DoesNotExist:
+            raise CommandError(f'Backup {options["backup_id"]} not found')
+
+        company = backup.company
+        db_name = company.db_name
+        if not db_name:
+            raise CommandError(f'{company.name} has no database')
+        if not os.path.exists(backup.file_path):
+            raise CommandError(f'Backup file not found: {backup.file_path}')
+        if backup.checksum and file_checksum(backup.file_path) != backup.checksum:
+            raise CommandError('Backup file checksum does not match, not restoring')
+
+        if not options['noinput']:
+            answer = input(f'Replace all data of {company.name} ({db_name}) with {backup.file_name}? [y/N] ')
+            if answer.lower() != 'y':
+                self.stdout.write(self.style.WARNING('Cancelled'))
+                return
+
+        # Open connections would keep using the old data
+        if db_name in connections.databases:
+            connections[db_name].close()
+
+        self.stdout.write(self.style.WARNING(f'\n=== Restoring {company.name} ({db_name}) from {backup.file_name} ==='))
+        try:
+            if backup.file_name.endswith('.dump.tar'):
+                db_config = settings.DATABASES.get(db_name, settings.DATABASES['default'])
+                restore_postgres_database(db_config, db_name, backup.file_path, jobs=options['jobs'])
+            elif backup.file_name.endswith('.sqlite3.gz'):
+                restore_sqlite_database(backup.file_path, str(get_db_path(db_name)))
+            else:
+                raise CommandError(f'Unsupported backup format: {backup.file_name}')
+        except FileNotFoundError:
+            raise CommandError('pg_restore not found - install the PostgreSQL client')
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f'pg_restore failed: {e.stderr}')
+
+        self.stdout.write(self.style.SUCCESS('[SUCCESS] Database restored'))
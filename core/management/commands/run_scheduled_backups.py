@@ -0,0 +1,103 @@
+"""
+Management command to run the scheduled tenant backups (BackupSettings)
+Usage: python manage.py run_scheduled_backups            (once, e.g. from cron every 10 minutes)
+       python manage.py run_scheduled_backups --loop     (as a long-running worker)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+from subscription.models import BackupSettings
+from core.backups import create_company_backup, next_backup_time, prune_backups
+
+
+DEFAULT_WORKERS = 2
+DEFAULT_LOOP_SECONDS = 300
+
+
+def _claim_due(now):
+    """
+    Due settings, each moved on to its next slot before it is backed up, so
+    a second runner (or the next loop) does not pick the same company
+    """
+    due = (
+        BackupSettings.objects.filter(next_backup__lte=now, is_active=True)
+        .exclude(interval='disabled')
+        .select_related('company')
+        .order_by('next_backup')
+    )
+    claimed = []
+    for backup_settings in due:
+        next_backup = next_backup_time(backup_settings.interval, backup_settings.company_id, after=now)
+        if BackupSettings.objects.filter(
+            pk=backup_settings.pk, next_backup=backup_settings.next_backup
+        ).update(next_backup=next_backup):
+            claimed.append(backup_settings)
+    return claimed
+
+
+def _run_backup(backup_settings):
+    company = backup_settings.company
+    try:
+        backup = create_company_backup(company)
+        pruned = prune_backups(company, backup_settings.retention_days)
+        return True, f'{backup.file_name} ({backup.file_size} bytes), {pruned} old backup(s) pruned'
+    except Exception as e:
+        return False, getattr(e, 'stderr', None) or str(e)
+    finally:
+        # Worker threads open their own connections
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Back up every company whose scheduled backup is due and prune old backups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_WORKERS,
+            help='Backups run at the same time',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, checking for due backups every --sleep seconds',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=int,
+            default=DEFAULT_LOOP_SECONDS,
+            help='Seconds between checks with --loop',
+        )
+
+    def handle(self, *args, **options):
+        sys.stdout.reconfigure(encoding='utf-8')
+        while True:
+            self._run_due(max(options['workers'], 1))
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
+
+    def _run_due(self, workers):
+        claimed = _claim_due(timezone.now())
+        if not claimed:
+            self.stdout.write('No backups due')
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'{len(claimed)} backup(s) due, {workers} at a time\n'))
+        succeeded = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for backup_settings, (ok, detail) in zip(claimed, executor.map(_run_backup, claimed)):
+                name = backup_settings.company.name
+                if ok:
+                    succeeded += 1
+                    self.stdout.write(self.style.SUCCESS(f'  [OK] {name}: {detail}'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'  [FAILED] {name}: {detail}'))
+
+        self.stdout.write(self.style.SUCCESS(f'\n[SUCCESS] {succeeded}/{len(claimed)} backups created'))
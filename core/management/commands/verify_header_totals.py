@@ -0,0 +1,85 @@
+"""
+Management command to verify stored header totals (Prescription / Sale)
+against their items, optionally repairing the mismatches
+"""
+
+from django.core.management.base import BaseCommand
+from subscription.models import Company
+from subscription.db_router import set_tenant_db, clear_tenant_db
+from core.totals import find_header_total_mismatches, refresh_header_totals
+from prescriptions.models import Prescription, PrescriptionItem
+from sales.models import Sale, SaleItem
+import sys
+
+
+HEADER_MODELS = (
+    (Prescription, PrescriptionItem, 'prescription'),
+    (Sale, SaleItem, 'sale'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Verify stored item totals on Prescription and Sale headers across all tenant databases'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Recompute the totals of mismatching headers',
+        )
+
+    def handle(self, *args, **options):
+        sys.stdout.reconfigure(encoding='utf-8')
+        fix = options['fix']
+        
+        companies = Company.objects.all()
+        
+        if not companies.exists():
+            self.stdout.write(self.style.ERROR('No companies found!'))
+            return
+        
+        self.stdout.write(self.style.SUCCESS(f'Found {companies.count()} companies\n'))
+        
+        total_mismatches = 0
+        
+        for company in companies:
+            if not company.db_name:
+                self.stdout.write(self.style.WARNING(f'Skipping {company.name} (no database)'))
+                continue
+            
+            self.stdout.write(self.style.WARNING(f'\n=== Checking {company.name} ({company.db_name}) ==='))
+            
+            # Set tenant database context
+            set_tenant_db(company.db_name)
+            
+            try:
+                for header_model, item_model, fk_name in HEADER_MODELS:
+                    label = header_model._meta.verbose_name_plural
+                    mismatched_ids = find_header_total_mismatches(
+                        header_model.objects.all(), item_model, fk_name
+                    )
+                    
+                    if not mismatched_ids:
+                        self.stdout.write(f'  [OK] {label}: totals match')
+                        continue
+                    
+                    total_mismatches += len(mismatched_ids)
+                    preview = ', '.join(str(pk) for pk in mismatched_ids[:10])
+                    self.stdout.write(self.style.WARNING(
+                        f'  {label}: {len(mismatched_ids)} mismatching (ids: {preview}'
+                        f'{", ..." if len(mismatched_ids) > 10 else ""})'
+                    ))
+                    
+                    if fix:
+                        refresh_header_totals(
+                            header_model.objects.filter(pk__in=mismatched_ids), item_model, fk_name
+                        )
+                        self.stdout.write(self.style.SUCCESS(f'  [OK] {label}: repaired'))
+                    
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'  Error: {str(e)}'))
+            finally:
+                clear_tenant_db()
+        
+        action = 'Repaired' if fix else 'Found'
+        self.stdout.write(self.style.SUCCESS(f'\n[SUCCESS] {action} {total_mismatches} mismatching headers'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50, verbose_name='Model')),
+                ('object_id', models.BigIntegerField(verbose_name='Obyekt ID')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Silinmə Tarixi')),
+            ],
+            options={
+                'verbose_name': 'Silinmə Qeydi',
+                'verbose_name_plural': 'Silinmə Qeydləri',
+                'ordering': ['deleted_at'],
+                'indexes': [models.Index(fields=['deleted_at'], name='core_syncto_deleted_380427_idx')],
+            },
+        ),
+    ]
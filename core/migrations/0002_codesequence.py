@@ -0,0 +1,90 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:24
+
+import string
+
+from django.db import migrations, models
+
+
+# Frozen copies of core.codes as of this migration
+ALPHABET = string.ascii_uppercase + string.digits
+CODE_LENGTH = 6
+CODE_SPACE = len(ALPHABET) ** CODE_LENGTH
+
+DOCTOR_CODE_SEQUENCE = 'doctor'
+REGION_CODE_SEQUENCE = 'region'
+
+SEED_SLACK = 10000
+
+_HALF_BITS = 16
+_HALF_MASK = (1 << _HALF_BITS) - 1
+_ROUND_KEYS = (0x5A17, 0x3C6B, 0x71E3, 0x2D99)
+
+
+def _round(value, key):
+    return ((value * 0x9E37 + key) ^ (value >> 5)) & _HALF_MASK
+
+
+def _feistel_inverse(value):
+    left, right = value >> _HALF_BITS, value & _HALF_MASK
+    for key in reversed(_ROUND_KEYS):
+        left, right = right ^ _round(left, key), left
+    return (left << _HALF_BITS) | right
+
+
+def code_to_number(code):
+    if not code or len(code) != CODE_LENGTH or any(char not in ALPHABET for char in code):
+        return None
+    value = 0
+    for char in code:
+        value = value * len(ALPHABET) + ALPHABET.index(char)
+    value = _feistel_inverse(value)
+    while value >= CODE_SPACE:
+        value = _feistel_inverse(value)
+    return value
+
+
+def seed_sequence_value(codes, current=0):
+    codes = list(codes)
+    window = len(codes) + SEED_SLACK + current
+    numbers = [number for number in map(code_to_number, codes) if number is not None and number < window]
+    return max([current] + [number + 1 for number in numbers])
+
+
+def seed_sequences(apps, schema_editor):
+    """Ardıcıllıqları mövcud kodlardan sonraya qur (təkrar işlətmək təhlükəsizdir)"""
+    db_alias = schema_editor.connection.alias
+    CodeSequence = apps.get_model('core', 'CodeSequence')
+    for name, app_label, model_name in (
+        (DOCTOR_CODE_SEQUENCE, 'doctors', 'Doctor'),
+        (REGION_CODE_SEQUENCE, 'regions', 'Region'),
+    ):
+        model = apps.get_model(app_label, model_name)
+        codes = model.objects.using(db_alias).values_list('code', flat=True)
+        sequence, _ = CodeSequence.objects.using(db_alias).get_or_create(name=name)
+        sequence.next_value = seed_sequence_value(codes.iterator(), current=sequence.next_value)
+        sequence.save(using=db_alias, update_fields=['next_value'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('doctors', '0011_keyset_indexes'),
+        ('regions', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Ad')),
+                ('next_value', models.BigIntegerField(default=0, verbose_name='Növbəti Dəyər')),
+            ],
+            options={
+                'verbose_name': 'Kod Ardıcıllığı',
+                'verbose_name_plural': 'Kod Ardıcıllıqları',
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
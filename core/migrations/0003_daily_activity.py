@@ -0,0 +1,92 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:39
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+BATCH_SIZE = 500
+
+
+def fill_activity(apps, schema_editor):
+    """Mövcud resept və satışlardan günlük yekunları yarat"""
+    # Frozen copy of core.activity's row building as of this migration
+    db_alias = schema_editor.connection.alias
+    DailyActivity = apps.get_model('core', 'DailyActivity')
+    Prescription = apps.get_model('prescriptions', 'Prescription')
+    Sale = apps.get_model('sales', 'Sale')
+
+    totals = {}
+
+    def add(row, values):
+        keys = [(row['date'], None)]
+        if row['region_id']:
+            keys.append((row['date'], row['region_id']))
+        for key in keys:
+            day = totals.setdefault(key, {
+                'prescription_count': 0, 'prescription_quantity': 0,
+                'sales_count': 0, 'units_sold': 0, 'revenue': Decimal('0.00'),
+            })
+            for field, value in values.items():
+                day[field] += value or 0
+
+    prescriptions = (
+        Prescription.objects.using(db_alias).order_by().values('date', 'region_id')
+        .annotate(count=Count('pk'), quantity=Sum('total_quantity'))
+    )
+    for row in prescriptions:
+        add(row, {'prescription_count': row['count'], 'prescription_quantity': row['quantity']})
+    sales = (
+        Sale.objects.using(db_alias).order_by().values('date', 'region_id')
+        .annotate(count=Count('pk'), quantity=Sum('total_quantity'), amount=Sum('total_amount'))
+    )
+    for row in sales:
+        add(row, {
+            'sales_count': row['count'],
+            'units_sold': row['quantity'],
+            'revenue': Decimal(row['amount'] or 0).quantize(Decimal('0.00')),
+        })
+
+    DailyActivity.objects.using(db_alias).bulk_create(
+        [
+            DailyActivity(date=day, region_id=region_id, **values)
+            for (day, region_id), values in totals.items()
+            if day
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_codesequence'),
+        ('regions', '0006_updated_at'),
+        ('prescriptions', '0004_header_totals'),
+        ('sales', '0003_header_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Tarix')),
+                ('prescription_count', models.PositiveIntegerField(default=0, verbose_name='Resept Sayı')),
+                ('prescription_quantity', models.PositiveIntegerField(default=0, verbose_name='Resept Miqdarı')),
+                ('sales_count', models.PositiveIntegerField(default=0, verbose_name='Satış Sayı')),
+                ('units_sold', models.PositiveIntegerField(default=0, verbose_name='Satılan Miqdar')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Gəlir')),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to='regions.region', verbose_name='Bölgə')),
+            ],
+            options={
+                'verbose_name': 'Günlük Fəaliyyət',
+                'verbose_name_plural': 'Günlük Fəaliyyət',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('region__isnull', True)), fields=('date',), name='daily_activity_total_unique'), models.UniqueConstraint(condition=models.Q(('region__isnull', False)), fields=('date', 'region'), name='daily_activity_region_unique')],
+            },
+        ),
+        migrations.RunPython(fill_activity, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,79 @@
 from django.db import models
 
-# Create your models here.
+
+class SyncTombstone(models.Model):
+    """
+    Silinmiş məlumat qeydi (delta sync üçün)
+    Reference-data rows removed from the tenant database; clients drop
+    them locally when they sync past deleted_at.
+    """
+    model = models.CharField(max_length=50, verbose_name="Model")
+    object_id = models.BigIntegerField(verbose_name="Obyekt ID")
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name="Silinmə Tarixi")
+
+    class Meta:
+        verbose_name = "Silinmə Qeydi"
+        verbose_name_plural = "Silinmə Qeydləri"
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
+
+
+class CodeSequence(models.Model):
+    """
+    Kod ardıcıllığı (həkim / bölgə kodları üçün)
+    next_value is the next unused sequence number; core.codes maps each
+    number to a distinct 6-character code.
+    """
+    name = models.CharField(max_length=50, unique=True, verbose_name="Ad")
+    next_value = models.BigIntegerField(default=0, verbose_name="Növbəti Dəyər")
+
+    class Meta:
+        verbose_name = "Kod Ardıcıllığı"
+        verbose_name_plural = "Kod Ardıcıllıqları"
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+class DailyActivity(models.Model):
+    """
+    Günlük fəaliyyət yekunu (core.activity)
+    One row per day for the whole tenant (region empty) and one per day
+    and region; rebuilt from the stored Prescription / Sale header totals
+    whenever a day's rows change.
+    """
+    date = models.DateField(verbose_name="Tarix")
+    region = models.ForeignKey(
+        'regions.Region',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='daily_activity',
+        verbose_name="Bölgə",
+    )
+    prescription_count = models.PositiveIntegerField(default=0, verbose_name="Resept Sayı")
+    prescription_quantity = models.PositiveIntegerField(default=0, verbose_name="Resept Miqdarı")
+    sales_count = models.PositiveIntegerField(default=0, verbose_name="Satış Sayı")
+    units_sold = models.PositiveIntegerField(default=0, verbose_name="Satılan Miqdar")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Gəlir")
+
+    class Meta:
+        verbose_name = "Günlük Fəaliyyət"
+        verbose_name_plural = "Günlük Fəaliyyət"
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date'], condition=models.Q(region__isnull=True), name='daily_activity_total_unique'
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'region'], condition=models.Q(region__isnull=False), name='daily_activity_region_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.region_id or 'Hamısı'}"
@@ -0,0 +1,175 @@
+"""
+Pagination for large tenant tables
+- Admin: unfiltered changelists take the row count from planner statistics
+  (pg_class.reltuples / sqlite_stat1) instead of COUNT(*); filtered
+  changelists and small tables still count exactly
+- Listings: keyset (cursor) pagination on a unique ordering such as
+  (date, id); every page is one indexed range query of per_page + 1 rows,
+  with no COUNT(*) and no OFFSET
+"""
+
+import base64
+import json
+
+from django.core.paginator import Paginator
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+# Below this estimate an exact COUNT(*) is cheap enough
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimate_table_rows(model, using):
+    """Planner estimate of the model table's row count, or None"""
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [table])
+            elif connection.vendor == 'sqlite':
+                # Filled by ANALYZE; first number of any stat row is the table size
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            else:
+                return None
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+
+    if not row or row[0] is None:
+        return None
+    try:
+        estimate = int(str(row[0]).split()[0])
+    except ValueError:
+        return None
+    return estimate if estimate > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose count uses planner statistics for unfiltered querysets"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is not None and not query.where and not query.distinct:
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+            if estimate and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class ScalableAdminMixin:
+    """ModelAdmin defaults for big tenant tables"""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class KeysetPage:
+    """
+    One page of keyset_paginate(); iterate it like a list.
+    next_query / previous_query are full query strings (other GET
+    parameters kept) or None at either end.
+    """
+
+    def __init__(self, object_list, has_next, has_previous, next_query, previous_query):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_query = next_query
+        self.previous_query = previous_query
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def _encode_cursor(direction, values):
+    raw = json.dumps([direction] + values, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor, fields):
+    """(direction, values) or None for a missing / malformed cursor"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, *values = json.loads(raw)
+        if direction not in ('n', 'p') or len(values) != len(fields):
+            return None
+        return direction, [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def _keyset_filter(names, descending, values, forward):
+    """Rows strictly after (forward) or before the boundary row in the ordering"""
+    condition = Q()
+    for index, name in enumerate(names):
+        going_down = descending[index] == forward
+        step = Q(**{f'{name}__{"lt" if going_down else "gt"}': values[index]})
+        for previous_index in range(index):
+            step &= Q(**{names[previous_index]: values[previous_index]})
+        condition |= step
+    return condition
+
+
+def keyset_paginate(request, queryset, ordering, per_page=25, param='cursor'):
+    """
+    Cursor-paginate queryset by ordering (e.g. ('-date', '-id')).
+
+    ordering must end with a unique, non-null field (normally the id) so
+    that cursors are stable. The cursor lives in ?<param>=; several
+    listings on one page just use different param names.
+    """
+    names = [name.lstrip('-') for name in ordering]
+    descending = [name.startswith('-') for name in ordering]
+    fields = [queryset.model._meta.get_field(name) for name in names]
+
+    decoded = _decode_cursor(request.GET.get(param), fields)
+    forward = decoded is None or decoded[0] == 'n'
+
+    if decoded:
+        queryset = queryset.filter(_keyset_filter(names, descending, decoded[1], forward))
+
+    if forward:
+        queryset = queryset.order_by(*ordering)
+    else:
+        queryset = queryset.order_by(*[
+            name if is_descending else f'-{name}' for name, is_descending in zip(names, descending)
+        ])
+
+    rows = list(queryset[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    has_next = has_more if forward else True
+    has_previous = decoded is not None if forward else has_more
+
+    def build_query(direction, row):
+        query = request.GET.copy()
+        query[param] = _encode_cursor(direction, [
+            fields[index].value_to_string(row) for index in range(len(fields))
+        ])
+        return query.urlencode()
+
+    return KeysetPage(
+        rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_query=build_query('n', rows[-1]) if has_next and rows else None,
+        previous_query=build_query('p', rows[0]) if has_previous and rows else None,
+    )
@@ -0,0 +1,81 @@
+"""
+Grouped-aggregate pivot tables
+- One values(row, column).annotate(Sum(value)) query per table
+- The sparse result is laid out as a dense row x column grid with row,
+  column and grand totals; missing cells are 0
+- Dimensions are model field paths ('sale__region', 'drug') or date parts
+  of a date field ('sale__date:month', 'sale__date:year')
+"""
+
+from django.db.models import Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+DATE_PARTS = {
+    'month': ExtractMonth,
+    'year': ExtractYear,
+}
+
+
+def _dimension_expression(dimension):
+    """(alias, expression or None) for a dimension spec"""
+    if ':' in dimension:
+        field, part = dimension.split(':', 1)
+        if part not in DATE_PARTS:
+            raise ValueError(f'Unknown date part: {part}')
+        return f'pivot_{part}', DATE_PARTS[part](field)
+    return dimension, None
+
+
+class PivotTable:
+    """
+    Dense pivot of queryset grouped by (row, column), summing value.
+
+    row_keys / column_keys fix the order and presence of rows and columns
+    (e.g. every region even without sales); when omitted they are the
+    sorted keys found in the data. Keys not listed are left out.
+    """
+
+    def __init__(self, queryset, row, column, value, row_keys=None, column_keys=None):
+        row_alias, row_expression = _dimension_expression(row)
+        column_alias, column_expression = _dimension_expression(column)
+        annotations = {
+            alias: expression
+            for alias, expression in ((row_alias, row_expression), (column_alias, column_expression))
+            if expression is not None
+        }
+
+        grouped = (
+            queryset.order_by()
+            .annotate(**annotations)
+            .values_list(row_alias, column_alias)
+            .annotate(pivot_value=Sum(value))
+        )
+
+        self.cells = {}
+        for row_key, column_key, total in grouped:
+            self.cells[(row_key, column_key)] = total or 0
+
+        self.row_keys = list(row_keys) if row_keys is not None else sorted(
+            {row_key for row_key, _ in self.cells if row_key is not None}
+        )
+        self.column_keys = list(column_keys) if column_keys is not None else sorted(
+            {column_key for _, column_key in self.cells if column_key is not None}
+        )
+
+        self.matrix = [
+            [self.cells.get((row_key, column_key), 0) for column_key in self.column_keys]
+            for row_key in self.row_keys
+        ]
+        self.row_totals = [sum(values) for values in self.matrix]
+        self.column_totals = [
+            sum(values[index] for values in self.matrix) for index in range(len(self.column_keys))
+        ]
+        self.grand_total = sum(self.row_totals)
+
+    def get(self, row_key, column_key):
+        return self.cells.get((row_key, column_key), 0)
+
+    def rows(self):
+        """(row_key, values aligned with column_keys, row total) per row"""
+        return zip(self.row_keys, self.matrix, self.row_totals)
@@ -0,0 +1,81 @@
+"""
+File downloads with HTTP Range support (core.views.download_backup)
+- A single "bytes=" range is answered with 206 and only that slice is read,
+  so an interrupted download of a large backup resumes where it stopped
+- If-Range (with the ETag passed in) falls back to the whole file when the
+  file has changed; multiple ranges are answered with the whole file too
+- The file is always streamed in chunks, never read into memory
+"""
+
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+
+RANGE_CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _parse_range(header, size):
+    """(start, end) inclusive, None for no usable range, False if unsatisfiable"""
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # bytes=-N: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_slice(path, start, length):
+    with open(path, 'rb') as source:
+        source.seek(start)
+        while length > 0:
+            chunk = source.read(min(RANGE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(request, path, filename, etag=None):
+    """Attachment response for path, honouring Range / If-Range"""
+    size = os.path.getsize(path)
+    quoted_etag = f'"{etag}"' if etag else None
+    header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    byte_range = None
+    if header and (not if_range or if_range == quoted_etag):
+        byte_range = _parse_range(header, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+    elif byte_range is None:
+        response = FileResponse(open(path, 'rb'), as_attachment=True, filename=filename)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_slice(path, start, end - start + 1),
+            status=206,
+            content_type='application/octet-stream',
+        )
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+
+    response['Accept-Ranges'] = 'bytes'
+    if quoted_etag:
+        response['ETag'] = quoted_etag
+    return response
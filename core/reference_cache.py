@@ -0,0 +1,101 @@
+"""
+Per-tenant read-through cache for reference data (lookup lists)
+- Active drugs, regions, cities, active clinics, specializations
+- Each tenant database has a version number; saving or deleting any of
+  these models bumps it, so stale lists are never read again
+- Bumps wait for the tenant transaction to commit: a reader that caches the
+  old rows in the meantime does so under the old version
+- Hits return tuples of model instances in display order
+
+The version lives in the configured cache backend: with Redis every
+worker sees a bump immediately, with LocMemCache (no REDIS_URL) the
+other worker processes may serve a list for up to REFERENCE_CACHE_TIMEOUT.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from drugs.models import Drug
+from regions.models import City, Clinic, Region, Specialization
+from subscription.db_router import get_tenant_db
+
+
+REFERENCE_CACHE_TIMEOUT = 300
+
+# Saving or deleting any of these bumps the tenant's version
+REFERENCE_MODELS = (Drug, Region, City, Clinic, Specialization)
+
+
+def _version_key(db_alias):
+    return f'refdata:{db_alias}:version'
+
+
+def _new_version():
+    # Time based, so a version evicted from the cache is never reused
+    return int(time.time() * 1000)
+
+
+def get_cache_version(key):
+    """Version stored at key, created on first use (also core.dashboard_cache)"""
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def bump_cache_version(key, db_alias):
+    """Bump the version at key once db_alias commits (at once outside a transaction)"""
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), timeout=None)
+
+    transaction.on_commit(bump, using=db_alias)
+
+
+def get_reference_version(db_alias=None):
+    return get_cache_version(_version_key(db_alias or get_tenant_db() or 'default'))
+
+
+def bump_reference_version(db_alias):
+    """Invalidate every cached list of one tenant database"""
+    db_alias = db_alias or 'default'
+    bump_cache_version(_version_key(db_alias), db_alias)
+
+
+def _cached_list(name, build):
+    db_alias = get_tenant_db() or 'default'
+    key = f'refdata:{db_alias}:{name}:v{get_reference_version(db_alias)}'
+    data = cache.get(key)
+    if data is None:
+        data = tuple(build())
+        cache.set(key, data, timeout=REFERENCE_CACHE_TIMEOUT)
+    return data
+
+
+def get_active_drugs():
+    return _cached_list('drugs', lambda: Drug.objects.filter(is_active=True).order_by('ad'))
+
+
+def get_regions():
+    return _cached_list('regions', lambda: Region.objects.order_by('name'))
+
+
+def get_cities():
+    return _cached_list('cities', lambda: City.objects.select_related('region').order_by('name'))
+
+
+def get_active_clinics():
+    return _cached_list(
+        'clinics',
+        lambda: Clinic.objects.select_related('city', 'city__region').filter(is_active=True).order_by('name')
+    )
+
+
+def get_specializations():
+    return _cached_list('specializations', lambda: Specialization.objects.order_by('name'))
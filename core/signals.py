@@ -0,0 +1,51 @@
+from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.dashboard_cache import bump_dashboard_version
+from core.models import SyncTombstone
+from core.reference_cache import REFERENCE_MODELS, bump_reference_version
+from core.sync import SYNC_NAMES
+from doctors.models import Doctor
+
+
+def reference_data_deleting(sender, instance, using, **kwargs):
+    """
+    Silinəcək obyektə SET_NULL ilə bağlı sync obyektlərini yenilə
+    (e.g. doctors of a deleted region) - the null update bypasses auto_now
+    """
+    for relation in sender._meta.related_objects:
+        if relation.on_delete is models.SET_NULL and relation.related_model in SYNC_NAMES:
+            relation.related_model._base_manager.using(using).filter(
+                **{relation.field.name: instance}
+            ).update(updated_at=timezone.now())
+
+
+def reference_data_deleted(sender, instance, using, **kwargs):
+    """Sorğu məlumatı silindikdə sync üçün qeyd yarat"""
+    SyncTombstone.objects.using(using).create(model=SYNC_NAMES[sender], object_id=instance.pk)
+
+
+def reference_data_changed(sender, using, **kwargs):
+    """Sorğu siyahıları dəyişdikdə tenant keşini etibarsız et"""
+    bump_reference_version(using)
+    bump_dashboard_version('reference', using)
+
+
+# Only the synced / cached models: a delete receiver without a sender would
+# turn off Django's fast (bulk) deletes for every model in the project
+for model in SYNC_NAMES:
+    pre_delete.connect(reference_data_deleting, sender=model)
+    post_delete.connect(reference_data_deleted, sender=model)
+
+for model in REFERENCE_MODELS:
+    post_save.connect(reference_data_changed, sender=model)
+    post_delete.connect(reference_data_changed, sender=model)
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+def doctor_changed(sender, using, **kwargs):
+    """Həkim dəyişdikdə həkim göstərən dashboard widget-lərini etibarsız et"""
+    bump_dashboard_version('doctors', using)
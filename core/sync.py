@@ -0,0 +1,89 @@
+"""
+Delta sync for reference data (drugs, regions, cities, clinics,
+specializations, doctors)
+- Clients keep the lists locally and only ask for changes since a cursor
+- Changes come from updated_at, deletions from SyncTombstone rows
+"""
+
+from datetime import timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from doctors.models import Doctor
+from drugs.models import Drug
+from regions.models import City, Clinic, Region, Specialization
+
+from .models import SyncTombstone
+
+
+# Rows committed by slower transactions can carry an updated_at slightly
+# older than the cursor handed out meanwhile - re-send this window on
+# every delta (clients upsert by id, so repeats are harmless)
+SYNC_OVERLAP = timedelta(seconds=30)
+
+# name -> (model, fields sent to the client)
+SYNC_MODELS = {
+    'regions': (Region, ('id', 'name', 'code')),
+    'cities': (City, ('id', 'name', 'region_id')),
+    'clinics': (Clinic, ('id', 'name', 'region_id', 'city_id', 'type', 'is_active')),
+    'specializations': (Specialization, ('id', 'name')),
+    'drugs': (Drug, ('id', 'ad', 'tam_ad', 'qiymet', 'komissiya', 'buraxilis_formasi', 'dozaj', 'is_active')),
+    'doctors': (Doctor, (
+        'id', 'code', 'ad', 'telefon', 'gender', 'region_id', 'city_id', 'clinic_id',
+        'ixtisas_id', 'category', 'degree', 'is_active',
+    )),
+}
+
+# model class -> sync name, used by the tombstone signal
+SYNC_NAMES = {model: name for name, (model, _) in SYNC_MODELS.items()}
+
+
+def parse_cursor(value):
+    """Return an aware datetime for a cursor string, None for a full sync"""
+    if not value:
+        return None
+    cursor = parse_datetime(value)
+    if cursor is None:
+        raise ValueError('invalid cursor')
+    if timezone.is_naive(cursor):
+        cursor = timezone.make_aware(cursor, dt_timezone.utc)
+    return cursor
+
+
+def build_sync_payload(cursor=None, names=None):
+    """
+    Collect changes for the requested models.
+
+    cursor: value from a previous response (None = full snapshot).
+    names: subset of SYNC_MODELS keys, defaults to all of them.
+    The returned cursor is taken before reading, so changes made while
+    the payload is built are picked up by the next sync.
+    """
+    names = [name for name in (names or SYNC_MODELS) if name in SYNC_MODELS]
+    next_cursor = timezone.now()
+    since = cursor - SYNC_OVERLAP if cursor else None
+
+    changes = {}
+    for name in names:
+        model, fields = SYNC_MODELS[name]
+        queryset = model.objects.order_by()
+        if since:
+            queryset = queryset.filter(updated_at__gte=since)
+        changes[name] = list(queryset.values(*fields))
+
+    deleted = {name: [] for name in names}
+    if since:
+        tombstones = SyncTombstone.objects.filter(
+            model__in=names,
+            deleted_at__gte=since
+        ).values_list('model', 'object_id')
+        for name, object_id in tombstones:
+            deleted[name].append(object_id)
+
+    return {
+        'cursor': next_cursor.isoformat(),
+        'full': since is None,
+        'changes': changes,
+        'deleted': deleted,
+    }
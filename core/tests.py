@@ -1 +1,211 @@
- 
\ No newline at end of file
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from doctors.models import Doctor, DoctorLedgerEntry
+from doctors.services.ledger import balance_at, post_entries
+from drugs.models import Drug
+from prescriptions.models import Prescription, PrescriptionItem
+from regions.models import Region
+from sales.models import Sale, SaleItem
+from subscription.db_router import clear_tenant_db, set_tenant_db
+from subscription.models import Company, ContractAgreement, Subscription, SubscriptionPlan, UserProfile
+from subscription.utils import get_tenant_db_config
+
+
+# Tenant apps never migrate to 'default'; register a tenant alias the way
+# create_tenant_database() does, before the test databases are set up
+TENANT_DB = 'tenant_core_tests'
+if TENANT_DB not in settings.DATABASES:
+    settings.DATABASES[TENANT_DB] = get_tenant_db_config(TENANT_DB)
+    settings.DATABASES[TENANT_DB]['TEST']['MIGRATE'] = True
+
+
+def create_tenant_user(test):
+    """Company on TENANT_DB with an active enterprise subscription; returns its user"""
+    company = Company.objects.create(name='Test', slug='test', email='test@example.com', db_name=TENANT_DB)
+    plan = SubscriptionPlan.objects.create(
+        name='Enterprise', plan_type='enterprise', description='',
+        price_monthly=Decimal('0'), price_yearly=Decimal('0'),
+    )
+    Subscription.objects.create(
+        company=company, plan=plan, amount=Decimal('0'),
+        end_date=timezone.now() + timedelta(days=30),
+    )
+    user = User.objects.create_user('user', password='secret')
+    UserProfile.objects.create(user=user, company=company)
+    ContractAgreement.objects.create(company=company, user=user, agreed=True)
+
+    set_tenant_db(TENANT_DB)
+    test.addCleanup(clear_tenant_db)
+    return user
+
+
+class DashboardWidgetTests(TestCase):
+    """The dashboard shell and its widgets run a fixed number of queries, however much data there is"""
+
+    databases = {'default', TENANT_DB}
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_tenant_user(self)
+        self.region = Region.objects.create(name='Bakı')
+        self.drug = Drug.objects.create(ad='Drug', tam_ad='Drug', qiymet=Decimal('2.50'), komissiya=Decimal('0.10'))
+        self.client.force_login(self.user)
+
+    def _add_activity(self, days):
+        set_tenant_db(TENANT_DB)  # the middleware clears it after each request
+        today = date.today()
+        # Cache versions are bumped on commit, which TestCase never reaches
+        with self.captureOnCommitCallbacks(using=TENANT_DB, execute=True):
+            doctor = Doctor.objects.create(ad='Həkimova Ayşə', telefon='1', region=self.region)
+            for offset in range(days):
+                day = today - timedelta(days=offset * 11)
+                prescription = Prescription.objects.create(region=self.region, doctor=doctor, date=day)
+                PrescriptionItem.objects.create(
+                    prescription=prescription, drug=self.drug, quantity=2, unit_price=self.drug.qiymet
+                )
+                sale = Sale.objects.create(region=self.region, date=day)
+                SaleItem.objects.create(sale=sale, drug=self.drug, quantity=3, unit_price=self.drug.qiymet)
+
+    def _widget(self, name):
+        response = self.client.get(reverse('core:dashboard_widget', args=[name]))
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def _dashboard_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connections['default']) as master, \
+                CaptureQueriesContext(connections[TENANT_DB]) as tenant:
+            response = self.client.get(reverse('core:dashboard'))
+            self.assertEqual(response.status_code, 200)
+            for name in response.context['dashboard_widgets']:
+                self._widget(name)
+        return len(master), len(tenant)
+
+    def test_query_count_does_not_grow_with_data(self):
+        self._add_activity(days=1)
+        small = self._dashboard_queries()
+
+        self._add_activity(days=40)
+        large = self._dashboard_queries()
+
+        self.assertEqual(small, large)
+        # A handful of tenant queries for all the widgets together
+        self.assertLess(large[1], 15)
+
+    def test_chart_series_are_filled(self):
+        self._add_activity(days=3)
+        daily = self._widget('daily_charts')
+        monthly = self._widget('monthly_charts')
+        self.assertEqual(len(daily['prescriptions']), 30)
+        self.assertEqual(len(monthly['prescriptions']), 12)
+        self.assertEqual(daily['prescriptions'][-1], 1)
+        self.assertEqual(daily['revenue'][-1], 7.5)
+        self.assertEqual(monthly['doctors'][-1], 1)
+
+    def test_shell_runs_no_tenant_queries(self):
+        self._add_activity(days=3)
+        with CaptureQueriesContext(connections[TENANT_DB]) as tenant:
+            response = self.client.get(reverse('core:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(tenant), 0)
+        self.assertIn('region_stats', response.context['dashboard_widgets'])
+
+    def test_widgets_are_cached_until_data_changes(self):
+        self._add_activity(days=1)
+        self.assertEqual(self._widget('summary')['total_prescriptions'], 1)
+        with CaptureQueriesContext(connections[TENANT_DB]) as tenant:
+            self._widget('summary')
+        self.assertEqual(len(tenant), 0)
+
+        self._add_activity(days=2)
+        self.assertEqual(self._widget('summary')['total_prescriptions'], 3)
+        self.assertEqual(self._widget('top_doctors')['doctors'][0]['prescription_count'], 2)
+
+    def test_widgets_follow_the_plan(self):
+        SubscriptionPlan.objects.update(plan_type='basic')
+        response = self.client.get(reverse('core:dashboard_widget', args=['top_doctors']))
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('sales_revenue', self._widget('summary'))
+        self.assertEqual(self.client.get(reverse('core:dashboard_widget', args=['unknown'])).status_code, 404)
+
+
+class StreamingExportTests(TestCase):
+    """CSV rows are produced after the middleware has cleared the tenant database"""
+
+    databases = {'default', TENANT_DB}
+
+    def setUp(self):
+        cache.clear()
+        user = create_tenant_user(self)
+        region = Region.objects.create(name='Bakı')
+        drug = Drug.objects.create(ad='Drug', tam_ad='Drug', qiymet=Decimal('2.50'), komissiya=Decimal('0.10'))
+        doctor = Doctor.objects.create(ad='Həkimova Ayşə', telefon='1', region=region)
+        prescription = Prescription.objects.create(region=region, doctor=doctor, date=date.today())
+        PrescriptionItem.objects.create(prescription=prescription, drug=drug, quantity=4, unit_price=drug.qiymet)
+        sale = Sale.objects.create(region=region, date=date.today())
+        SaleItem.objects.create(sale=sale, drug=drug, quantity=7, unit_price=drug.qiymet)
+        self.doctor = doctor
+        self.client.force_login(user)
+
+    def _csv(self, url_name):
+        response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8').splitlines()
+
+    def test_prescriptions_csv(self):
+        lines = self._csv('prescriptions:export_csv')
+        self.assertEqual(len(lines), 2)
+        self.assertIn(self.doctor.code, lines[1])
+
+    def test_sales_csv(self):
+        lines = self._csv('sales:export_csv')
+        self.assertTrue(any('7' in line.split(',') for line in lines[1:]))
+
+
+class DoctorLedgerTests(TestCase):
+    """Running balances stay right when backdated and current entries are posted together"""
+
+    databases = {'default', TENANT_DB}
+
+    def setUp(self):
+        set_tenant_db(TENANT_DB)
+        self.addCleanup(clear_tenant_db)
+        region = Region.objects.create(name='Bakı')
+        self.doctor = Doctor.objects.create(ad='Həkimova Ayşə', telefon='1', region=region)
+
+    def _balances(self):
+        return list(
+            DoctorLedgerEntry.objects.filter(doctor=self.doctor)
+            .order_by('date', 'id')
+            .values_list('date', 'balance_after')
+        )
+
+    def test_backdated_and_current_entries_in_one_batch(self):
+        post_entries([
+            (self.doctor.id, DoctorLedgerEntry.ACCRUAL, date(2026, 10, 10), Decimal('100'), 'accrual'),
+            (self.doctor.id, DoctorLedgerEntry.PAYMENT, date(2026, 9, 5), Decimal('20'), 'payment:1'),
+        ])
+        # Payment moved from Sep 5 to Oct 15: reversal on the old date, entry on the new one
+        post_entries([
+            (self.doctor.id, DoctorLedgerEntry.PAYMENT, date(2026, 9, 5), Decimal('-20'), 'payment:1'),
+            (self.doctor.id, DoctorLedgerEntry.PAYMENT, date(2026, 10, 15), Decimal('20'), 'payment:1'),
+        ])
+
+        self.assertEqual(self._balances(), [
+            (date(2026, 9, 5), Decimal('20.00')),
+            (date(2026, 9, 5), Decimal('0.00')),
+            (date(2026, 10, 10), Decimal('100.00')),
+            (date(2026, 10, 15), Decimal('120.00')),
+        ])
+        self.assertEqual(balance_at(self.doctor.id, date(2026, 9, 30)), Decimal('0.00'))
+        self.assertEqual(balance_at(self.doctor.id, date(2026, 10, 31)), Decimal('120.00'))
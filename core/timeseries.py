@@ -0,0 +1,102 @@
+"""
+Grouped time series for charts
+- One values(bucket).annotate(...) query per series, whatever the range
+- Buckets are days (TruncDate) or month starts (TruncMonth); buckets
+  without rows are filled with 0 in Python
+- cumulative_counts gives "rows created up to each bucket" from one
+  grouped pass plus one count of the rows before the range
+"""
+
+from datetime import date, timedelta
+
+from django.db.models import Count, DateField, DateTimeField
+from django.db.models.functions import TruncDate, TruncMonth
+
+
+def last_days(today, count):
+    """count dates ending with today, oldest first"""
+    return [today - timedelta(days=offset) for offset in range(count - 1, -1, -1)]
+
+
+def last_months(today, count):
+    """First days of the count months ending with today's month, oldest first"""
+    months = []
+    year, month = today.year, today.month
+    for _ in range(count):
+        months.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months[::-1]
+
+
+def next_month(month_start):
+    if month_start.month == 12:
+        return date(month_start.year + 1, 1, 1)
+    return date(month_start.year, month_start.month + 1, 1)
+
+
+def _model_field(model, path):
+    field = None
+    for name in path.split('__'):
+        field = model._meta.get_field(name)
+        model = field.related_model or model
+    return field
+
+
+def _is_datetime(queryset, field):
+    return isinstance(_model_field(queryset.model, field), DateTimeField)
+
+
+def _bucket_expression(queryset, field, period):
+    if period == 'month':
+        return TruncMonth(field, output_field=DateField())
+    if period == 'day':
+        if not _is_datetime(queryset, field):
+            return None  # already a date - group by the column itself
+        return TruncDate(field)
+    raise ValueError(f'Unknown period: {period}')
+
+
+def _bucket_key(value):
+    # TruncMonth of a datetime can come back as a datetime on some backends
+    return value.date() if hasattr(value, 'date') and callable(value.date) else value
+
+
+def grouped_series(queryset, field, period, buckets, **aggregates):
+    """
+    {alias: [value per bucket]} for aggregates (e.g. total=Count('id')),
+    bucketing queryset by field per day/month. buckets is the ordered
+    list of bucket dates (see last_days / last_months); rows outside them
+    are not fetched.
+    """
+    if not buckets:
+        return {alias: [] for alias in aggregates}
+    end = buckets[-1] + timedelta(days=1) if period == 'day' else next_month(buckets[-1])
+    expression = _bucket_expression(queryset, field, period)
+    group_by = field if expression is None else 'series_bucket'
+
+    lookup = f'{field}__date' if _is_datetime(queryset, field) else field
+    grouped = queryset.filter(**{f'{lookup}__gte': buckets[0], f'{lookup}__lt': end}).order_by()
+    if expression is not None:
+        grouped = grouped.annotate(series_bucket=expression)
+    rows = grouped.values(group_by).annotate(**aggregates).values(group_by, *aggregates)
+
+    found = {_bucket_key(row[group_by]): row for row in rows}
+    return {
+        alias: [(found.get(bucket) or {}).get(alias) or 0 for bucket in buckets]
+        for alias in aggregates
+    }
+
+
+def cumulative_counts(queryset, field, period, buckets):
+    """Number of rows with field before the end of each bucket"""
+    if not buckets:
+        return []
+    lookup = f'{field}__date' if _is_datetime(queryset, field) else field
+    before = queryset.filter(**{f'{lookup}__lt': buckets[0]}).count()
+    per_bucket = grouped_series(queryset, field, period, buckets, total=Count('pk'))['total']
+    counts = []
+    running = before
+    for value in per_bucket:
+        running += value
+        counts.append(running)
+    return counts
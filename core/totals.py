@@ -0,0 +1,73 @@
+"""
+Stored header totals (Prescription / Sale)
+- item_count, total_quantity and total_amount live on the header row
+- They are recomputed from the items with one UPDATE ... = (subquery)
+  statement, inside the transaction that changed the items
+"""
+
+from decimal import Decimal
+
+from django.db.models import (
+    Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce
+
+
+AMOUNT_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
+
+def header_totals_expressions(item_model, fk_name):
+    """
+    Expressions computing the totals of the header referenced by OuterRef('pk').
+    item_model may be a historical model (migrations).
+    """
+    items = (
+        item_model.objects
+        .filter(**{fk_name: OuterRef('pk')})
+        .order_by()
+        .values(fk_name)
+    )
+    return {
+        'item_count': Coalesce(
+            Subquery(items.annotate(value=Count('pk')).values('value'), output_field=IntegerField()),
+            Value(0),
+        ),
+        'total_quantity': Coalesce(
+            Subquery(items.annotate(value=Sum('quantity')).values('value'), output_field=IntegerField()),
+            Value(0),
+        ),
+        'total_amount': Coalesce(
+            Subquery(
+                items.annotate(value=Sum(F('quantity') * F('unit_price'), output_field=AMOUNT_FIELD)).values('value'),
+                output_field=AMOUNT_FIELD,
+            ),
+            Value(Decimal('0.00')),
+            output_field=AMOUNT_FIELD,
+        ),
+    }
+
+
+def refresh_header_totals(header_queryset, item_model, fk_name):
+    """Recompute stored totals for every header in the queryset (single UPDATE)"""
+    return header_queryset.update(**header_totals_expressions(item_model, fk_name))
+
+
+def find_header_total_mismatches(header_queryset, item_model, fk_name):
+    """Ids of headers whose stored totals differ from their items"""
+    expressions = header_totals_expressions(item_model, fk_name)
+    annotated = header_queryset.annotate(
+        expected_item_count=expressions['item_count'],
+        expected_total_quantity=expressions['total_quantity'],
+        expected_total_amount=expressions['total_amount'],
+    ).values_list(
+        'pk', 'item_count', 'total_quantity', 'total_amount',
+        'expected_item_count', 'expected_total_quantity', 'expected_total_amount',
+    )
+    return [
+        row[0] for row in annotated.iterator(chunk_size=2000)
+        if (row[1], row[2], _money(row[3])) != (row[4], row[5], _money(row[6]))
+    ]
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'))
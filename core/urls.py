@@ -10,9 +10,11 @@ urlpatterns = [
     
     # Dashboard & Pages
     path('', views.dashboard, name='dashboard'),
+    path('api/dashboard/<str:widget>/', views.dashboard_widget, name='dashboard_widget'),
     path('notifications/', views.notifications, name='notifications'),
     path('notifications/<int:notification_id>/read/', views.mark_notification_read, name='mark_notification_read'),
     path('api/notifications/count/', views.get_notification_count, name='notification_count'),
+    path('api/sync/', views.sync_reference_data, name='sync_reference_data'),
     path('profile/', views.profile, name='profile'),
     path('settings/', views.settings, name='settings'),
     path('help/', views.help_support, name='help'),
@@ -1,10 +1,14 @@
 from django.contrib import admin
 from django.contrib.auth.decorators import login_required
+from django.utils import timezone
+from django.db.models import F
 from django.utils.decorators import method_decorator
-from .models import Doctor, DoctorPayment
+
+from core.paginators import ScalableAdminMixin
+from .models import Doctor, DoctorLedgerEntry, DoctorPayment
 
 @admin.register(Doctor)
-class DoctorAdmin(admin.ModelAdmin):
+class DoctorAdmin(ScalableAdminMixin, admin.ModelAdmin):
     """
     Doctor Admin - Shows only doctors from the current company's database
     Works with multi-tenant architecture via middleware
@@ -72,17 +76,9 @@ class DoctorAdmin(admin.ModelAdmin):
     )
     
     list_per_page = 25
+    list_select_related = ['region', 'city__region', 'clinic', 'ixtisas']
     date_hierarchy = 'created_at'
     
-    def get_queryset(self, request):
-        """
-        Get doctors from the current tenant's database
-        The middleware sets the correct database context
-        """
-        qs = super().get_queryset(request)
-        qs = qs.select_related('region', 'city', 'clinic', 'ixtisas')
-        return qs
-    
     def has_module_permission(self, request):
         """
         Only show in admin if user is staff/superuser and has a company
@@ -129,23 +125,21 @@ class DoctorAdmin(admin.ModelAdmin):
     
     def activate_doctors(self, request, queryset):
         """Activate selected doctors"""
-        updated = queryset.update(is_active=True)
+        updated = queryset.update(is_active=True, updated_at=timezone.now())
         self.message_user(request, f'{updated} həkim aktivləşdirildi.', level='SUCCESS')
     activate_doctors.short_description = "Seçilmiş həkimləri aktivləşdir"
     
     def deactivate_doctors(self, request, queryset):
         """Deactivate selected doctors"""
-        updated = queryset.update(is_active=False)
+        updated = queryset.update(is_active=False, updated_at=timezone.now())
         self.message_user(request, f'{updated} həkim deaktivləşdirildi.', level='WARNING')
     deactivate_doctors.short_description = "Seçilmiş həkimləri deaktivləşdir"
     
     def calculate_debts(self, request, queryset):
-        """Recalculate debts for selected doctors"""
-        count = 0
-        for doctor in queryset:
-            doctor.calculate_final_debt()
-            doctor.save()
-            count += 1
+        """Recalculate debts for selected doctors (single UPDATE, same formula as calculate_final_debt)"""
+        count = queryset.update(
+            yekun_borc=F('evvelki_borc') + F('hesablanmish_miqdar') - F('silinen_miqdar')
+        )
         self.message_user(request, f'{count} həkimin borcları yenidən hesablandı.', level='SUCCESS')
     calculate_debts.short_description = "Borcları yenidən hesabla"
     
@@ -162,10 +156,30 @@ class DoctorAdmin(admin.ModelAdmin):
 
 
 @admin.register(DoctorPayment)
-class DoctorPaymentAdmin(admin.ModelAdmin):
+class DoctorPaymentAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ('doctor', 'region', 'payment_type', 'amount', 'date', 'created_at')
     list_filter = ('payment_type', 'region', 'date', 'created_at')
     search_fields = ('doctor__ad', 'doctor__code', 'region__name')
     autocomplete_fields = ('doctor', 'region')
+    list_select_related = ('doctor', 'region')
     readonly_fields = ('created_at',)
     ordering = ('-created_at',)
+
+
+@admin.register(DoctorLedgerEntry)
+class DoctorLedgerEntryAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    """Jurnal yalnız əlavə olunur - admin-də ancaq baxış"""
+    list_display = ('doctor', 'entry_type', 'date', 'amount', 'balance_after', 'reference', 'created_at')
+    list_filter = ('entry_type', 'date')
+    search_fields = ('doctor__ad', 'doctor__code', 'reference')
+    list_select_related = ('doctor',)
+    ordering = ('-date', '-id')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,64 @@
+"""
+Doctors REST API
+"""
+
+from django.contrib.auth.decorators import login_required
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from subscription.decorators import subscription_required
+from doctors.services.bulk import bulk_upsert_doctors
+
+
+# Maximum number of rows accepted in one bulk request
+MAX_BULK_DOCTORS = 10000
+
+
+@login_required
+@subscription_required
+@api_view(['POST'])
+def bulk_doctors_api(request):
+    """
+    Create and update many doctors in one request (JSON).
+
+    Expected payload:
+    {
+        "doctors": [
+            {"ad": "Həmidova Ayşə", "region": "Bakı", "ixtisas": "Terapevt",
+             "clinic": "Klinika 1", "degree": "II", "category": "A", "telefon": "..."},
+            {"code": "AB12CD", "telefon": "..."},
+            ...
+        ]
+    }
+
+    region / city / clinic / ixtisas are names (case-insensitive) or ids.
+    A row with a code updates that doctor's given fields; a row without a
+    code creates a doctor. Every row gets a result with status
+    created/updated/error; valid rows are saved even if others fail.
+    """
+    rows = request.data.get('doctors') if isinstance(request.data, dict) else None
+    if not isinstance(rows, list) or not rows:
+        return Response(
+            {'success': False, 'error': 'Həkimlər siyahısı göndərilməlidir.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(rows) > MAX_BULK_DOCTORS:
+        return Response(
+            {'success': False, 'error': f'Bir sorğuda ən çox {MAX_BULK_DOCTORS} həkim göndərilə bilər.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    results = bulk_upsert_doctors(
+        rows,
+        max_doctors=request.company.max_doctors,
+        allow_debt=request.user.is_superuser,
+    )
+
+    return Response({
+        'success': True,
+        'created': sum(1 for result in results if result['status'] == 'created'),
+        'updated': sum(1 for result in results if result['status'] == 'updated'),
+        'errors': sum(1 for result in results if result['status'] == 'error'),
+        'results': results,
+    })
@@ -0,0 +1,56 @@
+"""
+Management command to rebuild doctor activity KPIs
+(prescription_count, last prescription/payment, month_quantity)
+"""
+
+from django.core.management.base import BaseCommand
+from subscription.models import Company
+from subscription.db_router import set_tenant_db, clear_tenant_db
+from doctors.services.stats import REBUILD_CHUNK_SIZE, rebuild_doctor_stats
+import sys
+
+
+class Command(BaseCommand):
+    help = 'Recompute doctor activity KPIs across all tenant databases'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=REBUILD_CHUNK_SIZE,
+            help='Doctors per UPDATE statement',
+        )
+
+    def handle(self, *args, **options):
+        sys.stdout.reconfigure(encoding='utf-8')
+
+        companies = Company.objects.all()
+
+        if not companies.exists():
+            self.stdout.write(self.style.ERROR('No companies found!'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Found {companies.count()} companies\n'))
+
+        total_doctors = 0
+
+        for company in companies:
+            if not company.db_name:
+                self.stdout.write(self.style.WARNING(f'Skipping {company.name} (no database)'))
+                continue
+
+            self.stdout.write(self.style.WARNING(f'\n=== Rebuilding {company.name} ({company.db_name}) ==='))
+
+            # Set tenant database context
+            set_tenant_db(company.db_name)
+
+            try:
+                count = rebuild_doctor_stats(chunk_size=options['chunk_size'])
+                total_doctors += count
+                self.stdout.write(self.style.SUCCESS(f'  [OK] {count} doctors'))
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'  Error: {str(e)}'))
+            finally:
+                clear_tenant_db()
+
+        self.stdout.write(self.style.SUCCESS(f'\n[SUCCESS] Rebuilt KPIs of {total_doctors} doctors'))
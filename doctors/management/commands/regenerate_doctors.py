@@ -3,6 +3,7 @@ import random
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
+from core.codes import DOCTOR_CODE_SEQUENCE, CodeBlock
 from doctors.models import Doctor
 from regions.models import Region
 
@@ -36,6 +37,7 @@ class Command(BaseCommand):
             self.stdout.write(f"Deleted {deleted} doctors.")
 
             created = 0
+            doctor_codes = CodeBlock(DOCTOR_CODE_SEQUENCE, Doctor)
             for region in regions:
                 for index in range(10):
                     first = random.choice(FIRST_NAMES)
@@ -44,6 +46,7 @@ class Command(BaseCommand):
                     degree = DEGREES[index % len(DEGREES)]
 
                     doctor = Doctor.objects.create(
+                        code=next(doctor_codes),
                         ad=f"{first} {last}",
                         telefon=f"+99450{random.randint(1000000, 9999999)}",
                         region=region,
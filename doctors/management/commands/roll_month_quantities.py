@@ -0,0 +1,46 @@
+"""
+Management command to start the new month for doctor month_quantity
+(zeroes the rows last refreshed in an earlier month, see
+doctors.services.stats.roll_month_quantities)
+Usage: python manage.py roll_month_quantities   (from cron, e.g. daily at 00:05;
+       once a month is rolled the run touches no rows)
+"""
+
+from django.core.management.base import BaseCommand
+from subscription.models import Company
+from subscription.db_router import set_tenant_db, clear_tenant_db
+from doctors.services.stats import roll_month_quantities
+import sys
+
+
+class Command(BaseCommand):
+    help = 'Zero last month\'s doctor month_quantity across all tenant databases'
+
+    def handle(self, *args, **options):
+        sys.stdout.reconfigure(encoding='utf-8')
+
+        companies = Company.objects.all()
+
+        if not companies.exists():
+            self.stdout.write(self.style.ERROR('No companies found!'))
+            return
+
+        total_doctors = 0
+
+        for company in companies:
+            if not company.db_name:
+                self.stdout.write(self.style.WARNING(f'Skipping {company.name} (no database)'))
+                continue
+
+            set_tenant_db(company.db_name)
+
+            try:
+                count = roll_month_quantities()
+                total_doctors += count
+                self.stdout.write(self.style.SUCCESS(f'  [OK] {company.name}: {count} doctors rolled'))
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'  [FAILED] {company.name}: {str(e)}'))
+            finally:
+                clear_tenant_db()
+
+        self.stdout.write(self.style.SUCCESS(f'\n[SUCCESS] Rolled {total_doctors} doctors'))
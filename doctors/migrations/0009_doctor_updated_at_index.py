@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0008_gender_auto_from_name'),
+        ('regions', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['updated_at'], name='doctors_doc_updated_dd8582_idx'),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:13
+
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+# Frozen copies of doctors.services.search as of this migration
+AZ_FOLD = str.maketrans({
+    'ə': 'e',
+    'ı': 'i',
+    'ş': 's',
+    'ç': 'c',
+    'ğ': 'g',
+    'ö': 'o',
+    'ü': 'u',
+})
+
+FTS_TABLE = 'doctors_doctor_fts'
+
+SQLITE_INDEX_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"search_text, content='doctors_doctor', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS doctors_doctor_fts_ai AFTER INSERT ON doctors_doctor BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END",
+    f"CREATE TRIGGER IF NOT EXISTS doctors_doctor_fts_ad AFTER DELETE ON doctors_doctor BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END",
+    f"CREATE TRIGGER IF NOT EXISTS doctors_doctor_fts_au AFTER UPDATE OF search_text ON doctors_doctor BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+POSTGRES_INDEX_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS doctors_doctor_search_trgm "
+    "ON doctors_doctor USING gin (search_text gin_trgm_ops)",
+]
+
+
+def build_search_text(ad, code):
+    text = f'{ad or ""} {code or ""}'.replace('İ', 'i').lower().translate(AZ_FOLD)
+    return ' '.join(text.split())
+
+
+def create_search_index(connection):
+    if connection.vendor == 'sqlite':
+        statements = SQLITE_INDEX_SQL
+    elif connection.vendor == 'postgresql':
+        statements = POSTGRES_INDEX_SQL
+    else:
+        return
+    # Tenant apps are not migrated on every database (see TenantDatabaseRouter)
+    if 'doctors_doctor' not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def forwards(apps, schema_editor):
+    """Mövcud həkimlər üçün search_text doldur və axtarış indeksini yarat"""
+    db_alias = schema_editor.connection.alias
+    Doctor = apps.get_model('doctors', 'Doctor')
+
+    batch = []
+    for doctor in Doctor.objects.using(db_alias).only('id', 'ad', 'code').iterator(chunk_size=BATCH_SIZE):
+        doctor.search_text = build_search_text(doctor.ad, doctor.code)
+        batch.append(doctor)
+        if len(batch) >= BATCH_SIZE:
+            Doctor.objects.using(db_alias).bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        Doctor.objects.using(db_alias).bulk_update(batch, ['search_text'])
+
+    create_search_index(schema_editor.connection)
+
+
+def backwards(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS doctors_doctor_fts_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS doctors_doctor_search_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0009_doctor_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=300),
+        ),
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0010_doctor_search_text'),
+        ('regions', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['created_at', 'id'], name='doctors_doc_created_2ccff8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctorpayment',
+            index=models.Index(fields=['doctor', 'date', 'id'], name='doctors_doc_doctor__169ec0_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:28
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_balances(apps, schema_editor):
+    """Cari yekun borcu açılış qalığı kimi jurnala yaz"""
+    Doctor = apps.get_model('doctors', 'Doctor')
+    DoctorLedgerEntry = apps.get_model('doctors', 'DoctorLedgerEntry')
+    db_alias = schema_editor.connection.alias
+    today = datetime.date.today()
+
+    entries = [
+        DoctorLedgerEntry(
+            doctor_id=doctor_id,
+            entry_type='opening',
+            date=today,
+            amount=balance,
+            balance_after=balance,
+            reference='opening',
+        )
+        for doctor_id, balance in (
+            Doctor.objects.using(db_alias)
+            .exclude(yekun_borc=0)
+            .values_list('id', 'yekun_borc')
+            .iterator()
+        )
+    ]
+    DoctorLedgerEntry.objects.using(db_alias).bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0011_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_type', models.CharField(choices=[('opening', 'Açılış qalığı'), ('accrual', 'Hesablanma'), ('commission', 'Komissiya'), ('payment', 'Ödəniş'), ('carry_over', 'Ay bağlanışı')], max_length=20, verbose_name='Növ')),
+                ('date', models.DateField(verbose_name='Tarix')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Məbləğ')),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Qalıq')),
+                ('reference', models.CharField(blank=True, max_length=100, verbose_name='İstinad')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaradılma Tarixi')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='doctors.doctor', verbose_name='Həkim')),
+            ],
+            options={
+                'verbose_name': 'Jurnal Qeydi',
+                'verbose_name_plural': 'Jurnal Qeydləri',
+                'ordering': ['date', 'id'],
+                'indexes': [models.Index(fields=['doctor', 'date', 'id'], name='doctors_doc_doctor__0914d2_idx')],
+            },
+        ),
+        migrations.RunPython(open_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:30
+
+from datetime import date
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_stats(apps, schema_editor):
+    """Mövcud həkimlər üçün göstəriciləri hesabla"""
+    db_alias = schema_editor.connection.alias
+    Doctor = apps.get_model('doctors', 'Doctor')
+    DoctorPayment = apps.get_model('doctors', 'DoctorPayment')
+    Prescription = apps.get_model('prescriptions', 'Prescription')
+    PrescriptionItem = apps.get_model('prescriptions', 'PrescriptionItem')
+
+    # Frozen copy of doctors.services.stats.stats_expressions as of this migration
+    month_start = date.today().replace(day=1)
+    if month_start.month == 12:
+        next_month_start = month_start.replace(year=month_start.year + 1, month=1)
+    else:
+        next_month_start = month_start.replace(month=month_start.month + 1)
+
+    prescriptions = Prescription.objects.filter(doctor_id=OuterRef('pk')).order_by().values('doctor_id')
+    last_payment = DoctorPayment.objects.filter(doctor_id=OuterRef('pk')).order_by('-date', '-id')
+    month_items = (
+        PrescriptionItem.objects
+        .filter(
+            prescription__doctor_id=OuterRef('pk'),
+            prescription__date__gte=month_start,
+            prescription__date__lt=next_month_start,
+        )
+        .order_by()
+        .values('prescription__doctor_id')
+    )
+    Doctor.objects.using(db_alias).update(
+        prescription_count=Coalesce(
+            Subquery(prescriptions.annotate(total=Count('id')).values('total')[:1]), 0
+        ),
+        last_prescription_date=Subquery(prescriptions.annotate(last=Max('date')).values('last')[:1]),
+        last_payment_date=Subquery(last_payment.values('date')[:1]),
+        last_payment_amount=Subquery(last_payment.values('amount')[:1]),
+        month_quantity=Coalesce(
+            Subquery(month_items.annotate(total=Sum('quantity')).values('total')[:1]),
+            0,
+            output_field=IntegerField(),
+        ),
+        stats_month=month_start,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0012_doctor_ledger'),
+        ('regions', '0006_updated_at'),
+        ('prescriptions', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='last_payment_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True, verbose_name='Son Ödəniş Məbləği'),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='last_payment_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Son Ödəniş Tarixi'),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='last_prescription_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Son Resept'),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='month_quantity',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Bu Ay Miqdar'),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='prescription_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Resept Sayı'),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='stats_month',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['prescription_count', 'id'], name='doctors_doc_prescri_896042_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['month_quantity', 'id'], name='doctors_doc_month_q_699048_idx'),
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0013_doctor_stats'),
+        ('regions', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(fields=['stats_month'], name='doctors_doc_stats_m_41cb85_idx'),
+        ),
+    ]
@@ -1,8 +1,7 @@
 from django.db import models
 from django.core.validators import MinLengthValidator, MaxLengthValidator
+from core.codes import DOCTOR_CODE_SEQUENCE, allocate_codes
 from regions.models import Region, City, Clinic, Specialization
-import random
-import string
 
 
 class Doctor(models.Model):
@@ -131,6 +130,26 @@ class Doctor(models.Model):
     # Status
     is_active = models.BooleanField(default=True, verbose_name="Aktiv")
 
+    # Axtarış üçün: ad + kod, Azərbaycan hərfləri sadələşdirilmiş (doctors.services.search)
+    search_text = models.CharField(max_length=300, blank=True, default='', editable=False)
+
+    # Fəaliyyət göstəriciləri - yazılış zamanı yenilənir (doctors.services.stats)
+    prescription_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Resept Sayı")
+    last_prescription_date = models.DateField(null=True, blank=True, editable=False, verbose_name="Son Resept")
+    last_payment_date = models.DateField(null=True, blank=True, editable=False, verbose_name="Son Ödəniş Tarixi")
+    last_payment_amount = models.DecimalField(
+        max_digits=12, decimal_places=2, null=True, blank=True, editable=False, verbose_name="Son Ödəniş Məbləği"
+    )
+    # month_quantity is the quantity prescribed in stats_month (first day of that month)
+    month_quantity = models.PositiveIntegerField(default=0, editable=False, verbose_name="Bu Ay Miqdar")
+    stats_month = models.DateField(null=True, blank=True, editable=False)
+
+    # Written only by doctors.services.stats; a full save() leaves them alone
+    STATS_FIELDS = (
+        'prescription_count', 'last_prescription_date', 'last_payment_date',
+        'last_payment_amount', 'month_quantity', 'stats_month',
+    )
+
     class Meta:
         verbose_name = "Həkim"
         verbose_name_plural = "Həkimlər"
@@ -139,6 +158,14 @@ class Doctor(models.Model):
             models.Index(fields=['code']),
             models.Index(fields=['ad']),
             models.Index(fields=['region', 'city']),
+            models.Index(fields=['updated_at']),
+            # Keyset pagination of the doctor list
+            models.Index(fields=['created_at', 'id']),
+            # Sorting the doctor list / dashboard by activity
+            models.Index(fields=['prescription_count', 'id']),
+            models.Index(fields=['month_quantity', 'id']),
+            # roll_month_quantities finds last month's rows by range
+            models.Index(fields=['stats_month']),
         ]
 
     def __str__(self):
@@ -169,25 +196,40 @@ class Doctor(models.Model):
     def save(self, *args, **kwargs):
         # Auto-generate code if not provided or if it's the default value
         if not self.code or self.code == '000000':
-            self.code = self.generate_unique_code()
+            self.code = self.generate_unique_code(using=kwargs.get('using'))
         # Cinsiyyəti ada görə təyin et (ilk sözün son hərfi: a → Qadın, v → Kişi)
         if self.ad:
             self.gender = Doctor.gender_from_name(self.ad)
         # Auto-calculate yekun_borc (final debt)
         self.calculate_final_debt()
+        # Axtarış mətni (ad/kod dəyişəndə yenilənir)
+        from doctors.services.search import build_search_text
+        self.search_text = build_search_text(self.ad, self.code)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'ad', 'code'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'search_text'}
+        elif update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # Göstəriciləri köhnə nüsxə ilə əvəz etmə (formdan/admindən saxlama)
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.STATS_FIELDS
+            ]
         super().save(*args, **kwargs)
 
-    def generate_unique_code(self):
-        """Generate a unique 6-character code"""
-        while True:
-            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-            if not Doctor.objects.filter(code=code).exists():
-                return code
+    def generate_unique_code(self, using=None):
+        """Allocate a unique 6-character code (see core.codes; use CodeBlock for bulk)"""
+        return allocate_codes(DOCTOR_CODE_SEQUENCE, 1, Doctor, using=using)[0]
 
     def calculate_final_debt(self):
         """Calculate final debt: Previous Debt + Calculated Amount - Deleted Amount"""
         self.yekun_borc = self.evvelki_borc + self.hesablanmish_miqdar - self.silinen_miqdar
 
+    @property
+    def current_month_quantity(self):
+        """month_quantity if it belongs to the current month, else 0"""
+        from doctors.services.stats import current_month_start
+        return self.month_quantity if self.stats_month == current_month_start() else 0
+
     @property
     def full_address(self):
         """Get full address including region, city, and clinic"""
@@ -240,4 +282,48 @@ class DoctorPayment(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['doctor', 'region']),
+            # Keyset pagination of a doctor's payments
+            models.Index(fields=['doctor', 'date', 'id']),
         ]
+
+
+class DoctorLedgerEntry(models.Model):
+    """
+    Həkim maliyyə jurnalı (yalnız əlavə olunur)
+    One typed financial event with its signed effect on the balance and
+    the running balance after it, in (date, id) order. Rows are never
+    edited or deleted; corrections are new entries (see doctors.services.ledger).
+    """
+    OPENING = 'opening'
+    ACCRUAL = 'accrual'
+    COMMISSION = 'commission'
+    PAYMENT = 'payment'
+    CARRY_OVER = 'carry_over'
+
+    ENTRY_TYPES = [
+        (OPENING, 'Açılış qalığı'),
+        (ACCRUAL, 'Hesablanma'),
+        (COMMISSION, 'Komissiya'),
+        (PAYMENT, 'Ödəniş'),
+        (CARRY_OVER, 'Ay bağlanışı'),
+    ]
+
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='ledger_entries', verbose_name="Həkim")
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES, verbose_name="Növ")
+    date = models.DateField(verbose_name="Tarix")
+    amount = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Məbləğ")
+    balance_after = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Qalıq")
+    reference = models.CharField(max_length=100, blank=True, verbose_name="İstinad")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Yaradılma Tarixi")
+
+    class Meta:
+        verbose_name = "Jurnal Qeydi"
+        verbose_name_plural = "Jurnal Qeydləri"
+        ordering = ['date', 'id']
+        indexes = [
+            # Balance at a date: latest entry with date <= D
+            models.Index(fields=['doctor', 'date', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor_id} {self.date} {self.get_entry_type_display()} {self.amount}"
@@ -6,3 +6,68 @@ class DoctorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Doctor
         fields = '__all__'
+
+
+class DoctorBulkSerializer(DoctorSerializer):
+    """
+    One row of the bulk endpoint (doctors.api_views.bulk_upsert_doctors).
+
+    region / city / clinic / ixtisas are given by id or name and resolved
+    through context['lookups'] (doctors.services.bulk.ReferenceLookups),
+    so validating a row never queries the database. code only selects the
+    doctor to update; new doctors get an allocated code.
+    """
+    code = serializers.CharField(required=False, allow_blank=True, max_length=6)
+    region = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    city = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    clinic = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    ixtisas = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+
+    class Meta(DoctorSerializer.Meta):
+        fields = [
+            'code', 'ad', 'telefon', 'email', 'region', 'city', 'clinic', 'ixtisas',
+            'category', 'degree', 'is_active', 'evvelki_borc',
+        ]
+        extra_kwargs = {
+            'telefon': {'required': False, 'allow_blank': True},
+        }
+
+    def validate_evvelki_borc(self, value):
+        # Əvvəlki borcu yalnız superuser dəyişə bilər (add_doctor ilə eyni qayda)
+        if not self.context.get('allow_debt'):
+            raise serializers.ValidationError('Əvvəlki borcu yalnız administrator dəyişə bilər.')
+        return value
+
+    def validate(self, attrs):
+        lookups = self.context['lookups']
+        errors = {}
+
+        region_id = None
+        if 'region' in attrs:
+            region_id = lookups.region(attrs.pop('region'))
+            if region_id is False:
+                errors['region'] = 'Bölgə tapılmadı.'
+            else:
+                attrs['region_id'] = region_id
+
+        for field, resolve, message in (
+            ('city', lookups.city, 'Şəhər tapılmadı.'),
+            ('clinic', lookups.clinic, 'Klinika tapılmadı.'),
+        ):
+            if field in attrs:
+                value_id = resolve(attrs.pop(field), region_id or None)
+                if value_id is False:
+                    errors[field] = message
+                else:
+                    attrs[f'{field}_id'] = value_id
+
+        if 'ixtisas' in attrs:
+            ixtisas_id = lookups.specialization(attrs.pop('ixtisas'))
+            if ixtisas_id is False:
+                errors['ixtisas'] = 'İxtisas tapılmadı.'
+            else:
+                attrs['ixtisas_id'] = ixtisas_id
+
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
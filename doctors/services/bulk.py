@@ -0,0 +1,203 @@
+"""
+Həkimlərin toplu əlavə / yenilənməsi (doctors.api_views.bulk_upsert_doctors)
+- Rows are validated with DoctorBulkSerializer; region / city / clinic /
+  specialization names resolve through dicts loaded once per request
+- Rows with a known code update that doctor (only the given fields),
+  rows without a code create one with a code from a CodeBlock
+- Writes go out per chunk with bulk_create / bulk_update, so thousands of
+  rows cost a handful of queries per chunk
+- The plan's max_doctors is checked once: creates beyond the remaining
+  room are reported as row errors
+"""
+
+from decimal import Decimal
+
+from django.db import router, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from core.codes import DOCTOR_CODE_SEQUENCE, CodeBlock
+from core.dashboard_cache import bump_dashboard_version
+from doctors.models import Doctor
+from doctors.serializers import DoctorBulkSerializer
+from doctors.services.search import build_search_text
+from regions.models import City, Clinic, Region, Specialization
+
+
+BULK_CHUNK_SIZE = 500
+
+ZERO = Decimal('0.00')
+
+
+def _key(value):
+    return str(value).strip().casefold()
+
+
+class ReferenceLookups:
+    """
+    In-memory id lookups for reference names (case-insensitive) or ids.
+    Each method returns the id, None for an empty value, or False when the
+    value matches nothing (or several rows with no region to tell them apart).
+    """
+
+    def __init__(self):
+        self._regions = self._index(Region.objects.values_list('id', 'name'))
+        self._specializations = self._index(Specialization.objects.values_list('id', 'name'))
+        self._cities = self._index_by_region(City.objects.values_list('id', 'name', 'region_id'))
+        self._clinics = self._index_by_region(Clinic.objects.values_list('id', 'name', 'region_id'))
+
+    @staticmethod
+    def _index(rows):
+        ids, names = set(), {}
+        for pk, name in rows:
+            ids.add(pk)
+            names.setdefault(_key(name), []).append(pk)
+        return ids, names
+
+    @staticmethod
+    def _index_by_region(rows):
+        ids, names = {}, {}
+        for pk, name, region_id in rows:
+            ids[pk] = region_id
+            names.setdefault(_key(name), []).append((pk, region_id))
+        return ids, names
+
+    @staticmethod
+    def _resolve(index, value):
+        if value in (None, ''):
+            return None
+        ids, names = index
+        if str(value).isdigit() and int(value) in ids:
+            return int(value)
+        matches = names.get(_key(value), [])
+        return matches[0] if len(matches) == 1 else False
+
+    @staticmethod
+    def _resolve_in_region(index, value, region_id):
+        if value in (None, ''):
+            return None
+        ids, names = index
+        if str(value).isdigit() and int(value) in ids:
+            pk = int(value)
+            return pk if region_id is None or ids[pk] == region_id else False
+        matches = [
+            pk for pk, match_region_id in names.get(_key(value), [])
+            if region_id is None or match_region_id == region_id
+        ]
+        return matches[0] if len(matches) == 1 else False
+
+    def region(self, value):
+        return self._resolve(self._regions, value)
+
+    def specialization(self, value):
+        return self._resolve(self._specializations, value)
+
+    def city(self, value, region_id=None):
+        return self._resolve_in_region(self._cities, value, region_id)
+
+    def clinic(self, value, region_id=None):
+        return self._resolve_in_region(self._clinics, value, region_id)
+
+
+def _validate_row(serializer, row):
+    """(validated attrs, None) or (None, errors)"""
+    if not isinstance(row, dict):
+        return None, {'non_field_errors': ['Yanlış format.']}
+    try:
+        return serializer.run_validation(row), None
+    except serializers.ValidationError as exc:
+        return None, exc.detail
+
+
+def _apply_derived_fields(doctor, attrs):
+    """What Doctor.save() would set; returns the extra field names"""
+    derived = set()
+    if 'ad' in attrs:
+        doctor.gender = Doctor.gender_from_name(doctor.ad)
+        doctor.search_text = build_search_text(doctor.ad, doctor.code)
+        derived |= {'gender', 'search_text'}
+    if 'evvelki_borc' in attrs:
+        doctor.calculate_final_debt()
+        derived.add('yekun_borc')
+    return derived
+
+
+def bulk_upsert_doctors(rows, max_doctors, allow_debt=False, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Create / update doctors from rows (list of dicts).
+    Returns per-row results: {'index', 'status': created/updated/error, 'code', 'errors'}.
+    """
+    context = {'lookups': ReferenceLookups(), 'allow_debt': allow_debt}
+    create_serializer = DoctorBulkSerializer(context=context)
+    update_serializer = DoctorBulkSerializer(context=context, partial=True)
+
+    remaining = max(max_doctors - Doctor.objects.count(), 0)
+    codes = CodeBlock(DOCTOR_CODE_SEQUENCE, Doctor)
+    seen_codes = set()
+    results = []
+    database = router.db_for_write(Doctor)
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        row_codes = {
+            str(row.get('code')).strip().upper()
+            for row in chunk if isinstance(row, dict) and row.get('code')
+        }
+        existing = Doctor.objects.filter(code__in=row_codes).in_bulk(field_name='code') if row_codes else {}
+
+        to_create, to_update, update_fields = [], [], set()
+        for index, row in enumerate(chunk, start=start):
+            result = {'index': index, 'status': 'error', 'code': None}
+            results.append(result)
+
+            code = str(row.get('code')).strip().upper() if isinstance(row, dict) and row.get('code') else ''
+            doctor = existing.get(code) if code else None
+            if code and not doctor:
+                result['errors'] = {'code': ['Bu kodla həkim tapılmadı.']}
+                continue
+            if code in seen_codes:
+                result['errors'] = {'code': ['Kod bu sorğuda təkrarlanır.']}
+                continue
+
+            attrs, errors = _validate_row(update_serializer if doctor else create_serializer, row)
+            if errors:
+                result['errors'] = errors
+                continue
+            attrs.pop('code', None)
+
+            if doctor:
+                seen_codes.add(code)
+                for field, value in attrs.items():
+                    setattr(doctor, field, value)
+                update_fields |= set(attrs) | _apply_derived_fields(doctor, attrs)
+                to_update.append(doctor)
+                result.update(status='updated', code=doctor.code)
+                continue
+
+            if not attrs.get('region_id'):
+                result['errors'] = {'region': ['Bölgə tələb olunur.']}
+                continue
+            if remaining <= 0:
+                result['errors'] = {'non_field_errors': [f'Planınızın {max_doctors} həkim limitinə çatdınız.']}
+                continue
+            remaining -= 1
+
+            # Model defaults are floats; Decimal zeros keep calculate_final_debt() exact
+            attrs.setdefault('evvelki_borc', ZERO)
+            doctor = Doctor(code=next(codes), hesablanmish_miqdar=ZERO, silinen_miqdar=ZERO, **attrs)
+            _apply_derived_fields(doctor, {'ad': doctor.ad, 'evvelki_borc': doctor.evvelki_borc})
+            to_create.append(doctor)
+            result.update(status='created', code=doctor.code)
+
+        with transaction.atomic(using=database):
+            # bulk_create skips Doctor.save(): code, gender, search_text and yekun_borc are set above
+            Doctor.objects.bulk_create(to_create, batch_size=chunk_size)
+            if to_update:
+                now = timezone.now()
+                for doctor in to_update:
+                    doctor.updated_at = now
+                Doctor.objects.bulk_update(to_update, sorted(update_fields | {'updated_at'}), batch_size=chunk_size)
+
+    # bulk_create / bulk_update send no signals
+    bump_dashboard_version('doctors', database)
+    return results
@@ -1,9 +1,11 @@
 from collections import defaultdict
+from datetime import date
 from decimal import Decimal, ROUND_HALF_UP
 
 from django.db.models import Q
 
-from doctors.models import Doctor
+from doctors.models import Doctor, DoctorLedgerEntry
+from doctors.services.ledger import period_entry_date, post_entries
 from prescriptions.models import PrescriptionItem
 from sales.models import SaleItem
 from drugs.models import Drug
@@ -124,8 +126,28 @@ def recalculate_doctor_financials(doctor_ids=None, region_ids=None, month=None,
         effectiveness_map[key] = ratio
         print("Drug:", key[1], "Weighted Total:", weighted_sum, "Sales:", sales_sum, "Effectiveness:", ratio)
 
+    # Jurnal: hesablanma və komissiyanın dəyişməsi (köhnə dəyərə görə fərq)
+    if month and year:
+        entry_date = period_entry_date(year, month)
+        reference = f'recalc:{year}-{month:02d}'
+    else:
+        entry_date = date.today()
+        reference = 'recalc'
+    ledger_entries = []
+
+    def _record_ledger(doctor, old_accrued, old_commission):
+        ledger_entries.append((
+            doctor.id, DoctorLedgerEntry.ACCRUAL, entry_date,
+            doctor.hesablanmish_miqdar - (old_accrued or 0), reference,
+        ))
+        ledger_entries.append((
+            doctor.id, DoctorLedgerEntry.COMMISSION, entry_date,
+            (old_commission or 0) - doctor.silinen_miqdar, reference,
+        ))
+
     for doctor in doctors:
         print("=== CALCULATION STARTED FOR DOCTOR", doctor.id, "===")
+        old_accrued, old_commission = doctor.hesablanmish_miqdar, doctor.silinen_miqdar
         if not doctor.region_id:
             print("Doctor has no region; skipping effectiveness calculations.")
             doctor.hesablanmish_miqdar = Decimal('0')
@@ -136,6 +158,7 @@ def recalculate_doctor_financials(doctor_ids=None, region_ids=None, month=None,
                 "silinen_miqdar",
                 "yekun_borc"
             ])
+            _record_ledger(doctor, old_accrued, old_commission)
             print("=== CALCULATION FINISHED ===")
             continue
 
@@ -166,6 +189,7 @@ def recalculate_doctor_financials(doctor_ids=None, region_ids=None, month=None,
             "silinen_miqdar",
             "yekun_borc"
         ])
+        _record_ledger(doctor, old_accrued, old_commission)
 
         print("UPDATED DOCTOR VALUES:", doctor.id,
               "Effective:", doctor_effective_total,
@@ -176,3 +200,4 @@ def recalculate_doctor_financials(doctor_ids=None, region_ids=None, month=None,
         print("Final Debt:", doctor.yekun_borc)
         print("=== CALCULATION FINISHED ===")
 
+    post_entries(ledger_entries)
@@ -0,0 +1,158 @@
+"""
+Həkim maliyyə jurnalı (DoctorLedgerEntry)
+- Signed amounts: accrual +, commission -, payment + (as in the month
+  close formula), carry_over = whatever pins the balance to the closed
+  report's yekun_borc at the end of that month
+- balance_after is the running balance in (date, id) order, so the
+  balance at any date is one indexed lookup (balance_at)
+- Entries are only appended. An entry dated before a doctor's latest
+  entry (e.g. a payment typed in late) shifts the cached balance_after of
+  the later entries with one UPDATE
+"""
+
+import calendar
+from collections import defaultdict
+from datetime import date as date_cls
+from decimal import Decimal
+
+from django.db import router, transaction
+from django.db.models import F, OuterRef, Subquery
+
+from doctors.models import Doctor, DoctorLedgerEntry
+
+
+ZERO = Decimal('0.00')
+
+
+def _as_amount(value):
+    # Subquery annotations skip the field's quantizing converter on SQLite
+    return Decimal(value).quantize(ZERO) if value is not None else ZERO
+
+
+def period_entry_date(year, month, today=None):
+    """Date for entries of a recalculated month: today, kept inside that month"""
+    today = today or date_cls.today()
+    start = date_cls(year, month, 1)
+    end = date_cls(year, month, calendar.monthrange(year, month)[1])
+    return min(max(today, start), end)
+
+
+def month_end(year, month):
+    return date_cls(year, month, calendar.monthrange(year, month)[1])
+
+
+def balance_at(doctor_id, on_date):
+    """Balance of one doctor at the end of on_date"""
+    balance = (
+        DoctorLedgerEntry.objects
+        .filter(doctor_id=doctor_id, date__lte=on_date)
+        .order_by('-date', '-id')
+        .values_list('balance_after', flat=True)
+        .first()
+    )
+    return balance if balance is not None else ZERO
+
+
+def balances_at(doctor_ids, on_date):
+    """{doctor_id: balance} at the end of on_date (one query)"""
+    latest = (
+        DoctorLedgerEntry.objects
+        .filter(doctor_id=OuterRef('pk'), date__lte=on_date)
+        .order_by('-date', '-id')
+        .values('balance_after')[:1]
+    )
+    rows = (
+        Doctor.objects.filter(id__in=doctor_ids)
+        .annotate(ledger_balance=Subquery(latest))
+        .values_list('id', 'ledger_balance')
+    )
+    return {doctor_id: _as_amount(balance) for doctor_id, balance in rows}
+
+
+def _post_backdated(doctor_id, entry_type, entry_date, amount, reference):
+    entry = DoctorLedgerEntry.objects.create(
+        doctor_id=doctor_id,
+        entry_type=entry_type,
+        date=entry_date,
+        amount=amount,
+        balance_after=balance_at(doctor_id, entry_date) + amount,
+        reference=reference,
+    )
+    DoctorLedgerEntry.objects.filter(doctor_id=doctor_id, date__gt=entry_date).update(
+        balance_after=F('balance_after') + amount
+    )
+    return entry
+
+
+def post_entries(entries):
+    """
+    Append entries given as (doctor_id, entry_type, date, amount, reference).
+    Zero amounts are skipped. Entries dated on or after each doctor's
+    latest entry (the normal case) are written with one bulk_create.
+    """
+    by_doctor = defaultdict(list)
+    for doctor_id, entry_type, entry_date, amount, reference in entries:
+        amount = Decimal(amount or 0)
+        if amount:
+            by_doctor[doctor_id].append((entry_date, entry_type, amount, reference))
+    if not by_doctor:
+        return
+
+    last_entries = DoctorLedgerEntry.objects.filter(doctor_id=OuterRef('pk')).order_by('-date', '-id')
+    with transaction.atomic(using=router.db_for_write(DoctorLedgerEntry)):
+        latest = {
+            doctor_id: (last_date, last_balance)
+            for doctor_id, last_date, last_balance in (
+                Doctor.objects.select_for_update()
+                .filter(id__in=list(by_doctor))
+                .annotate(
+                    last_date=Subquery(last_entries.values('date')[:1]),
+                    last_balance=Subquery(last_entries.values('balance_after')[:1]),
+                )
+                .values_list('id', 'last_date', 'last_balance')
+            )
+        }
+
+        new_entries = []
+        for doctor_id, doctor_entries in by_doctor.items():
+            if doctor_id not in latest:
+                continue  # doctor deleted meanwhile
+            last_date, balance = latest[doctor_id]
+            balance = _as_amount(balance)
+            for entry_date, entry_type, amount, reference in sorted(doctor_entries, key=lambda entry: entry[0]):
+                if last_date is not None and entry_date < last_date:
+                    _post_backdated(doctor_id, entry_type, entry_date, amount, reference)
+                    # The later rows were shifted by amount, so the running balance moves too
+                    balance += amount
+                    continue
+                balance += amount
+                last_date = entry_date
+                new_entries.append(DoctorLedgerEntry(
+                    doctor_id=doctor_id,
+                    entry_type=entry_type,
+                    date=entry_date,
+                    amount=amount,
+                    balance_after=balance,
+                    reference=reference,
+                ))
+
+        DoctorLedgerEntry.objects.bulk_create(new_entries)
+
+
+def carry_over_entries(closing_balances, year, month):
+    """
+    Entries pinning each doctor's balance at the end of year/month to the
+    closed report value: closing_balances is {doctor_id: yekun_borc}
+    """
+    closing_date = month_end(year, month)
+    current = balances_at(list(closing_balances), closing_date)
+    return [
+        (
+            doctor_id,
+            DoctorLedgerEntry.CARRY_OVER,
+            closing_date,
+            Decimal(closing_balance) - current.get(doctor_id, ZERO),
+            f'close:{year}-{month:02d}',
+        )
+        for doctor_id, closing_balance in closing_balances.items()
+    ]
@@ -0,0 +1,140 @@
+"""
+Həkim axtarışı (ad / kod)
+- Doctor.search_text keeps "ad code" folded to plain Latin lower case
+  (ə→e, ı/İ→i, ş→s, ç→c, ğ→g, ö→o, ü→u), so "hekim" finds "Həkim"
+- PostgreSQL: pg_trgm GIN index on search_text, ranked by similarity
+- SQLite: FTS5 trigram table (doctors_doctor_fts) kept in sync by
+  triggers, ranked by bm25
+- Any other backend, or a term shorter than a trigram, falls back to a
+  LIKE scan on search_text
+
+Callers resolve the search to doctor ids first and then filter their own
+querysets by id. Only the index paths (terms of MIN_INDEX_TERM characters
+or more) return a list; the LIKE scan returns an id queryset, so a short
+term becomes a subquery rather than an unbounded IN list.
+"""
+
+from django.db import DatabaseError, connections
+
+from doctors.models import Doctor
+
+
+AZ_FOLD = str.maketrans({
+    'ə': 'e',
+    'ı': 'i',
+    'ş': 's',
+    'ç': 'c',
+    'ğ': 'g',
+    'ö': 'o',
+    'ü': 'u',
+})
+
+FTS_TABLE = 'doctors_doctor_fts'
+
+# Shortest term the trigram indexes can answer
+MIN_INDEX_TERM = 3
+
+SQLITE_INDEX_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"search_text, content='doctors_doctor', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS doctors_doctor_fts_ai AFTER INSERT ON doctors_doctor BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END",
+    f"CREATE TRIGGER IF NOT EXISTS doctors_doctor_fts_ad AFTER DELETE ON doctors_doctor BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); END",
+    f"CREATE TRIGGER IF NOT EXISTS doctors_doctor_fts_au AFTER UPDATE OF search_text ON doctors_doctor BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.id, new.search_text); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+POSTGRES_INDEX_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS doctors_doctor_search_trgm "
+    "ON doctors_doctor USING gin (search_text gin_trgm_ops)",
+]
+
+
+def fold_az(text):
+    """Azərbaycan hərflərini sadə latın kiçik hərflərə çevir"""
+    text = (text or '').replace('İ', 'i').lower().translate(AZ_FOLD)
+    return ' '.join(text.split())
+
+
+def build_search_text(ad, code):
+    return fold_az(f'{ad or ""} {code or ""}')
+
+
+def ensure_search_index(connection):
+    """
+    Create the backend-specific search index if it is missing.
+    Safe to run repeatedly; on SQLite it also restores the triggers that
+    a table rebuild (ALTER via copy) drops.
+    """
+    if connection.vendor == 'sqlite':
+        statements = SQLITE_INDEX_SQL
+    elif connection.vendor == 'postgresql':
+        statements = POSTGRES_INDEX_SQL
+    else:
+        return
+
+    # Tenant apps are not migrated on every database (see TenantDatabaseRouter)
+    if Doctor._meta.db_table not in connection.introspection.table_names():
+        return
+
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def search_doctor_ids(term, limit=None):
+    """
+    Ranked ids of doctors whose name or code contains term, as a list
+    (index paths) or an id queryset to use as a subquery (LIKE scan).
+    Returns None for an empty term (no filtering).
+    """
+    folded = fold_az(term)
+    if not folded:
+        return None
+
+    queryset = Doctor.objects.all()
+    connection = connections[queryset.db]
+
+    if len(folded) >= MIN_INDEX_TERM and connection.vendor == 'sqlite':
+        sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank'
+        params = [_fts_phrase(folded)]
+        if limit:
+            sql += ' LIMIT %s'
+            params.append(limit)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                return [row[0] for row in cursor.fetchall()]
+        except DatabaseError:
+            pass  # FTS table missing (e.g. older tenant DB) - scan instead
+
+    if len(folded) >= MIN_INDEX_TERM and connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        ids = (
+            queryset.filter(search_text__contains=folded)
+            .annotate(rank=TrigramWordSimilarity(folded, 'search_text'))
+            .order_by('-rank', 'ad')
+            .values_list('id', flat=True)
+        )
+        return list(ids[:limit] if limit else ids)
+
+    ids = queryset.filter(search_text__contains=folded).values_list('id', flat=True)
+    # Ordering only matters when the subquery is cut to limit
+    return ids.order_by('ad')[:limit] if limit else ids
+
+
+def filter_by_doctor_search(queryset, term, field='id'):
+    """Filter queryset by doctor search; field is the doctor id lookup (e.g. 'doctor_id')"""
+    ids = search_doctor_ids(term)
+    if ids is None:
+        return queryset
+    return queryset.filter(**{f'{field}__in': ids})
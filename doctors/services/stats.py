@@ -0,0 +1,100 @@
+"""
+Həkim fəaliyyət göstəriciləri (Doctor.prescription_count və s.)
+- Refreshed for the touched doctors inside the writing transaction by
+  the prescription / item / payment signals (and the batch endpoint)
+- One UPDATE per refresh: every column is a correlated subquery over the
+  (doctor, date, id) indexes of Prescription and DoctorPayment, so edits,
+  moves and deletes can never leave the counters drifting
+- month_quantity belongs to stats_month; a doctor not refreshed since the
+  month started had no items written this month, so roll_month_quantities
+  just zeroes those rows (manage.py roll_month_quantities, from cron -
+  request handlers never write it; displays use current_month_quantity)
+"""
+
+from datetime import date
+
+from django.db.models import Count, IntegerField, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from doctors.models import Doctor, DoctorPayment
+from prescriptions.models import Prescription, PrescriptionItem
+
+
+REBUILD_CHUNK_SIZE = 500
+
+
+def current_month_start(today=None):
+    today = today or date.today()
+    return today.replace(day=1)
+
+
+def _next_month_start(month_start):
+    if month_start.month == 12:
+        return month_start.replace(year=month_start.year + 1, month=1)
+    return month_start.replace(month=month_start.month + 1)
+
+
+def stats_expressions(month_start, prescription_model=Prescription, item_model=PrescriptionItem,
+                      payment_model=DoctorPayment):
+    """Doctor.update() values for the KPI columns (models passable for migrations)"""
+    prescriptions = prescription_model.objects.filter(doctor_id=OuterRef('pk')).order_by().values('doctor_id')
+    last_payment = payment_model.objects.filter(doctor_id=OuterRef('pk')).order_by('-date', '-id')
+    month_items = (
+        item_model.objects
+        .filter(
+            prescription__doctor_id=OuterRef('pk'),
+            prescription__date__gte=month_start,
+            prescription__date__lt=_next_month_start(month_start),
+        )
+        .order_by()
+        .values('prescription__doctor_id')
+    )
+    return {
+        'prescription_count': Coalesce(
+            Subquery(prescriptions.annotate(total=Count('id')).values('total')[:1]), 0
+        ),
+        'last_prescription_date': Subquery(prescriptions.annotate(last=Max('date')).values('last')[:1]),
+        'last_payment_date': Subquery(last_payment.values('date')[:1]),
+        'last_payment_amount': Subquery(last_payment.values('amount')[:1]),
+        'month_quantity': Coalesce(
+            Subquery(month_items.annotate(total=Sum('quantity')).values('total')[:1]),
+            0,
+            output_field=IntegerField(),
+        ),
+        'stats_month': month_start,
+    }
+
+
+def refresh_doctor_stats(doctor_ids):
+    """Recompute the activity columns of the given doctors (one UPDATE)"""
+    doctor_ids = {doctor_id for doctor_id in doctor_ids if doctor_id}
+    if not doctor_ids:
+        return 0
+    # A single statement: atomic on its own, and part of the caller's transaction
+    return Doctor.objects.filter(id__in=doctor_ids).update(**stats_expressions(current_month_start()))
+
+
+def roll_month_quantities():
+    """Zero month_quantity of doctors last refreshed in an earlier month"""
+    month_start = current_month_start()
+    # A range on the stats_month index, not !=, so it touches no rows once rolled
+    return (
+        Doctor.objects
+        .filter(Q(stats_month__lt=month_start) | Q(stats_month__isnull=True))
+        .update(month_quantity=0, stats_month=month_start)
+    )
+
+
+def rebuild_doctor_stats(chunk_size=REBUILD_CHUNK_SIZE):
+    """Recompute every doctor in id chunks; returns the number of doctors"""
+    total = 0
+    last_id = 0
+    while True:
+        ids = list(
+            Doctor.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return total
+        refresh_doctor_stats(ids)
+        total += len(ids)
+        last_id = ids[-1]
@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from doctors.models import Doctor, DoctorLedgerEntry, DoctorPayment
+from doctors.services.ledger import post_entries
+from doctors.services.search import ensure_search_index
+from doctors.services.stats import refresh_doctor_stats
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    """
+    SQLite-də cədvəl yenidən qurulanda (ALTER) triggerlər silinir -
+    hər migrate-dən sonra axtarış indeksini bərpa et
+    """
+    if sender.name != 'doctors':
+        return
+    ensure_search_index(connections[using])
+
+
+def _payment_values(payment):
+    """(doctor_id, date, amount) with form strings converted"""
+    return (
+        payment.doctor_id,
+        DoctorPayment._meta.get_field('date').to_python(payment.date),
+        Decimal(str(payment.amount or 0)),
+    )
+
+
+@receiver(pre_save, sender=DoctorPayment)
+def remember_payment_values(sender, instance, **kwargs):
+    """Dəyişiklikdən əvvəlki dəyərlər - jurnalda əks qeyd üçün"""
+    instance._ledger_previous = None
+    if instance.pk:
+        previous = DoctorPayment.objects.filter(pk=instance.pk).values_list('doctor_id', 'date', 'amount').first()
+        instance._ledger_previous = previous
+
+
+@receiver(post_save, sender=DoctorPayment)
+def post_payment_to_ledger(sender, instance, created, **kwargs):
+    doctor_id, payment_date, amount = _payment_values(instance)
+    reference = f'payment:{instance.pk}'
+    previous = getattr(instance, '_ledger_previous', None)
+
+    refresh_doctor_stats([doctor_id, previous[0] if previous else None])
+
+    entries = []
+    if previous and not created:
+        if previous == (doctor_id, payment_date, amount):
+            return
+        old_doctor_id, old_date, old_amount = previous
+        entries.append((old_doctor_id, DoctorLedgerEntry.PAYMENT, old_date, -old_amount, reference))
+    entries.append((doctor_id, DoctorLedgerEntry.PAYMENT, payment_date, amount, reference))
+    post_entries(entries)
+
+
+@receiver(post_delete, sender=DoctorPayment)
+def reverse_payment_in_ledger(sender, instance, origin=None, **kwargs):
+    # Həkim silinəndə jurnal da onunla birlikdə silinir
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is Doctor:
+        return
+    doctor_id, payment_date, amount = _payment_values(instance)
+    refresh_doctor_stats([doctor_id])
+    post_entries([
+        (doctor_id, DoctorLedgerEntry.PAYMENT, payment_date, -amount, f'payment:{instance.pk}'),
+    ])
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, api_views
 
 app_name = 'doctors'
 
@@ -10,5 +10,6 @@ urlpatterns = [
     path('<int:doctor_id>/', views.doctor_detail, name='detail'),
     path('add-payment/', views.add_doctor_payment, name='add_payment'),
     path('get-doctors-by-region/', views.get_doctors_by_region, name='get_doctors_by_region'),
+    path('api/bulk/', api_views.bulk_doctors_api, name='bulk_api'),
 ]
 
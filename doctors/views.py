@@ -1,114 +1,89 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.http import HttpResponse
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from datetime import datetime
 from .models import Doctor, DoctorPayment
-from regions.models import Region, City, Clinic, Specialization
+from regions.models import Region
+from core.paginators import keyset_paginate
+from core.reference_cache import get_active_clinics, get_cities, get_regions, get_specializations
+from doctors.services.ledger import balance_at
+from doctors.services.search import filter_by_doctor_search
+from reports.periods import check_period_open
 from subscription.decorators import subscription_required
 from prescriptions.models import Prescription
 from django.http import JsonResponse
 
 
+DOCTORS_PER_PAGE = 25
+DETAIL_PER_PAGE = 20
+LEDGER_ENTRIES_SHOWN = 10
+
+
+DOCTOR_SORTS = {
+    'new': ('-created_at', '-id'),
+    'code': ('code', 'id'),
+    'name': ('ad', 'id'),
+    'debt': ('-yekun_borc', '-id'),
+    'prescriptions': ('-prescription_count', '-id'),
+    'month': ('-month_quantity', '-id'),
+}
+
+
+def _build_doctor_filters(request):
+    """Read list filters from GET; unknown choices are dropped"""
+    filters = {
+        key: (request.GET.get(key) or '').strip()
+        for key in ('q', 'region', 'ixtisas', 'clinic', 'sort')
+    }
+    # Choice keys are compared as is (one category key ends with a space)
+    filters['category'] = request.GET.get('category') or ''
+    filters['degree'] = request.GET.get('degree') or ''
+    for key in ('region', 'ixtisas', 'clinic'):
+        if not filters[key].isdigit():
+            filters[key] = ''
+    if filters['category'] not in dict(Doctor.CATEGORY_CHOICES):
+        filters['category'] = ''
+    if filters['degree'] not in dict(Doctor.DEGREE_CHOICES):
+        filters['degree'] = ''
+    if filters['sort'] not in DOCTOR_SORTS:
+        filters['sort'] = 'new'
+    return filters
+
+
 @login_required
 @subscription_required
 def doctor_list(request):
     """
-    List all doctors from this company's database with pagination.
-    Shows 25 doctors per page for optimal performance.
+    List doctors with SQL filters (region, specialization, clinic,
+    category, degree, name/code search), sorting and keyset pagination.
+    One query per page, plus one for the search term.
     """
-    from decimal import Decimal, InvalidOperation
-    
-    # Get all doctors with related data
-    # We'll load them one by one to catch Decimal errors
-    try:
-        doctor_ids = Doctor.objects.values_list('id', flat=True).order_by('-created_at')
-        
-        # Safely load doctors and handle Decimal fields
-        doctors_safe = []
-        for doctor_id in doctor_ids:
-            try:
-                doctor = Doctor.objects.select_related(
-                    'region', 'city', 'clinic', 'ixtisas'
-                ).get(id=doctor_id)
-                
-                # Safely convert Decimal fields
-                def safe_decimal(value, default=Decimal('0.00')):
-                    if value is None:
-                        return default
-                    try:
-                        if isinstance(value, str):
-                            return Decimal(str(value).replace(',', '.'))
-                        return Decimal(str(value))
-                    except (InvalidOperation, ValueError, TypeError):
-                        return default
-                
-                # Create a wrapper object that safely handles Decimal fields
-                class SafeDoctor:
-                    def __init__(self, doctor):
-                        self._doctor = doctor
-                        self.id = doctor.id
-                        self.code = doctor.code
-                        self.ad = doctor.ad
-                        self.telefon = doctor.telefon
-                        self.email = doctor.email
-                        self.gender = doctor.gender
-                        self.category = doctor.category
-                        self.degree = doctor.degree
-                        self.is_active = doctor.is_active
-                        self.created_at = doctor.created_at
-                        self.datasiya = doctor.datasiya
-                        self.region = doctor.region
-                        self.city = doctor.city
-                        self.clinic = doctor.clinic
-                        self.ixtisas = doctor.ixtisas
-                        self.evvelki_borc = safe_decimal(doctor.evvelki_borc)
-                        self.hesablanmish_miqdar = safe_decimal(doctor.hesablanmish_miqdar)
-                        self.silinen_miqdar = safe_decimal(doctor.silinen_miqdar)
-                        self.yekun_borc = safe_decimal(doctor.yekun_borc)
-                    
-                    def get_gender_display(self):
-                        return self._doctor.get_gender_display()
-                
-                doctors_safe.append(SafeDoctor(doctor))
-            except Exception:
-                # Skip problematic doctors
-                continue
-        
-        # Pagination - 25 doctors per page
-        paginator = Paginator(doctors_safe, 25)
-        page = request.GET.get('page', 1)
-        
-        try:
-            doctors = paginator.page(page)
-        except PageNotAnInteger:
-            doctors = paginator.page(1)
-        except EmptyPage:
-            doctors = paginator.page(paginator.num_pages)
-            
-    except Exception as e:
-        # If there's an error, return empty list
-        paginator = Paginator([], 25)
-        doctors = paginator.page(1)
-        doctors_safe = []
-    
-    # Get filter options
-    regions = Region.objects.all().order_by('name')
-    specializations = Specialization.objects.all().order_by('name')
-    clinics = Clinic.objects.filter(is_active=True).order_by('name')
-    
-    # Get total count for display
-    total_doctors = len(doctors_safe)
-    
+    filters = _build_doctor_filters(request)
+
+    doctors = Doctor.objects.select_related('region', 'city', 'clinic', 'ixtisas')
+    if filters['region']:
+        doctors = doctors.filter(region_id=filters['region'])
+    if filters['ixtisas']:
+        doctors = doctors.filter(ixtisas_id=filters['ixtisas'])
+    if filters['clinic']:
+        doctors = doctors.filter(clinic_id=filters['clinic'])
+    if filters['category']:
+        doctors = doctors.filter(category=filters['category'])
+    if filters['degree']:
+        doctors = doctors.filter(degree=filters['degree'])
+    doctors = filter_by_doctor_search(doctors, filters['q'])
+
     context = {
-        'doctors': doctors,
-        'total_doctors': total_doctors,
-        'regions': regions,
-        'specializations': specializations,
-        'clinics': clinics,
+        'doctors': keyset_paginate(request, doctors, DOCTOR_SORTS[filters['sort']], per_page=DOCTORS_PER_PAGE),
+        'filters': filters,
+        'regions': get_regions(),
+        'specializations': get_specializations(),
+        'clinics': get_active_clinics(),
+        'categories': Doctor.CATEGORY_CHOICES,
+        'degrees': Doctor.DEGREE_CHOICES,
     }
     
     return render(request, 'doctors/list.html', context)
@@ -207,10 +182,10 @@ def get_add_doctor_context(current_doctors, max_doctors):
         'doctors_count': current_doctors,
         'doctors_limit': max_doctors,
         'remaining': max_doctors - current_doctors,
-        'regions': Region.objects.all().order_by('name'),
-        'cities': City.objects.select_related('region').all().order_by('name'),
-        'clinics': Clinic.objects.select_related('city', 'city__region').filter(is_active=True).order_by('name'),
-        'specializations': Specialization.objects.all().order_by('name'),
+        'regions': get_regions(),
+        'cities': get_cities(),
+        'clinics': get_active_clinics(),
+        'specializations': get_specializations(),
         'genders': Doctor.GENDER_CHOICES,
         'categories': Doctor.CATEGORY_CHOICES,
         'degrees': Doctor.DEGREE_CHOICES,
@@ -238,11 +213,11 @@ def doctor_detail(request, doctor_id):
         messages.error(request, 'Həkim tapılmadı.')
         return redirect('doctors:list')
     
-    # Get all prescriptions for this doctor
-    prescriptions = Prescription.objects.filter(doctor=doctor_id).select_related('region').prefetch_related('items__drug').order_by('-date')
+    # Prescriptions for this doctor (shown a page at a time, see context)
+    prescriptions = Prescription.objects.filter(doctor=doctor_id).select_related('region').prefetch_related('items__drug')
     
-    # Calculate prescription counts
-    total_prescriptions_count = prescriptions.count()
+    # Stored on the doctor (doctors.services.stats), no COUNT over the prescriptions
+    total_prescriptions_count = doctor.prescription_count
     
     # Get current month prescriptions count
     now = timezone.now()
@@ -252,7 +227,7 @@ def doctor_detail(request, doctor_id):
     ).count()
     
     # Get payments for this doctor
-    payments = DoctorPayment.objects.filter(doctor=doctor_id).select_related('region').order_by('-date')
+    payments = DoctorPayment.objects.filter(doctor=doctor_id).select_related('region')
     
     # Calculate total payments amount
     total_payments_amount = payments.aggregate(total=Sum('amount'))['total'] or 0
@@ -262,15 +237,32 @@ def doctor_detail(request, doctor_id):
         date__month=now.month,
         date__year=now.year
     ).aggregate(total=Sum('amount'))['total'] or 0
+
+    # Jurnal üzrə qalıq (istənilən tarixə: ?balance_date=YYYY-MM-DD)
+    balance_date = now.date()
+    if request.GET.get('balance_date'):
+        try:
+            balance_date = datetime.strptime(request.GET['balance_date'], "%Y-%m-%d").date()
+        except ValueError:
+            messages.error(request, "Tarix formatı yanlışdır.")
     
     context = {
         'doctor': doctor,
-        'prescriptions': prescriptions,
+        'prescriptions': keyset_paginate(
+            request, prescriptions, ('-date', '-id'),
+            per_page=DETAIL_PER_PAGE, param='prescriptions_cursor'
+        ),
         'total_prescriptions_count': total_prescriptions_count,
         'current_month_prescriptions_count': current_month_prescriptions,
-        'payments': payments,
+        'payments': keyset_paginate(
+            request, payments, ('-date', '-id'),
+            per_page=DETAIL_PER_PAGE, param='payments_cursor'
+        ),
         'total_payments_amount': total_payments_amount,
         'current_month_payments_amount': current_month_payments,
+        'balance_date': balance_date,
+        'ledger_balance': balance_at(doctor.id, balance_date),
+        'ledger_entries': doctor.ledger_entries.filter(date__lte=balance_date).order_by('-date', '-id')[:LEDGER_ENTRIES_SHOWN],
     }
     
     return render(request, 'doctors/detail.html', context)
@@ -522,8 +514,17 @@ def add_doctor_payment(request):
         amount = request.POST.get("amount")
         date = request.POST.get("date")
 
+        period_error = None
+        if region_id and date:
+            try:
+                period_error = check_period_open(region_id, datetime.strptime(date, "%Y-%m-%d").date())
+            except ValueError:
+                period_error = "Tarix formatı yanlışdır."
+
         if not region_id or not doctor_id or not payment_type or not amount or not date:
             messages.error(request, "Zəhmət olmasa bütün xanaları doldurun.")
+        elif period_error:
+            messages.error(request, period_error)
         else:
             DoctorPayment.objects.create(
                 region_id=region_id,
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0002_remove_drug_istehsalci_remove_drug_olke_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='drug',
+            index=models.Index(fields=['updated_at'], name='drugs_drug_updated_4e997f_idx'),
+        ),
+    ]
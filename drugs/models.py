@@ -78,6 +78,7 @@ class Drug(models.Model):
             models.Index(fields=['ad']),
             models.Index(fields=['buraxilis_formasi']),
             models.Index(fields=['is_active']),
+            models.Index(fields=['updated_at']),
         ]
 
     def __str__(self):
@@ -872,6 +872,7 @@ def import_company_doctors_full_excel(request, company_id):
     from subscription.db_router import set_tenant_db, clear_tenant_db
     from doctors.models import Doctor
     from regions.models import Region, City, Clinic, Specialization
+    from core.codes import DOCTOR_CODE_SEQUENCE, CodeBlock
     from decimal import Decimal, InvalidOperation
 
     # Sütunlar: B=2, C=3, D=4, E=5, F=6, G=7, I=9
@@ -924,6 +925,8 @@ def import_company_doctors_full_excel(request, company_id):
         wb = load_workbook(upload, data_only=True)
         ws = wb.active
         set_tenant_db(company.db_name)
+        # Həkim kodları bloklarla ayrılır (sətir başına sorğu yoxdur)
+        doctor_codes = CodeBlock(DOCTOR_CODE_SEQUENCE, Doctor)
         # Başlıq 1-ci və ya 2-ci sətirdə ola bilər; məlumat 2-ci sətirdən başlayır
         start_row = 2
         for row in range(start_row, ws.max_row + 1):
@@ -989,6 +992,7 @@ def import_company_doctors_full_excel(request, company_id):
             borc = to_decimal(ws.cell(row=row, column=COL_BORCU).value)
 
             Doctor.objects.create(
+                code=next(doctor_codes),
                 ad=hekim_ad,
                 region=region,
                 city=default_city,
@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from core.paginators import ScalableAdminMixin
 from .models import Prescription, PrescriptionItem
 
 
@@ -10,18 +12,22 @@ class PrescriptionItemInline(admin.TabularInline):
 
 
 @admin.register(Prescription)
-class PrescriptionAdmin(admin.ModelAdmin):
-    list_display = ['id', 'region', 'doctor', 'date', 'patient_name', 'drug_count', 'total_amount', 'is_active', 'created_at']
+class PrescriptionAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'region', 'doctor', 'date', 'patient_name', 'item_count', 'total_amount', 'is_active', 'created_at']
+    list_select_related = ['region', 'doctor']
     list_filter = ['region', 'is_active', 'date', 'created_at']
     search_fields = ['region__name', 'doctor__ad', 'patient_name', 'notes']
     list_editable = ['is_active']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['item_count', 'total_quantity', 'total_amount', 'created_at', 'updated_at']
     inlines = [PrescriptionItemInline]
     
     fieldsets = (
         ('Əsas Məlumat', {
             'fields': ('region', 'doctor', 'date', 'patient_name')
         }),
+        ('Yekunlar', {
+            'fields': ('item_count', 'total_quantity', 'total_amount')
+        }),
         ('Qeydlər', {
             'fields': ('notes',)
         }),
@@ -36,8 +42,9 @@ class PrescriptionAdmin(admin.ModelAdmin):
 
 
 @admin.register(PrescriptionItem)
-class PrescriptionItemAdmin(admin.ModelAdmin):
+class PrescriptionItemAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ['prescription', 'drug', 'quantity', 'unit_price', 'total_price', 'dosage']
+    list_select_related = ['prescription__region', 'prescription__doctor', 'drug']
     list_filter = ['prescription__date']
     search_fields = ['drug__ad', 'prescription__doctor__ad']
 
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prescriptions', '0002_prescription_region'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prescription',
+            name='client_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='Müştəri Açarı'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:16
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def _refresh_header_totals(header_queryset, item_model, fk_name):
+    """Frozen copy of core.totals.refresh_header_totals as of this migration"""
+    amount_field = models.DecimalField(max_digits=14, decimal_places=2)
+    items = (
+        item_model.objects
+        .filter(**{fk_name: OuterRef('pk')})
+        .order_by()
+        .values(fk_name)
+    )
+    return header_queryset.update(
+        item_count=Coalesce(
+            Subquery(items.annotate(value=Count('pk')).values('value'), output_field=models.IntegerField()),
+            Value(0),
+        ),
+        total_quantity=Coalesce(
+            Subquery(items.annotate(value=Sum('quantity')).values('value'), output_field=models.IntegerField()),
+            Value(0),
+        ),
+        total_amount=Coalesce(
+            Subquery(
+                items.annotate(value=Sum(F('quantity') * F('unit_price'), output_field=amount_field)).values('value'),
+                output_field=amount_field,
+            ),
+            Value(Decimal('0.00')),
+            output_field=amount_field,
+        ),
+    )
+
+
+def fill_totals(apps, schema_editor):
+    """Mövcud başlıqlar üçün yekunları elementlərdən hesabla"""
+    db_alias = schema_editor.connection.alias
+    Prescription = apps.get_model('prescriptions', 'Prescription')
+    PrescriptionItem = apps.get_model('prescriptions', 'PrescriptionItem')
+    _refresh_header_totals(Prescription.objects.using(db_alias).all(), PrescriptionItem, 'prescription')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prescriptions', '0003_prescription_client_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prescription',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Dərman Sayı'),
+        ),
+        migrations.AddField(
+            model_name='prescription',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='Ümumi Məbləğ'),
+        ),
+        migrations.AddField(
+            model_name='prescription',
+            name='total_quantity',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Ümumi Say'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0011_keyset_indexes'),
+        ('prescriptions', '0004_header_totals'),
+        ('regions', '0006_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prescription',
+            index=models.Index(fields=['doctor', 'date', 'id'], name='prescriptio_doctor__b192da_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+
+from core.totals import refresh_header_totals
 from doctors.models import Doctor
 from drugs.models import Drug
 from regions.models import Region
@@ -48,6 +50,26 @@ class Prescription(models.Model):
     
     # Status
     is_active = models.BooleanField(default=True, verbose_name='Aktiv')
+
+    # Stored totals of the items (kept in sync by prescriptions.signals)
+    item_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Dərman Sayı')
+    total_quantity = models.PositiveIntegerField(default=0, editable=False, verbose_name='Ümumi Say')
+    total_amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        verbose_name='Ümumi Məbləğ'
+    )
+
+    # Client-generated key for idempotent batch submissions (API)
+    client_key = models.CharField(
+        max_length=64,
+        unique=True,
+        blank=True,
+        null=True,
+        verbose_name='Müştəri Açarı'
+    )
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Yaradılıb')
@@ -61,6 +83,8 @@ class Prescription(models.Model):
             models.Index(fields=['-created_at']),
             models.Index(fields=['doctor']),
             models.Index(fields=['date']),
+            # Keyset pagination of a doctor's prescriptions
+            models.Index(fields=['doctor', 'date', 'id']),
         ]
     
     def __str__(self):
@@ -68,15 +92,15 @@ class Prescription(models.Model):
         doctor_name = self.doctor.ad if self.doctor else 'Həkim'
         return f"{region_name} - {doctor_name} - {self.date}"
     
-    @property
-    def total_amount(self):
-        """Calculate total amount for all drugs in prescription"""
-        return sum(item.total_price for item in self.items.all())
-    
     @property
     def drug_count(self):
         """Count of drugs in prescription"""
-        return self.items.count()
+        return self.item_count
+
+    def refresh_totals(self):
+        """Recompute stored totals from the items and reload them"""
+        refresh_header_totals(Prescription.objects.filter(pk=self.pk), PrescriptionItem, 'prescription')
+        self.refresh_from_db(fields=['item_count', 'total_quantity', 'total_amount'])
 
 
 class PrescriptionItem(models.Model):
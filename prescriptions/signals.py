@@ -1,15 +1,28 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
 
-from prescriptions.models import PrescriptionItem
+from core.activity import refresh_daily_activity
+from core.totals import refresh_header_totals
+from prescriptions.models import Prescription, PrescriptionItem
+from doctors.models import Doctor
 from doctors.services.financial_calculator import recalculate_doctor_financials
+from doctors.services.stats import refresh_doctor_stats
+
+
+def _refresh_prescription_totals(prescription_id):
+    """Reseptin saxlanılan yekunlarını (say, miqdar, məbləğ) yenilə"""
+    refresh_header_totals(Prescription.objects.filter(pk=prescription_id), PrescriptionItem, 'prescription')
 
 
 @receiver(post_save, sender=PrescriptionItem)
 def prescription_item_saved(sender, instance, **kwargs):
     """Resept əlavə/dəyişdirildikdə həmin reseptin ayı üçün hesablama et"""
+    _refresh_prescription_totals(instance.prescription_id)
     doctor_id = instance.prescription.doctor_id
     prescription_date = instance.prescription.date
+    refresh_doctor_stats([doctor_id])
+    refresh_daily_activity([prescription_date])
     if doctor_id and prescription_date:
         recalculate_doctor_financials(
             doctor_ids=[doctor_id],
@@ -19,10 +32,16 @@ def prescription_item_saved(sender, instance, **kwargs):
 
 
 @receiver(post_delete, sender=PrescriptionItem)
-def prescription_item_deleted(sender, instance, **kwargs):
+def prescription_item_deleted(sender, instance, origin=None, **kwargs):
     """Resept silindikdə həmin reseptin ayı üçün hesablama et"""
+    # Həkimin özü silinirsə hesablamaya (və jurnal qeydinə) ehtiyac yoxdur
+    if _is_doctor_delete(origin):
+        return
+    _refresh_prescription_totals(instance.prescription_id)
     doctor_id = instance.prescription.doctor_id
     prescription_date = instance.prescription.date
+    refresh_doctor_stats([doctor_id])
+    refresh_daily_activity([prescription_date])
     if doctor_id and prescription_date:
         recalculate_doctor_financials(
             doctor_ids=[doctor_id],
@@ -30,3 +49,45 @@ def prescription_item_deleted(sender, instance, **kwargs):
             year=prescription_date.year
         )
 
+
+def _is_doctor_delete(origin):
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is Doctor
+
+
+@receiver(pre_save, sender=Prescription)
+def remember_prescription_doctor(sender, instance, **kwargs):
+    """Həkim və ya tarix dəyişərsə köhnə həkimin göstəriciləri və köhnə gün də yenilənməlidir"""
+    instance._stats_previous_doctor_id = None
+    instance._activity_previous_date = None
+    if instance.pk:
+        previous = Prescription.objects.filter(pk=instance.pk).values_list('doctor_id', 'date').first()
+        if previous:
+            instance._stats_previous_doctor_id, instance._activity_previous_date = previous
+
+
+@receiver(post_save, sender=Prescription)
+def prescription_saved(sender, instance, **kwargs):
+    refresh_doctor_stats([instance.doctor_id, getattr(instance, '_stats_previous_doctor_id', None)])
+    refresh_daily_activity([instance.date, getattr(instance, '_activity_previous_date', None)])
+
+
+@receiver(post_delete, sender=Prescription)
+def prescription_deleted(sender, instance, origin=None, **kwargs):
+    if _is_doctor_delete(origin):
+        return
+    refresh_doctor_stats([instance.doctor_id])
+    refresh_daily_activity([instance.date])
+
+
+@receiver(pre_delete, sender=Doctor)
+def remember_doctor_prescription_dates(sender, instance, **kwargs):
+    """Həkim silinərkən reseptləri tək-tək yox, günlər üzrə bir dəfə yenilənir"""
+    instance._activity_dates = set(
+        Prescription.objects.filter(doctor=instance).order_by().values_list('date', flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=Doctor)
+def doctor_deleted(sender, instance, **kwargs):
+    refresh_daily_activity(getattr(instance, '_activity_dates', ()))
@@ -6,6 +6,7 @@ app_name = 'prescriptions'
 urlpatterns = [
     path('', views.prescription_list, name='list'),
     path('add/', views.add_prescription, name='add'),
+    path('api/batch/', views.add_prescriptions_batch, name='batch_add'),
     path('api/doctors/<int:region_id>/', views.doctors_by_region, name='doctors_by_region'),
     path('api/last-closed-report/<int:region_id>/', views.get_last_closed_report, name='last_closed_report'),
     path('lists/', views.prescription_list, name='lists'),
@@ -13,6 +14,7 @@ urlpatterns = [
 
     path('monthly/', views.prescription_monthly_report, name='monthly'),
     path('export/', views.export_prescriptions_excel, name='export_excel'),
+    path('export/csv/', views.export_prescriptions_csv, name='export_csv'),
 
 ]
 
@@ -1,26 +1,42 @@
-from collections import OrderedDict
+import json
+import tempfile
+from collections import OrderedDict, namedtuple
 from datetime import datetime
+from decimal import Decimal
 from django.template.loader import render_to_string
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
-from django.db.models import Q
-from django.http import JsonResponse, HttpResponse
+from django.db import IntegrityError, router, transaction
+from django.db.models import DecimalField, F, Max, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from django.http import FileResponse, JsonResponse
 from django.shortcuts import render, redirect
 from django.utils import timezone
+from django.views.decorators.http import require_POST
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 
+from core.activity import refresh_daily_activity
+from core.exports import EXPORT_CHUNK_SIZE, streaming_export_response
+from core.reference_cache import get_active_drugs, get_regions
 from subscription.decorators import subscription_required
 from doctors.models import Doctor, DoctorPayment
+from doctors.services.search import filter_by_doctor_search
+from doctors.services.financial_calculator import recalculate_doctor_financials
+from doctors.services.stats import refresh_doctor_stats
 from drugs.models import Drug
 from regions.models import Region 
 from .models import Prescription, PrescriptionItem
-from reports.models import MonthlyDoctorReport
+from reports.periods import check_period_open, closed_period_message, get_closed_through
 from datetime import date  
 
 
+# Son ödəniş (tarix, məbləğ) - saxlanılan göstəricilərdən
+LastPayment = namedtuple('LastPayment', ['date', 'amount'])
+
+
 @login_required
 @subscription_required
 def add_prescription(request):
@@ -28,7 +44,8 @@ def add_prescription(request):
     
     if request.method == 'POST':
         try:
-            with transaction.atomic():
+            # Tenant database transaction (a bare atomic would bind 'default')
+            with transaction.atomic(using=router.db_for_write(Prescription)):
                 # Get form data
                 region_id = request.POST.get('region_id')
                 doctor_id = request.POST.get('doctor_id')
@@ -66,35 +83,16 @@ def add_prescription(request):
                 
                 # Validate date against last closed report
                 prescription_date = datetime.strptime(date, '%Y-%m-%d').date()
-                last_report = MonthlyDoctorReport.objects.filter(
-                    region_id=region_id
-                ).order_by('-year', '-month').first()
-                
-                if last_report:
-                    # Calculate the next month after last closed report
-                    last_closed_date = date(last_report.year, last_report.month, 1)
-                    # Get first day of next month
-                    if last_report.month == 12:
-                        next_month_date = date(last_report.year + 1, 1, 1)
-                    else:
-                        next_month_date = date(last_report.year, last_report.month + 1, 1)
-                    
-                    # Check if prescription date is before the allowed month
-                    prescription_month_start = date(prescription_date.year, prescription_date.month, 1)
-                    
-                    if prescription_month_start < next_month_date:
-                        messages.error(
-                            request, 
-                            f'Bu bölgə üçün ən son bağlanan hesabat {last_report.month:02d}/{last_report.year} ayıdır. '
-                            f'Qeydiyyat yalnız {next_month_date.month:02d}/{next_month_date.year} ayından başlayaraq əlavə edilə bilər.'
-                        )
-                        return redirect('prescriptions:add')
+                period_error = check_period_open(region_id, prescription_date)
+                if period_error:
+                    messages.error(request, period_error)
+                    return redirect('prescriptions:add')
                 
                 # Create prescription
                 prescription = Prescription.objects.create(
                     region=region,
                     doctor=doctor,
-                    date=date
+                    date=prescription_date
                 )
                 
                 # Add drugs to prescription
@@ -112,6 +110,7 @@ def add_prescription(request):
                         unit_price=drug.qiymet
                     )
                 
+                prescription.refresh_from_db(fields=['item_count'])
                 messages.success(request, f'Resept uğurla əlavə edildi! ({prescription.drug_count} dərman)')
                 return redirect('prescriptions:add')
                 
@@ -127,55 +126,36 @@ def add_prescription(request):
         return redirect('prescriptions:add')
     
     # GET request - show form
-    drugs = Drug.objects.filter(is_active=True).order_by('ad')
-    regions = Region.objects.all().order_by('name')
+    drugs = get_active_drugs()
+    regions = get_regions()
     
-    # Safely load recent prescriptions without accessing problematic Decimal fields
+    # Recent prescriptions: item count is stored on the header, drug names come from one query
     try:
-        recent_prescriptions_qs = Prescription.objects.select_related(
-            'region', 'doctor'
-        ).order_by('-date')[:5]
+        recent_prescriptions_qs = list(
+            Prescription.objects.select_related('region', 'doctor').order_by('-date')[:5]
+        )
+        items_by_prescription = {}
+        items_qs = PrescriptionItem.objects.filter(
+            prescription_id__in=[prescription.id for prescription in recent_prescriptions_qs]
+        ).select_related('drug').only('id', 'prescription_id', 'quantity', 'drug__ad', 'drug__id')
+        for item in items_qs:
+            items_by_prescription.setdefault(item.prescription_id, []).append({
+                'drug': {'ad': item.drug.ad if item.drug else '-'},
+                'quantity': item.quantity or 0,
+            })
         
-        # Convert to list of dicts to avoid accessing PrescriptionItem with invalid Decimal data
-        recent_prescriptions_list = []
-        for prescription in recent_prescriptions_qs:
-            try:
-                # Safely get items count and basic info without loading Decimal fields
-                from django.db.models import Count
-                item_count = PrescriptionItem.objects.filter(
-                    prescription_id=prescription.id
-                ).count()
-                
-                # Get items with only safe fields
-                items_list = []
-                try:
-                    items_qs = PrescriptionItem.objects.filter(
-                        prescription_id=prescription.id
-                    ).select_related('drug').only('id', 'quantity', 'drug__ad', 'drug__id')
-                    
-                    for item in items_qs:
-                        try:
-                            items_list.append({
-                                'drug': {'ad': item.drug.ad if item.drug else '-'},
-                                'quantity': item.quantity or 0,
-                            })
-                        except Exception:
-                            continue
-                except Exception:
-                    pass
-                
-                recent_prescriptions_list.append({
-                    'id': prescription.id,
-                    'date': prescription.date,
-                    'region': prescription.region,
-                    'doctor': prescription.doctor,
-                    'patient_name': getattr(prescription, 'patient_name', None),
-                    'items': items_list,
-                    'item_count': item_count,
-                })
-            except Exception:
-                continue
-        recent_prescriptions = recent_prescriptions_list
+        recent_prescriptions = [
+            {
+                'id': prescription.id,
+                'date': prescription.date,
+                'region': prescription.region,
+                'doctor': prescription.doctor,
+                'patient_name': getattr(prescription, 'patient_name', None),
+                'items': items_by_prescription.get(prescription.id, []),
+                'item_count': prescription.item_count,
+            }
+            for prescription in recent_prescriptions_qs
+        ]
     except Exception:
         recent_prescriptions = []
     
@@ -188,6 +168,210 @@ def add_prescription(request):
     return render(request, 'prescriptions/add.html', context)
 
 
+# Maximum number of prescriptions accepted in one batch request
+MAX_BATCH_SIZE = 200
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_batch_entry(entry, closed_through, doctors_map, drugs_map):
+    """
+    Validate one batch entry.
+    Returns (cleaned, error) - cleaned is (doctor, date, [(drug, quantity)]).
+    """
+    if not isinstance(entry, dict):
+        return None, 'Yanlış format.'
+
+    doctor = doctors_map.get(_to_int(entry.get('doctor_id')))
+    if not doctor:
+        return None, 'Həkim tapılmadı.'
+
+    raw_date = entry.get('date')
+    prescription_date = _parse_date(raw_date) if isinstance(raw_date, str) else None
+    if not prescription_date:
+        return None, 'Tarix yanlışdır.'
+
+    period_error = closed_period_message(closed_through, prescription_date)
+    if period_error:
+        return None, period_error
+
+    quantities = OrderedDict()
+    for item in entry.get('items') or []:
+        if not isinstance(item, dict):
+            return None, 'Yanlış dərman formatı.'
+        drug = drugs_map.get(_to_int(item.get('drug_id')))
+        if not drug:
+            return None, 'Dərman tapılmadı.'
+        try:
+            quantity = int(item.get('quantity') or 0)
+        except (TypeError, ValueError):
+            return None, 'Miqdar yanlışdır.'
+        if quantity < 0:
+            return None, 'Miqdar yanlışdır.'
+        if quantity > 0:
+            quantities[drug.id] = (drug, quantities.get(drug.id, (drug, 0))[1] + quantity)
+
+    if not quantities:
+        return None, 'Ən azı bir dərman üçün miqdar daxil edilməlidir.'
+
+    return (doctor, prescription_date, list(quantities.values())), None
+
+
+@login_required
+@subscription_required
+@require_POST
+def add_prescriptions_batch(request):
+    """
+    Add many prescriptions for one region in a single request (JSON).
+
+    Expected payload:
+    {
+        "region_id": 1,
+        "prescriptions": [
+            {
+                "client_key": "device-uuid-0001",
+                "doctor_id": 5,
+                "date": "2025-11-20",
+                "items": [{"drug_id": 3, "quantity": 2}, ...]
+            },
+            ...
+        ]
+    }
+
+    Every entry gets a result with status created/duplicate/error.
+    Entries whose client_key was already stored are reported as duplicate,
+    so a client can safely resend a batch after a dropped connection.
+    Financial recalculation runs once per affected doctor-month.
+    """
+    try:
+        data = json.loads(request.body)
+    except (TypeError, ValueError):
+        return JsonResponse({'success': False, 'error': 'Yanlış JSON.'}, status=400)
+
+    region_id = data.get('region_id') if isinstance(data, dict) else None
+    entries = data.get('prescriptions') if isinstance(data, dict) else None
+    if not region_id or not isinstance(entries, list) or not entries:
+        return JsonResponse({'success': False, 'error': 'Bölgə və reseptlər göndərilməlidir.'}, status=400)
+    if len(entries) > MAX_BATCH_SIZE:
+        return JsonResponse(
+            {'success': False, 'error': f'Bir sorğuda ən çox {MAX_BATCH_SIZE} resept göndərilə bilər.'},
+            status=400
+        )
+
+    region = Region.objects.filter(id=region_id).first()
+    if not region:
+        return JsonResponse({'success': False, 'error': 'Bölgə tapılmadı.'}, status=404)
+
+    closed_through = get_closed_through(region.id)
+
+    # Load everything the batch refers to with one query per model
+    entry_dicts = [entry for entry in entries if isinstance(entry, dict)]
+    doctors_map = Doctor.objects.filter(
+        region_id=region.id,
+        id__in={_to_int(entry.get('doctor_id')) for entry in entry_dicts} - {None}
+    ).in_bulk()
+    drugs_map = Drug.objects.filter(
+        id__in={
+            _to_int(item.get('drug_id'))
+            for entry in entry_dicts
+            for item in (entry.get('items') or [])
+            if isinstance(item, dict)
+        } - {None}
+    ).in_bulk()
+
+    client_keys = [
+        str(entry['client_key'])[:64] for entry in entry_dicts if entry.get('client_key')
+    ]
+    existing_keys = dict(
+        Prescription.objects.filter(client_key__in=client_keys).values_list('client_key', 'id')
+    )
+
+    results = []
+    pending = []
+    seen_keys = set()
+    for index, entry in enumerate(entries):
+        client_key = str(entry.get('client_key'))[:64] if isinstance(entry, dict) and entry.get('client_key') else None
+        result = {'index': index, 'client_key': client_key}
+        results.append(result)
+
+        if client_key in existing_keys:
+            result.update(status='duplicate', prescription_id=existing_keys[client_key])
+            continue
+        if client_key and client_key in seen_keys:
+            result.update(status='error', error='client_key təkrarlanır.')
+            continue
+
+        cleaned, error = _parse_batch_entry(entry, closed_through, doctors_map, drugs_map)
+        if error:
+            result.update(status='error', error=error)
+            continue
+
+        if client_key:
+            seen_keys.add(client_key)
+        pending.append((result, client_key, cleaned))
+
+    if pending:
+        try:
+            with transaction.atomic(using=router.db_for_write(Prescription)):
+                # bulk_create skips the item signals, so the stored totals are set here
+                prescriptions = Prescription.objects.bulk_create([
+                    Prescription(
+                        region=region,
+                        doctor=doctor,
+                        date=prescription_date,
+                        client_key=client_key,
+                        item_count=len(drug_items),
+                        total_quantity=sum(quantity for _, quantity in drug_items),
+                        total_amount=sum(
+                            (drug.qiymet * quantity for drug, quantity in drug_items), Decimal('0.00')
+                        ),
+                    )
+                    for _, client_key, (doctor, prescription_date, drug_items) in pending
+                ])
+                PrescriptionItem.objects.bulk_create([
+                    PrescriptionItem(
+                        prescription=prescription,
+                        drug=drug,
+                        quantity=quantity,
+                        unit_price=drug.qiymet
+                    )
+                    for prescription, (_, _, (_, _, drug_items)) in zip(prescriptions, pending)
+                    for drug, quantity in drug_items
+                ])
+                refresh_doctor_stats({doctor.id for _, _, (doctor, _, _) in pending})
+                refresh_daily_activity({prescription_date for _, _, (_, prescription_date, _) in pending})
+        except IntegrityError:
+            # Another request stored one of these client keys meanwhile - resending is safe
+            return JsonResponse(
+                {'success': False, 'error': 'Paralel sorğu aşkarlandı, yenidən göndərin.'},
+                status=409
+            )
+
+        for prescription, (result, _, _) in zip(prescriptions, pending):
+            result.update(status='created', prescription_id=prescription.id)
+
+        # bulk_create skips the item signals - recalculate each affected doctor-month once
+        affected = {}
+        for _, _, (doctor, prescription_date, _) in pending:
+            affected.setdefault((prescription_date.year, prescription_date.month), set()).add(doctor.id)
+        for (year, month), doctor_ids in sorted(affected.items()):
+            recalculate_doctor_financials(doctor_ids=doctor_ids, month=month, year=year)
+
+    created = sum(1 for result in results if result['status'] == 'created')
+    return JsonResponse({
+        'success': True,
+        'created': created,
+        'duplicates': sum(1 for result in results if result['status'] == 'duplicate'),
+        'errors': sum(1 for result in results if result['status'] == 'error'),
+        'results': results,
+    })
+
+
 @login_required
 @subscription_required
 def prescription_list(request):
@@ -221,7 +405,7 @@ def prescription_monthly_report(request):
     # Filter by month if provided
     month = request.GET.get('month')
     year = request.GET.get('year')
-    drugs = Drug.objects.filter(is_active=True).order_by('ad')
+    drugs = get_active_drugs()
 
 
     if not month:
@@ -249,11 +433,9 @@ def prescription_monthly_report(request):
             }
 
         for item in p.items.all():
-            drug_name = item.drug.ad
-
             # Count quantity (sum)
-            doctor_summary[doc.id]['drugs'][drug_name] = (
-                doctor_summary[doc.id]['drugs'].get(drug_name, 0) + item.quantity
+            doctor_summary[doc.id]['drugs'][item.drug_id] = (
+                doctor_summary[doc.id]['drugs'].get(item.drug_id, 0) + item.quantity
             )
 
             # Total price
@@ -291,15 +473,13 @@ def doctors_by_region(request, region_id):
 def get_last_closed_report(request, region_id):
     """Get the last closed monthly report for a region"""
     try:
-        # Find the most recent closed report for this region
-        last_report = MonthlyDoctorReport.objects.filter(
-            region_id=region_id
-        ).order_by('-year', '-month').first()
+        # Last closed month of this region (closed-period registry)
+        closed_through = get_closed_through(region_id)
         
-        if last_report:
+        if closed_through:
             return JsonResponse({
-                'last_closed_year': last_report.year,
-                'last_closed_month': last_report.month,
+                'last_closed_year': closed_through.year,
+                'last_closed_month': closed_through.month,
                 'has_closed_report': True
             })
         else:
@@ -373,11 +553,7 @@ def _get_filtered_summary(filters, request=None):
         .filter(region_id=filters['region'])
     )
 
-    if filters['doctor']:
-        doctor_qs = doctor_qs.filter(
-            Q(ad__icontains=filters['doctor']) |
-            Q(code__icontains=filters['doctor'])
-        )
+    doctor_qs = filter_by_doctor_search(doctor_qs, filters['doctor'])
 
     doctor_qs = doctor_qs.order_by('ad')
 
@@ -398,33 +574,48 @@ def _get_filtered_summary(filters, request=None):
 
     doctor_ids = list(doctor_summary.keys())
 
-    prescriptions = (
-        Prescription.objects
-        .select_related('doctor', 'region')
-        .prefetch_related('items__drug')
-        .filter(doctor_id__in=doctor_ids)
-        .order_by('-date')
-    )
-
+    date_filters = {}
     if start_date:
-        prescriptions = prescriptions.filter(date__gte=start_date)
-
+        date_filters['date__gte'] = start_date
     if end_date:
-        prescriptions = prescriptions.filter(date__lte=end_date)
-
-    for prescription in prescriptions:
-        summary = doctor_summary.get(prescription.doctor_id)
-        if not summary:
-            continue
-
-        if prescription.date and (not summary['last_date'] or prescription.date > summary['last_date']):
-            summary['last_date'] = prescription.date
-
-        for item in prescription.items.all():
-            drug_name = item.drug.ad
-            summary['drugs'][drug_name] = summary['drugs'].get(drug_name, 0) + item.quantity
-            summary['total_quantity'] += item.quantity
-            summary['total_amount'] += item.quantity * item.unit_price
+        date_filters['date__lte'] = end_date
+
+    # Last prescription date per doctor - stored on the doctor unless a date range applies
+    if date_filters:
+        last_dates = (
+            Prescription.objects
+            .filter(doctor_id__in=doctor_ids, **date_filters)
+            .values('doctor_id')
+            .annotate(last_date=Max('date'))
+            .values_list('doctor_id', 'last_date')
+            .order_by()
+        )
+        for doctor_id, last_date in last_dates:
+            doctor_summary[doctor_id]['last_date'] = last_date
+    else:
+        for summary in doctor_summary.values():
+            summary['last_date'] = summary['doctor'].last_prescription_date
+
+    # Quantity and amount per doctor/drug
+    drug_totals = (
+        PrescriptionItem.objects
+        .filter(
+            prescription__doctor_id__in=doctor_ids,
+            **{f'prescription__{key}': value for key, value in date_filters.items()}
+        )
+        .values('prescription__doctor_id', 'drug_id')
+        .annotate(
+            drug_quantity=Sum('quantity'),
+            drug_amount=Sum(F('quantity') * F('unit_price'), output_field=DecimalField(max_digits=14, decimal_places=2)),
+        )
+        .values_list('prescription__doctor_id', 'drug_id', 'drug_quantity', 'drug_amount')
+        .order_by()
+    )
+    for doctor_id, drug_id, quantity, amount in drug_totals:
+        summary = doctor_summary[doctor_id]
+        summary['drugs'][drug_id] = quantity
+        summary['total_quantity'] += quantity
+        summary['total_amount'] += amount or 0
 
     summary_list = list(doctor_summary.values())
     _attach_last_payments(summary_list)
@@ -438,6 +629,32 @@ def _get_filtered_summary(filters, request=None):
     return summary_list, stats
 
 
+def _get_last_payments_map(doctor_ids, limit=1):
+    """
+    Latest `limit` payments per doctor with a single windowed query.
+    doctor_ids may be a list or a values('doctor_id') subquery.
+    """
+    ranked = (
+        DoctorPayment.objects
+        .filter(doctor_id__in=doctor_ids)
+        .annotate(
+            payment_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('doctor_id')],
+                order_by=[F('date').desc(), F('created_at').desc(), F('id').desc()],
+            )
+        )
+        .filter(payment_rank__lte=limit)
+        .only('id', 'doctor_id', 'date', 'amount', 'payment_type', 'created_at')
+        .order_by('doctor_id', 'payment_rank')
+    )
+
+    payments_map = {}
+    for payment in ranked:
+        payments_map.setdefault(payment.doctor_id, []).append(payment)
+    return payments_map
+
+
 def _attach_last_payments(summary_list, limit=1):
     if not summary_list:
         return
@@ -446,31 +663,30 @@ def _attach_last_payments(summary_list, limit=1):
     if not doctor_ids:
         return
 
-    payments_map = {doctor_id: [] for doctor_id in doctor_ids}
-    payments = (
-        DoctorPayment.objects
-        .select_related('doctor')
-        .filter(doctor_id__in=doctor_ids)
-        .order_by('doctor_id', '-date', '-created_at')
-    )
+    if limit == 1:
+        # Son ödəniş həkimin özündə saxlanılır (doctors.services.stats)
+        for entry in summary_list:
+            entry['last_payments'] = _stored_last_payment(entry['doctor'])
+        return
 
-    for payment in payments:
-        bucket = payments_map.get(payment.doctor_id)
-        if bucket is None:
-            continue
-        if len(bucket) < limit:
-            bucket.append(payment)
+    payments_map = _get_last_payments_map(doctor_ids, limit=limit)
 
     for entry in summary_list:
         entry['last_payments'] = payments_map.get(entry['doctor'].id, [])
 
 
+def _stored_last_payment(doctor):
+    if doctor.last_payment_date is None:
+        return []
+    return [LastPayment(doctor.last_payment_date, doctor.last_payment_amount or 0)]
+
+
 def _get_regions():
-    return Region.objects.order_by('name')
+    return get_regions()
 
 
 def _get_drugs():
-    return Drug.objects.filter(is_active=True).order_by('ad')
+    return get_active_drugs()
 
 
 def _get_selected_region_label(filters, region_lookup):
@@ -487,89 +703,161 @@ def _get_last_payments(doctor):
     return []
 
 
+def _filter_export_prescriptions(prescriptions, filters):
+    """Apply list filters to an export queryset (Excel and CSV share this)"""
+    if filters['region']:
+        prescriptions = prescriptions.filter(region_id=filters['region'])
+
+    start_date = _parse_date(filters['start_date'])
+    if start_date:
+        prescriptions = prescriptions.filter(date__gte=start_date)
+
+    end_date = _parse_date(filters['end_date'])
+    if end_date:
+        prescriptions = prescriptions.filter(date__lte=end_date)
+
+    prescriptions = filter_by_doctor_search(prescriptions, filters['doctor'], 'doctor_id')
+
+    return prescriptions.order_by('-date', '-created_at')
+
+
+def _format_last_payment(payment):
+    if not payment:
+        return '-'
+    return f"{payment.date.strftime('%d.%m.%Y')} {float(payment.amount):.2f} ₼"
+
+
+def _iter_export_prescriptions(prescriptions, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Walk filtered prescriptions newest first in keyset chunks.
+
+    Yields (row, quantities) where row holds the header columns and
+    quantities is {drug_id: quantity}; prescriptions without items are
+    skipped. Each chunk costs two queries (headers, then their items),
+    so memory stays bounded by chunk_size regardless of the date range.
+    """
+    base = prescriptions.order_by('-date', '-created_at', '-id').values(
+        'id', 'date', 'created_at', 'doctor_id', 'doctor__code', 'region__name'
+    )
+
+    last = None
+    while True:
+        chunk_qs = base
+        if last is not None:
+            chunk_qs = chunk_qs.filter(
+                Q(date__lt=last['date']) |
+                Q(date=last['date'], created_at__lt=last['created_at']) |
+                Q(date=last['date'], created_at=last['created_at'], id__lt=last['id'])
+            )
+        chunk = list(chunk_qs[:chunk_size])
+        if not chunk:
+            break
+
+        quantities_map = {}
+        items = PrescriptionItem.objects.filter(
+            prescription_id__in=[row['id'] for row in chunk]
+        ).values_list('prescription_id', 'drug_id', 'quantity')
+        for prescription_id, drug_id, quantity in items:
+            quantities_map.setdefault(prescription_id, {})[drug_id] = quantity
+
+        for row in chunk:
+            quantities = quantities_map.get(row['id'])
+            if quantities:
+                yield row, quantities
+
+        if len(chunk) < chunk_size:
+            break
+        last = chunk[-1]
+
+
+def _get_export_payments_map(prescriptions):
+    """Last payment per doctor appearing in the export (one query on stored KPIs)"""
+    doctor_ids = prescriptions.order_by().values('doctor_id')
+    return {
+        doctor_id: LastPayment(payment_date, amount or 0)
+        for doctor_id, payment_date, amount in (
+            Doctor.objects
+            .filter(id__in=doctor_ids, last_payment_date__isnull=False)
+            .values_list('id', 'last_payment_date', 'last_payment_amount')
+        )
+    }
+
+
+@login_required
+@subscription_required
+def export_prescriptions_csv(request):
+    """
+    Stream prescriptions as CSV/TSV (same columns as the Excel export).
+    ?format=tsv switches the delimiter, ?gzip=1 compresses the transfer.
+    """
+    filters = _build_filters(request)
+    prescriptions = _filter_export_prescriptions(Prescription.objects.all(), filters)
+
+    drugs_list = [(drug.id, drug.ad) for drug in get_active_drugs()]
+
+    def rows():
+        payments_map = _get_export_payments_map(prescriptions)
+
+        yield ['№', 'Bölgə', 'Son Ödəniş', 'Kod'] + [name for _, name in drugs_list] + ['Cem']
+
+        for row_num, (row, quantities) in enumerate(_iter_export_prescriptions(prescriptions), start=1):
+            yield (
+                [
+                    row_num,
+                    row['region__name'] or '-',
+                    _format_last_payment(payments_map.get(row['doctor_id'])),
+                    row['doctor__code'] or '-',
+                ]
+                + [quantities.get(drug_id) or '' for drug_id, _ in drugs_list]
+                + [sum(quantities.values())]
+            )
+
+    return streaming_export_response(request, rows(), 'Resept_Qeydiyyatlari')
+
+
 @login_required
 @subscription_required
 def export_prescriptions_excel(request):
     """
-    Export prescriptions to Excel file with formatting
+    Export prescriptions to Excel file with formatting.
+    Rows are streamed through a write-only workbook into a temporary file,
+    so memory does not grow with the number of prescriptions.
     """
-    # Get filters from request
     filters = _build_filters(request)
-    
-    # Get filtered prescriptions
-    prescriptions = Prescription.objects.select_related(
-        'doctor', 'region'
-    ).prefetch_related('items__drug').all()
-    
-    # Apply filters
-    if filters['region']:
-        prescriptions = prescriptions.filter(region_id=filters['region'])
-    
-    if filters['start_date']:
-        try:
-            start_date = datetime.strptime(filters['start_date'], '%Y-%m-%d').date()
-            prescriptions = prescriptions.filter(date__gte=start_date)
-        except ValueError:
-            pass
-    
-    if filters['end_date']:
-        try:
-            end_date = datetime.strptime(filters['end_date'], '%Y-%m-%d').date()
-            prescriptions = prescriptions.filter(date__lte=end_date)
-        except ValueError:
-            pass
-    
-    if filters['doctor']:
-        prescriptions = prescriptions.filter(
-            Q(doctor__ad__icontains=filters['doctor']) |
-            Q(doctor__code__icontains=filters['doctor'])
-        )
-    
-    prescriptions = prescriptions.order_by('-date', '-created_at')
-    
+    prescriptions = _filter_export_prescriptions(Prescription.objects.all(), filters)
+
     # Get ALL active drugs (not just from prescriptions) - so new drugs automatically get columns
-    all_drugs = Drug.objects.filter(is_active=True).order_by('ad')
-    drugs_list = [(drug.id, drug.ad) for drug in all_drugs]
-    drug_columns = {drug_id: idx for idx, (drug_id, _) in enumerate(drugs_list, start=5)}
-    
-    # Get last payments for all doctors
-    doctor_ids = list(set(prescriptions.values_list('doctor_id', flat=True)))
-    payments_map = {}
-    if doctor_ids:
-        from doctors.models import DoctorPayment
-        # Get the most recent payment for each doctor
-        for doctor_id in doctor_ids:
-            last_payment = (
-                DoctorPayment.objects
-                .filter(doctor_id=doctor_id)
-                .order_by('-date', '-created_at')
-                .first()
-            )
-            if last_payment:
-                payments_map[doctor_id] = last_payment
-    
-    # Create workbook and worksheet
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Resept Qeydiyyatları"
-    
+    drugs_list = [(drug.id, drug.ad) for drug in get_active_drugs()]
+
+    # Last payment for every doctor in the export - single query
+    payments_map = _get_export_payments_map(prescriptions)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Resept Qeydiyyatları")
+
     # Define styles
     header_font = Font(name='Arial', size=12, bold=True, color='FFFFFF')
     header_fill = PatternFill(start_color='4F81BD', end_color='4F81BD', fill_type='solid')
     header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    
+
     cell_font = Font(name='Arial', size=11)
     cell_alignment = Alignment(horizontal='left', vertical='center')
     number_alignment = Alignment(horizontal='right', vertical='center')
-    date_alignment = Alignment(horizontal='center', vertical='center')
-    
+
     border = Border(
         left=Side(style='thin', color='000000'),
         right=Side(style='thin', color='000000'),
         top=Side(style='thin', color='000000'),
         bottom=Side(style='thin', color='000000')
     )
-    
+
+    def styled(value, alignment=cell_alignment):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = cell_font
+        cell.alignment = alignment
+        cell.border = border
+        return cell
+
     # Define fixed column headers
     fixed_headers = [
         ('№', 6),
@@ -577,111 +865,50 @@ def export_prescriptions_excel(request):
         ('Son Ödəniş', 15),
         ('Kod', 12),
     ]
-    
-    # Add drug columns
     drug_headers = [(drug_name, 15) for _, drug_name in drugs_list]
-    
-    # Add Cem column at the end
     all_headers = fixed_headers + drug_headers + [('Cem', 12)]
-    
-    # Write headers
-    for col_num, (header, width) in enumerate(all_headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.value = header
+
+    # Column widths and frozen header must be set before the first row is written
+    for col_num, (_, width) in enumerate(all_headers, 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = width
+    ws.freeze_panes = 'A2'
+
+    header_row = []
+    for header, _ in all_headers:
+        cell = WriteOnlyCell(ws, value=header)
         cell.font = header_font
         cell.fill = header_fill
         cell.alignment = header_alignment
         cell.border = border
-        ws.column_dimensions[get_column_letter(col_num)].width = width
-    
+        header_row.append(cell)
+    ws.append(header_row)
+
     # Write data - one row per prescription
-    row_num = 2
-    prescription_num = 1
-    
-    for prescription in prescriptions:
-        # Get all items for this prescription
-        items = prescription.items.all()
-        
-        if not items:
-            continue  # Skip prescriptions without items
-        
-        # Get last payment for this doctor
-        last_payment = payments_map.get(prescription.doctor_id)
-        last_payment_str = '-'
-        if last_payment:
-            last_payment_str = f"{last_payment.date.strftime('%d.%m.%Y')} {float(last_payment.amount):.2f} ₼"
-        
-        # Create a dictionary for drug quantities in this prescription
-        prescription_drugs = {}
-        total_quantity = 0
-        for item in items:
-            if item.drug:
-                drug_id = item.drug.id
-                quantity = item.quantity
-                prescription_drugs[drug_id] = quantity
-                total_quantity += quantity
-        
-        # Write one row per prescription
-        # № (Column 1)
-        cell = ws.cell(row=row_num, column=1)
-        cell.value = prescription_num
-        cell.font = cell_font
-        cell.alignment = cell_alignment
-        cell.border = border
-        
-        # Bölgə (Column 2)
-        cell = ws.cell(row=row_num, column=2)
-        cell.value = prescription.region.name if prescription.region else '-'
-        cell.font = cell_font
-        cell.alignment = cell_alignment
-        cell.border = border
-        
-        # Son Ödəniş (Column 3)
-        cell = ws.cell(row=row_num, column=3)
-        cell.value = last_payment_str
-        cell.font = cell_font
-        cell.alignment = cell_alignment
-        cell.border = border
-        
-        # Kod (Column 4)
-        cell = ws.cell(row=row_num, column=4)
-        cell.value = prescription.doctor.code if prescription.doctor else '-'
-        cell.font = cell_font
-        cell.alignment = cell_alignment
-        cell.border = border
-        
-        # Write drug quantities in their respective columns
-        for drug_id, col_num in drug_columns.items():
-            quantity = prescription_drugs.get(drug_id, 0)
-            cell = ws.cell(row=row_num, column=col_num)
-            cell.value = quantity if quantity > 0 else ''
-            cell.font = cell_font
-            cell.alignment = number_alignment
-            cell.border = border
-        
-        # Cem (Last column) - total quantity
-        cem_col = len(all_headers)
-        cell = ws.cell(row=row_num, column=cem_col)
-        cell.value = total_quantity
-        cell.font = cell_font
-        cell.alignment = number_alignment
-        cell.border = border
-        
-        row_num += 1
-        prescription_num += 1
-    
-    # Freeze first row
-    ws.freeze_panes = 'A2'
-    
-    # Create HTTP response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    for row_num, (row, quantities) in enumerate(_iter_export_prescriptions(prescriptions), start=1):
+        cells = [
+            styled(row_num),
+            styled(row['region__name'] or '-'),
+            styled(_format_last_payment(payments_map.get(row['doctor_id']))),
+            styled(row['doctor__code'] or '-'),
+        ]
+        for drug_id, _ in drugs_list:
+            quantity = quantities.get(drug_id, 0)
+            cells.append(styled(quantity if quantity > 0 else '', number_alignment))
+        cells.append(styled(sum(quantities.values()), number_alignment))
+        ws.append(cells)
+
+    # Spool the workbook to disk and stream it back
+    output = tempfile.TemporaryFile()
+    wb.save(output)
+    output.seek(0)
+
     filename = f'Resept_Qeydiyyatlari_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb.save(response)
-    return response
+    return FileResponse(
+        output,
+        as_attachment=True,
+        filename=filename,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
 
 
 
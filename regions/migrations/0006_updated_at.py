@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('regions', '0005_clinic_address_optional'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Yenilənib'),
+        ),
+        migrations.AddField(
+            model_name='clinic',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Yenilənib'),
+        ),
+        migrations.AddField(
+            model_name='region',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Yenilənib'),
+        ),
+        migrations.AddField(
+            model_name='specialization',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Yenilənib'),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
-import random
-import string
+
+from core.codes import REGION_CODE_SEQUENCE, allocate_codes
 
 
 class Region(models.Model):
@@ -13,6 +13,7 @@ class Region(models.Model):
         verbose_name="Bölgə Kodu",
         help_text="Unikal kod (avtomatik yaradılır)"
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Yenilənib")
 
     class Meta:
         verbose_name = "Bölgə"
@@ -25,28 +26,26 @@ class Region(models.Model):
     def save(self, *args, **kwargs):
         # Auto-generate code if not provided
         if not self.code:
-            self.code = self.generate_unique_code()
+            self.code = self.generate_unique_code(using=kwargs.get('using'))
         super().save(*args, **kwargs)
 
-    def generate_unique_code(self):
+    def generate_unique_code(self, using=None):
         """Generate a unique code for the region"""
         # Try to create code from name first (first 3-4 letters uppercase)
         if self.name:
             base_code = ''.join(c for c in self.name.upper() if c.isalnum())[:4]
-            if base_code and not Region.objects.filter(code=base_code).exists():
+            if base_code and not Region.objects.db_manager(using).filter(code=base_code).exists():
                 return base_code
         
-        # If name-based code exists or name is empty, generate random code
-        while True:
-            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-            if not Region.objects.filter(code=code).exists():
-                return code
+        # If name-based code exists or name is empty, allocate one (see core.codes)
+        return allocate_codes(REGION_CODE_SEQUENCE, 1, Region, using=using)[0]
 
 
 class City(models.Model):
     """Şəhər (City) Model"""
     name = models.CharField(max_length=100, verbose_name="Şəhər Adı")
     region = models.ForeignKey(Region, on_delete=models.CASCADE, related_name='cities', verbose_name="Bölgə")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Yenilənib")
 
     class Meta:
         verbose_name = "Şəhər"
@@ -76,6 +75,8 @@ class Clinic(models.Model):
         verbose_name="Növ"
     )
     is_active = models.BooleanField(default=True, verbose_name="Aktiv")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Yenilənib")
+
     class Meta:
         verbose_name = "Klinika"
         verbose_name_plural = "Klinikalar"
@@ -88,6 +89,7 @@ class Clinic(models.Model):
 class Specialization(models.Model):
     """İxtisas (Specialization) Model"""
     name = models.CharField(max_length=200, verbose_name="İxtisas Adı")
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Yenilənib")
 
     class Meta:
         verbose_name = "İxtisas"
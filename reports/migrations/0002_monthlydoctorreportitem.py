@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('drugs', '0002_remove_drug_istehsalci_remove_drug_olke_and_more'),
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyDoctorReportItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('drug', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_report_items', to='drugs.drug')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='reports.monthlydoctorreport')),
+            ],
+            options={
+                'verbose_name': 'Aylıq Hesabat Dərmanı',
+                'verbose_name_plural': 'Aylıq Hesabat Dərmanları',
+                'unique_together': {('report', 'drug')},
+            },
+        ),
+    ]
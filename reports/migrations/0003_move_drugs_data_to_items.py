@@ -0,0 +1,110 @@
+from django.db import migrations
+
+
+BATCH_SIZE = 1000
+
+# Unmatched entries shown in the error
+UNRESOLVED_SHOWN = 50
+
+
+def forwards(apps, schema_editor):
+    """
+    drugs_data ({"dərman adı": say}) → MonthlyDoctorReportItem (drug_id ilə).
+    Reports only read the items, so a name that matches no drug (or a
+    quantity that is not a number) stops the migration, listing them;
+    fix drugs_data or add the drug, then migrate again.
+    """
+    db_alias = schema_editor.connection.alias
+    Drug = apps.get_model('drugs', 'Drug')
+    MonthlyDoctorReport = apps.get_model('reports', 'MonthlyDoctorReport')
+    MonthlyDoctorReportItem = apps.get_model('reports', 'MonthlyDoctorReportItem')
+
+    # Eyni adlı bir neçə dərman varsa, ən köhnəsi götürülür
+    drug_ids_by_name = {}
+    for drug_id, name in Drug.objects.using(db_alias).order_by('-id').values_list('id', 'ad'):
+        drug_ids_by_name[name] = drug_id
+
+    reports = (
+        MonthlyDoctorReport.objects.using(db_alias)
+        .exclude(drugs_data={})
+        .only('id', 'doctor_id', 'year', 'month', 'drugs_data')
+    )
+
+    items = []
+    unresolved_rows = []
+    for report in reports.iterator(chunk_size=BATCH_SIZE):
+        unresolved = {}
+        quantities = {}
+        for name, quantity in (report.drugs_data or {}).items():
+            try:
+                quantity = int(quantity or 0)
+            except (TypeError, ValueError):
+                unresolved[name] = quantity
+                continue
+            if not quantity:
+                continue
+            drug_id = drug_ids_by_name.get(name)
+            if drug_id is None:
+                unresolved[name] = quantity
+            else:
+                quantities[drug_id] = quantities.get(drug_id, 0) + quantity
+
+        items.extend(
+            MonthlyDoctorReportItem(report_id=report.id, drug_id=drug_id, quantity=quantity)
+            for drug_id, quantity in quantities.items()
+        )
+        if len(items) >= BATCH_SIZE:
+            MonthlyDoctorReportItem.objects.using(db_alias).bulk_create(items)
+            items = []
+
+        MonthlyDoctorReport.objects.using(db_alias).filter(id=report.id).update(drugs_data={})
+        unresolved_rows.extend(
+            (report.id, report.doctor_id, report.year, report.month, name, quantity)
+            for name, quantity in unresolved.items()
+        )
+
+    if unresolved_rows:
+        # The migration runs in a transaction - nothing above is kept
+        lines = [
+            f'report {report_id} (doctor {doctor_id}, {year}-{month:02d}): {name!r} x {quantity!r}'
+            for report_id, doctor_id, year, month, name, quantity in unresolved_rows[:UNRESOLVED_SHOWN]
+        ]
+        if len(unresolved_rows) > UNRESOLVED_SHOWN:
+            lines.append(f'... and {len(unresolved_rows) - UNRESOLVED_SHOWN} more')
+        raise ValueError(
+            f'[{db_alias}] {len(unresolved_rows)} drug quantities in MonthlyDoctorReport.drugs_data '
+            f'match no drug by name (or are not numbers). Fix them or add the drugs, then migrate again:\n  '
+            + '\n  '.join(lines)
+        )
+
+    if items:
+        MonthlyDoctorReportItem.objects.using(db_alias).bulk_create(items)
+
+
+def backwards(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    MonthlyDoctorReport = apps.get_model('reports', 'MonthlyDoctorReport')
+    MonthlyDoctorReportItem = apps.get_model('reports', 'MonthlyDoctorReportItem')
+
+    drugs_data = {}
+    items = MonthlyDoctorReportItem.objects.using(db_alias).values_list('report_id', 'drug__ad', 'quantity')
+    for report_id, name, quantity in items.iterator(chunk_size=BATCH_SIZE):
+        drugs_data.setdefault(report_id, {})[name] = quantity
+
+    for report in MonthlyDoctorReport.objects.using(db_alias).filter(id__in=list(drugs_data)).only('id', 'drugs_data'):
+        data = dict(report.drugs_data or {})
+        data.update(drugs_data[report.id])
+        MonthlyDoctorReport.objects.using(db_alias).filter(id=report.id).update(drugs_data=data)
+
+    MonthlyDoctorReportItem.objects.using(db_alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_monthlydoctorreportitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
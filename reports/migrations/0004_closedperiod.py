@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('regions', '0006_updated_at'),
+        ('reports', '0003_move_drugs_data_to_items'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionPeriodLock',
+            fields=[
+                ('region', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='period_lock', serialize=False, to='regions.region')),
+                ('closed_through', models.DateField()),
+            ],
+            options={
+                'verbose_name': 'Bölgə Bağlanma Göstəricisi',
+                'verbose_name_plural': 'Bölgə Bağlanma Göstəriciləri',
+            },
+        ),
+        migrations.CreateModel(
+            name='ClosedPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('month', models.PositiveIntegerField()),
+                ('closed_at', models.DateTimeField(auto_now_add=True)),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='closed_periods', to='regions.region')),
+            ],
+            options={
+                'verbose_name': 'Bağlanmış Ay',
+                'verbose_name_plural': 'Bağlanmış Aylar',
+                'ordering': ['-year', '-month'],
+                'unique_together': {('region', 'year', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+import datetime
+
+from django.db import migrations
+
+
+def forwards(apps, schema_editor):
+    """Mövcud bağlanmış hesabatlardan ClosedPeriod / RegionPeriodLock yarat"""
+    db_alias = schema_editor.connection.alias
+    MonthlyDoctorReport = apps.get_model('reports', 'MonthlyDoctorReport')
+    ClosedPeriod = apps.get_model('reports', 'ClosedPeriod')
+    RegionPeriodLock = apps.get_model('reports', 'RegionPeriodLock')
+
+    periods = (
+        MonthlyDoctorReport.objects.using(db_alias)
+        .filter(region__isnull=False)
+        .values_list('region_id', 'year', 'month')
+        .distinct()
+    )
+
+    closed_through = {}
+    closed = []
+    for region_id, year, month in periods:
+        closed.append(ClosedPeriod(region_id=region_id, year=year, month=month))
+        month_start = datetime.date(year, month, 1)
+        if region_id not in closed_through or month_start > closed_through[region_id]:
+            closed_through[region_id] = month_start
+
+    ClosedPeriod.objects.using(db_alias).bulk_create(closed, ignore_conflicts=True)
+    RegionPeriodLock.objects.using(db_alias).bulk_create([
+        RegionPeriodLock(region_id=region_id, closed_through=month_start)
+        for region_id, month_start in closed_through.items()
+    ], ignore_conflicts=True)
+
+
+def backwards(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    apps.get_model('reports', 'RegionPeriodLock').objects.using(db_alias).all().delete()
+    apps.get_model('reports', 'ClosedPeriod').objects.using(db_alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_closedperiod'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -6,6 +6,7 @@ from django.db import models
 from decimal import Decimal
 
 from doctors.models import Doctor
+from drugs.models import Drug
 from regions.models import Region
 
 
@@ -31,7 +32,9 @@ class MonthlyDoctorReport(models.Model):
     year = models.PositiveIntegerField()
     month = models.PositiveIntegerField()  # 1–12
 
-    # Dərman miqdarları JSON formatında saxlanacaq: {"Aspirin": 10, "Fensavin": 3, ...}
+    # Köhnə format: {"Aspirin": 10, ...} (dərman adı ilə).
+    # Dərman miqdarları indi MonthlyDoctorReportItem cədvəlində (drug_id ilə) saxlanılır;
+    # burada yalnız miqrasiyada heç bir dərmana uyğunlaşdırıla bilməyən adlar qalır.
     drugs_data = models.JSONField(default=dict, blank=True)
 
     # Hesablanmış sahələr – reports səhifəsində gördüyün sahələr
@@ -60,3 +63,107 @@ class MonthlyDoctorReport(models.Model):
 
     def __str__(self):
         return f"{self.year}-{self.month:02d} · {self.doctor.ad}"
+
+    @staticmethod
+    def load_drug_quantities(report_ids):
+        """
+        Bir sorğu ilə çoxlu snapshot üçün dərman miqdarlarını oxu.
+        Nəticə: {report_id: {drug_id: quantity}}
+        """
+        quantities = {report_id: {} for report_id in report_ids}
+        if not quantities:
+            return quantities
+
+        items = MonthlyDoctorReportItem.objects.filter(
+            report_id__in=list(quantities)
+        ).values_list("report_id", "drug_id", "quantity")
+
+        for report_id, drug_id, quantity in items:
+            quantities[report_id][drug_id] = quantity
+        return quantities
+
+    def save_drug_quantities(self, drug_quantities):
+        """Snapshot-un dərman miqdarlarını ({drug_id: quantity}) yaz"""
+        MonthlyDoctorReportItem.objects.bulk_create([
+            MonthlyDoctorReportItem(report=self, drug_id=drug_id, quantity=quantity)
+            for drug_id, quantity in drug_quantities.items()
+            if quantity
+        ])
+
+
+class MonthlyDoctorReportItem(models.Model):
+    """
+    Bağlanmış hesabatda bir dərman üzrə miqdar.
+    drug_id ilə saxlanılır - dərmanın adı dəyişsə də arxiv düzgün qalır.
+    """
+
+    report = models.ForeignKey(
+        MonthlyDoctorReport,
+        on_delete=models.CASCADE,
+        related_name="items",
+    )
+    drug = models.ForeignKey(
+        Drug,
+        on_delete=models.CASCADE,
+        related_name="monthly_report_items",
+    )
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Aylıq Hesabat Dərmanı"
+        verbose_name_plural = "Aylıq Hesabat Dərmanları"
+        unique_together = (
+            ("report", "drug"),
+        )
+
+    def __str__(self):
+        return f"{self.report_id} · {self.drug_id} x {self.quantity}"
+
+
+class ClosedPeriod(models.Model):
+    """
+    Bölgə üzrə bağlanmış ay. 'Hesabatı bağla' zamanı yaradılır.
+    """
+
+    region = models.ForeignKey(
+        Region,
+        on_delete=models.CASCADE,
+        related_name="closed_periods",
+    )
+    year = models.PositiveIntegerField()
+    month = models.PositiveIntegerField()  # 1–12
+    closed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Bağlanmış Ay"
+        verbose_name_plural = "Bağlanmış Aylar"
+        ordering = ["-year", "-month"]
+        unique_together = (
+            ("region", "year", "month"),
+        )
+
+    def __str__(self):
+        return f"{self.region_id} · {self.month:02d}/{self.year}"
+
+
+class RegionPeriodLock(models.Model):
+    """
+    Bölgə üçün 'bu aya qədər bağlanıb' göstəricisi.
+    closed_through - son bağlanmış ayın 1-i; bu tarixə qədər (daxil)
+    olan aylarda əlavə/dəyişiklik qadağandır.
+    """
+
+    region = models.OneToOneField(
+        Region,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="period_lock",
+    )
+    closed_through = models.DateField()
+
+    class Meta:
+        verbose_name = "Bölgə Bağlanma Göstəricisi"
+        verbose_name_plural = "Bölgə Bağlanma Göstəriciləri"
+
+    def __str__(self):
+        return f"{self.region_id} · {self.closed_through:%m/%Y}"
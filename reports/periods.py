@@ -0,0 +1,92 @@
+"""
+Closed-period registry
+- ClosedPeriod: one row per closed (region, year, month)
+- RegionPeriodLock: "closed through" pointer per region, read with a
+  single primary-key lookup by every write-path period check
+- Closing a month locks the region row first (lock_region_periods), so
+  concurrent closes of one region run one after the other
+"""
+
+from datetime import date
+
+from django.db import router, transaction
+
+from regions.models import Region
+from .models import ClosedPeriod, RegionPeriodLock
+
+
+def _next_month(month_start):
+    if month_start.month == 12:
+        return date(month_start.year + 1, 1, 1)
+    return date(month_start.year, month_start.month + 1, 1)
+
+
+def get_closed_through(region_id):
+    """First day of the last closed month of the region, or None"""
+    if not region_id:
+        return None
+    return (
+        RegionPeriodLock.objects
+        .filter(region_id=region_id)
+        .values_list('closed_through', flat=True)
+        .first()
+    )
+
+
+def get_next_open_month(region_id):
+    """First day of the first month that still accepts changes, or None"""
+    closed_through = get_closed_through(region_id)
+    return _next_month(closed_through) if closed_through else None
+
+
+def closed_period_message(closed_through, value_date):
+    """
+    Error text when value_date falls into a closed month, otherwise None.
+    closed_through comes from get_closed_through (so one lookup can serve
+    a whole batch).
+    """
+    if not closed_through or not value_date:
+        return None
+    if (value_date.year, value_date.month) > (closed_through.year, closed_through.month):
+        return None
+
+    next_month = _next_month(closed_through)
+    return (
+        f'Bu bölgə üçün ən son bağlanan hesabat {closed_through.month:02d}/{closed_through.year} ayıdır. '
+        f'Qeydiyyat yalnız {next_month.month:02d}/{next_month.year} ayından başlayaraq əlavə edilə bilər.'
+    )
+
+
+def check_period_open(region_id, value_date):
+    """Error text if (region, date) is in a closed month, otherwise None"""
+    if not region_id or not value_date:
+        return None
+    return closed_period_message(get_closed_through(region_id), value_date)
+
+
+def is_period_closed(region_id, year, month):
+    return check_period_open(region_id, date(year, month, 1)) is not None
+
+
+def lock_region_periods(region_id):
+    """
+    Hold the region's close lock until the surrounding tenant transaction
+    ends; checks made after it (is_period_closed) see every earlier close.
+    The region row is locked because the pointer row may not exist yet.
+    """
+    using = router.db_for_write(RegionPeriodLock)
+    list(Region.objects.using(using).select_for_update().filter(pk=region_id).values_list('pk', flat=True))
+
+
+def close_period(region_id, year, month):
+    """Register a closed month and move the region's pointer forward"""
+    month_start = date(year, month, 1)
+    with transaction.atomic(using=router.db_for_write(RegionPeriodLock)):
+        lock_region_periods(region_id)
+        ClosedPeriod.objects.get_or_create(region_id=region_id, year=year, month=month)
+        lock = RegionPeriodLock.objects.select_for_update().filter(region_id=region_id).first()
+        if lock is None:
+            RegionPeriodLock.objects.create(region_id=region_id, closed_through=month_start)
+        elif month_start > lock.closed_through:
+            lock.closed_through = month_start
+            lock.save(update_fields=['closed_through'])
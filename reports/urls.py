@@ -1,12 +1,13 @@
 from django.urls import path
 
-from .views import monthly_reports, export_reports_excel, close_month_report
+from .views import monthly_reports, export_reports_excel, export_reports_csv, close_month_report
 
 app_name = 'reports'
 
 urlpatterns = [
     path('', monthly_reports, name='list'),
     path('export/', export_reports_excel, name='export_excel'),
+    path('export/csv/', export_reports_csv, name='export_csv'),
     path("close/", close_month_report, name="close"),
     
 ]
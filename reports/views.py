@@ -3,6 +3,7 @@ from collections import OrderedDict
 from datetime import date
 from decimal import Decimal
 
+from django.contrib.auth.decorators import login_required
 from django.db.models import Q, Prefetch
 from django.http import HttpResponse
 from django.shortcuts import render
@@ -10,14 +11,18 @@ from django.shortcuts import render
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 
+from core.exports import streaming_export_response
+from core.reference_cache import get_active_drugs, get_regions
+from subscription.decorators import subscription_required
 from doctors.models import Doctor, DoctorPayment
-from drugs.models import Drug
+from doctors.services.search import search_doctor_ids
+from doctors.services.ledger import carry_over_entries, post_entries
 from prescriptions.models import Prescription, PrescriptionItem
-from regions.models import Region
 from .models import MonthlyDoctorReport
+from .periods import close_period, get_closed_through, is_period_closed, lock_region_periods
 from django.contrib import messages
 from django.shortcuts import redirect
-from django.db import transaction
+from django.db import router, transaction
 
 
 def monthly_reports(request):
@@ -25,7 +30,7 @@ def monthly_reports(request):
     today = date.today()
     filters, doctor_rows, drugs = prepare_reports_data(request)
 
-    regions = Region.objects.order_by("name")
+    regions = get_regions()
     years = range(today.year - 2, today.year + 3)
 
     stats = {
@@ -81,7 +86,7 @@ def build_table_info(filters, regions, stats):
     info.append(filters["year"] or "")
 
     if filters["region"]:
-        region = regions.filter(id=filters["region"]).first()
+        region = next((r for r in regions if str(r.id) == str(filters["region"])), None)
         info.append(region.name if region else "Seçilmiş bölgə")
     else:
         info.append("Bütün bölgələr")
@@ -91,6 +96,17 @@ def build_table_info(filters, regions, stats):
     return " · ".join(info)
 
 
+def parse_report_filters(request):
+    """Read report filters from GET (shared by the page, Excel and CSV exports)."""
+    today = date.today()
+    return {
+        "region": (request.GET.get("region") or "").strip(),
+        "month": (request.GET.get("month") or "").strip(),
+        "year": (request.GET.get("year") or str(today.year)).strip(),
+        "doctor": (request.GET.get("doctor") or "").strip(),
+    }
+
+
 def prepare_reports_data(request):
     """
     MƏNTİQİ:
@@ -106,12 +122,7 @@ def prepare_reports_data(request):
     # -----------------------------
     # FILTERS
     # -----------------------------
-    filters = {
-        "region": (request.GET.get("region") or "").strip(),
-        "month": (request.GET.get("month") or "").strip(),
-        "year": (request.GET.get("year") or str(today.year)).strip(),
-        "doctor": (request.GET.get("doctor") or "").strip(),
-    }
+    filters = parse_report_filters(request)
 
     month_int = safe_int(filters["month"])
     year_int = safe_int(filters["year"], today.year)
@@ -120,7 +131,7 @@ def prepare_reports_data(request):
     # REGION REQUIRED - If no region selected, return empty data
     # -----------------------------
     if not filters["region"]:
-        drugs = Drug.objects.filter(is_active=True).order_by("ad")
+        drugs = get_active_drugs()
         return filters, [], drugs
 
     # -----------------------------
@@ -128,11 +139,10 @@ def prepare_reports_data(request):
     # -----------------------------
     doctors = Doctor.objects.select_related("region", "ixtisas").filter(region_id=filters["region"])
 
-    if filters["doctor"]:
-        doctors = doctors.filter(
-            Q(ad__icontains=filters["doctor"]) |
-            Q(code__icontains=filters["doctor"])
-        )
+    # Həkim axtarışı bir dəfə id siyahısına çevrilir, sonra hər yerdə id ilə süzülür
+    doctor_search_ids = search_doctor_ids(filters["doctor"])
+    if doctor_search_ids is not None:
+        doctors = doctors.filter(id__in=doctor_search_ids)
 
     doctors = list(doctors)
 
@@ -147,11 +157,8 @@ def prepare_reports_data(request):
             "doctor", "doctor__region", "doctor__ixtisas"
         ).filter(year=year_int, month=month_int, region_id=filters["region"])
 
-        if filters["doctor"]:
-            snapshot_qs = snapshot_qs.filter(
-                Q(doctor__ad__icontains=filters["doctor"]) |
-                Q(doctor__code__icontains=filters["doctor"])
-            )
+        if doctor_search_ids is not None:
+            snapshot_qs = snapshot_qs.filter(doctor_id__in=doctor_search_ids)
 
         snapshot_mode = snapshot_qs.exists()
 
@@ -159,11 +166,14 @@ def prepare_reports_data(request):
     # 1) SNAPSHOT VARSA → BURDAN OXU
     # =========================================================================
     if snapshot_mode:
+        reports = list(snapshot_qs.defer("drugs_data"))
+        drug_quantities = MonthlyDoctorReport.load_drug_quantities([report.id for report in reports])
+
         doctor_rows = []
-        for report in snapshot_qs:
+        for report in reports:
             doctor_rows.append({
                 "doctor": report.doctor,
-                "drugs": dict(report.drugs_data or {}),
+                "drugs": drug_quantities[report.id],
                 "total_quantity": report.total_quantity,
                 "evvelki_borc": report.evvelki_borc,
                 "hesablanan": report.hesablanan,
@@ -177,17 +187,17 @@ def prepare_reports_data(request):
                 "yekun_borc": report.yekun_borc,
             })
 
-        drugs = Drug.objects.filter(is_active=True).order_by("ad")
+        drugs = get_active_drugs()
         return filters, doctor_rows, drugs
 
     # =========================================================================
     # 2) ƏVVƏLCƏ SON BAĞLANMIŞ AYI TAP
     # =========================================================================
-    last_snapshot = MonthlyDoctorReport.objects.order_by("-year", "-month").first()
+    closed_through = get_closed_through(filters["region"])
 
-    if last_snapshot:
-        last_closed_year = last_snapshot.year
-        last_closed_month = last_snapshot.month
+    if closed_through:
+        last_closed_year = closed_through.year
+        last_closed_month = closed_through.month
 
         # Soruşulan ay seçilməyibsə → gələcək ay yoxlaması etmə
         if not month_int:
@@ -217,7 +227,7 @@ def prepare_reports_data(request):
                     "yekun_borc": doctor.evvelki_borc,
                 })
 
-            drugs = Drug.objects.filter(is_active=True).order_by("ad")
+            drugs = get_active_drugs()
             return filters, doctor_rows, drugs
 
 
@@ -247,7 +257,7 @@ def prepare_reports_data(request):
     # Prefetch prescription data
     item_prefetch = Prefetch(
         "items",
-        queryset=PrescriptionItem.objects.select_related("drug").only("drug__ad", "quantity")
+        queryset=PrescriptionItem.objects.only("id", "prescription_id", "drug_id", "quantity")
     )
 
     prescriptions = Prescription.objects.select_related(
@@ -265,11 +275,8 @@ def prepare_reports_data(request):
 
     prescriptions = prescriptions.filter(date__year=year_int)
 
-    if filters["doctor"]:
-        prescriptions = prescriptions.filter(
-            Q(doctor__ad__icontains=filters["doctor"]) |
-            Q(doctor__code__icontains=filters["doctor"])
-        )
+    if doctor_search_ids is not None:
+        prescriptions = prescriptions.filter(doctor_id__in=doctor_search_ids)
 
     # dərmanların toplanması
     for prescription in prescriptions:
@@ -280,8 +287,7 @@ def prepare_reports_data(request):
         summary = doctor_summary[doctor.id]
 
         for item in prescription.items.all():
-            name = item.drug.ad
-            summary["drugs"][name] = summary["drugs"].get(name, 0) + item.quantity
+            summary["drugs"][item.drug_id] = summary["drugs"].get(item.drug_id, 0) + item.quantity
             summary["total_quantity"] += item.quantity
 
     # Payments
@@ -312,7 +318,7 @@ def prepare_reports_data(request):
         summary["yekun_borc"] = evvelki + avans + investisiya + datasiya + geri - silinen
 
     doctor_rows = list(doctor_summary.values())
-    drugs = Drug.objects.filter(is_active=True).order_by("ad")
+    drugs = get_active_drugs()
 
     return filters, doctor_rows, drugs
 # -----------------------------
@@ -324,7 +330,7 @@ def monthly_reports(request):
     today = date.today()
     filters, doctor_rows, drugs = prepare_reports_data(request)
 
-    regions = Region.objects.order_by("name")
+    regions = get_regions()
     years = range(today.year - 2, today.year + 3)
 
     stats = {
@@ -355,7 +361,6 @@ def monthly_reports(request):
 # CLOSE MONTH (HESABATI BAĞLA)
 # -----------------------------
 
-@transaction.atomic
 def close_month_report(request):
     """
     Close current filtered month:
@@ -371,7 +376,7 @@ def close_month_report(request):
     year = safe_int(request.GET.get("year"), today.year)
     region = (request.GET.get("region") or "").strip()
 
-    if not month or not year:
+    if not month or not year or not 1 <= month <= 12:
         messages.error(request, "Month and year are required to close report.")
         return redirect("reports:list")
     
@@ -379,51 +384,64 @@ def close_month_report(request):
         messages.error(request, "Bölgə seçilməlidir.")
         return redirect("reports:list")
 
-    # Month cannot be closed twice
-    if MonthlyDoctorReport.objects.filter(month=month, year=year).exists():
-        messages.error(request, "Bu ay üçün hesabat artıq bağlanıb.")
-        return redirect("reports:list")
-
-    # Always use live data for closing (ignore any existing snapshot logic)
-    filters, doctor_rows, drugs = prepare_reports_data(request)
+    # Snapshot, period registry, doctor reset and ledger live in the tenant database -
+    # one transaction there (a bare atomic would bind 'default')
+    with transaction.atomic(using=router.db_for_write(MonthlyDoctorReport)):
+        # A concurrent close of this region waits here, so the check below sees it
+        lock_region_periods(region)
 
-    # Create snapshot per doctor
-    for row in doctor_rows:
-        MonthlyDoctorReport.objects.create(
-        doctor=row["doctor"],
-        region=row["doctor"].region,
-        year=year,
-        month=month,
+        # Month cannot be closed twice (nor a month before the region's last closed one)
+        if is_period_closed(region, year, month):
+            messages.error(request, "Bu ay üçün hesabat artıq bağlanıb.")
+            return redirect("reports:list")
 
-        drugs_data=row["drugs"],    # ✔ models.JSONField → drugs_data
-        total_quantity=row["total_quantity"],
+        # Always use live data for closing (ignore any existing snapshot logic)
+        filters, doctor_rows, drugs = prepare_reports_data(request)
 
-        evvelki_borc=row["evvelki_borc"],
-        hesablanan=row["hesablanan"],
-        silinen_miqdar=row["silinen_miqdar"],   # ✔ model field
+        # Create snapshot per doctor
+        for row in doctor_rows:
+            report = MonthlyDoctorReport.objects.create(
+                doctor=row["doctor"],
+                region=row["doctor"].region,
+                year=year,
+                month=month,
 
-        avans=row["payments"]["avans"],
-        investisiya=row["payments"]["investisiya"],
-        geriqaytarma=row["payments"]["geriqaytarma"],
-        datasiya=row["datasiya"],
+                total_quantity=row["total_quantity"],
 
-        yekun_borc=row["yekun_borc"],
-    )
+                evvelki_borc=row["evvelki_borc"],
+                hesablanan=row["hesablanan"],
+                silinen_miqdar=row["silinen_miqdar"],   # ✔ model field
 
+                avans=row["payments"]["avans"],
+                investisiya=row["payments"]["investisiya"],
+                geriqaytarma=row["payments"]["geriqaytarma"],
+                datasiya=row["datasiya"],
 
-    # Reset doctors for next month
-    for row in doctor_rows:
-        doctor = row["doctor"]
-        doctor.evvelki_borc = row["yekun_borc"]
-        doctor.hesablanmish_miqdar = Decimal("0")
-        doctor.silinen_miqdar = Decimal("0")
-        doctor.datasiya = Decimal("0")
-        doctor.save(update_fields=[
-            "evvelki_borc",
-            "hesablanmish_miqdar",
-            "silinen_miqdar",
-            "datasiya",
-        ])
+                yekun_borc=row["yekun_borc"],
+            )
+            # Dərman miqdarları drug_id ilə ayrıca cədvəldə
+            report.save_drug_quantities(row["drugs"])
+
+        close_period(region, year, month)
+
+        # Reset doctors for next month
+        for row in doctor_rows:
+            doctor = row["doctor"]
+            doctor.evvelki_borc = row["yekun_borc"]
+            doctor.hesablanmish_miqdar = Decimal("0")
+            doctor.silinen_miqdar = Decimal("0")
+            doctor.datasiya = Decimal("0")
+            doctor.save(update_fields=[
+                "evvelki_borc",
+                "hesablanmish_miqdar",
+                "silinen_miqdar",
+                "datasiya",
+            ])
+
+        # Jurnal: ay sonundakı qalıq bağlanmış hesabatın yekun borcuna bərabər olsun
+        post_entries(carry_over_entries(
+            {row["doctor"].id: row["yekun_borc"] for row in doctor_rows}, year, month
+        ))
 
     messages.success(request, "Hesabat uğurla bağlandı.")
     return redirect("reports:list")
@@ -587,7 +605,7 @@ def export_reports_excel(request):
         # Drug columns
         for drug in drugs:
             cell = ws.cell(row=row_num, column=col_num)
-            drug_count = row['drugs'].get(drug.ad, 0)
+            drug_count = row['drugs'].get(drug.id, 0)
             cell.value = drug_count
             cell.font = cell_font
             cell.alignment = center_alignment
@@ -682,7 +700,52 @@ def export_reports_excel(request):
     return response
 
 
+@login_required
+@subscription_required
+def export_reports_csv(request):
+    """
+    Stream monthly reports as CSV/TSV (same columns as the Excel export).
+    ?format=tsv switches the delimiter, ?gzip=1 compresses the transfer.
+    """
+    filters, doctor_rows, drugs = prepare_reports_data(request)
+    drug_columns = [(drug.id, drug.ad) for drug in drugs]
 
+    def rows():
+        yield (
+            ['№', 'Bölgə', 'Kod', 'Həkim', 'İxtisas', 'Kateqoriya', 'Dərəcə', 'Əvvəlki Borc']
+            + [name for _, name in drug_columns]
+            + ['Total', 'Hesablanan', 'Silinən', 'Avans', 'İnvestisiya', 'Geri Qaytarma', 'Datasiya', 'Yekun']
+        )
 
+        for row_num, row in enumerate(doctor_rows, 1):
+            doctor = row['doctor']
+            datasiya = row['datasiya']
+            if isinstance(datasiya, date):
+                datasiya = Decimal('0')
+
+            yield (
+                [
+                    row_num,
+                    doctor.region.name if doctor.region else '-',
+                    doctor.code,
+                    doctor.ad,
+                    doctor.ixtisas.name if doctor.ixtisas else '-',
+                    doctor.category,
+                    doctor.get_degree_display(),
+                    row['evvelki_borc'],
+                ]
+                + [row['drugs'].get(drug_id, 0) for drug_id, _ in drug_columns]
+                + [
+                    row['total_quantity'],
+                    row['hesablanan'],
+                    row['silinen_miqdar'],
+                    row['payments']['avans'],
+                    row['payments']['investisiya'],
+                    row['payments']['geriqaytarma'],
+                    datasiya,
+                    row['yekun_borc'],
+                ]
+            )
 
-
+    month_label = next((label for val, label in MONTH_CHOICES if val == filters["month"]), "Bütün aylar")
+    return streaming_export_response(request, rows(), f"Ayliq_Hekim_Hesabati_{month_label}_{filters['year']}")
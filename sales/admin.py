@@ -1,18 +1,30 @@
 from django.contrib import admin
-from .models import Sale, SaleItem
+
+from core.paginators import ScalableAdminMixin
+from .models import Sale, SaleItem, SaleRevision
 
 @admin.register(SaleItem)
-class SaleItemAdmin(admin.ModelAdmin):
+class SaleItemAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ['sale', 'drug', 'quantity', 'unit_price']
-    list_filter = ['sale', 'drug']
+    list_select_related = ['sale__region', 'drug']
+    list_filter = ['sale__region', 'drug']
     search_fields = ['sale__region__name', 'drug__ad']
     date_hierarchy = 'sale__date'
     ordering = ['-sale__date']
 
 @admin.register(Sale)
-class SaleAdmin(admin.ModelAdmin):
+class SaleAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ['region', 'date', 'total_amount', 'total_quantity']
+    list_select_related = ['region']
     list_filter = ['region', 'date']
     search_fields = ['region__name']
     date_hierarchy = 'date'
     ordering = ['-date']
+
+@admin.register(SaleRevision)
+class SaleRevisionAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ['sale', 'changed_by', 'changed_at']
+    list_select_related = ['sale__region']
+    search_fields = ['changed_by']
+    date_hierarchy = 'changed_at'
+    readonly_fields = ['sale', 'changed_by', 'changed_at', 'changes']
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0003_header_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('changed_by', models.CharField(blank=True, max_length=150)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+                ('changes', models.JSONField(default=dict)),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='sales.sale')),
+            ],
+            options={
+                'ordering': ['-changed_at'],
+            },
+        ),
+    ]
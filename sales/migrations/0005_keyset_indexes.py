@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('regions', '0006_updated_at'),
+        ('sales', '0004_salerevision'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['date', 'id'], name='sales_sale_date_038a5f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['region', 'date', 'id'], name='sales_sale_region__da0a4a_idx'),
+        ),
+    ]
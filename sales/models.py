@@ -1,4 +1,6 @@
 from django.db import models
+
+from core.totals import refresh_header_totals
 from regions.models import Region
 from drugs.models import Drug
 
@@ -7,19 +9,26 @@ class Sale(models.Model):
     date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Stored totals of the items (kept in sync by sales.signals)
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    total_quantity = models.PositiveIntegerField(default=0, editable=False)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+
     class Meta:
         ordering = ['-date']
+        indexes = [
+            # Keyset pagination of the sale list (with and without region filter)
+            models.Index(fields=['date', 'id']),
+            models.Index(fields=['region', 'date', 'id']),
+        ]
 
     def __str__(self):
         return f"Sale #{self.id} - {self.region.name}"
 
-    @property
-    def total_amount(self):
-        return sum(item.total_price for item in self.items.all())
-
-    @property
-    def total_quantity(self):
-        return sum(item.quantity for item in self.items.all())
+    def refresh_totals(self):
+        """Recompute stored totals from the items and reload them"""
+        refresh_header_totals(Sale.objects.filter(pk=self.pk), SaleItem, 'sale')
+        self.refresh_from_db(fields=['item_count', 'total_quantity', 'total_amount'])
 
 
 class SaleItem(models.Model):
@@ -35,3 +44,22 @@ class SaleItem(models.Model):
     def __str__(self):
         return f"{self.drug.ad} x {self.quantity}"
 
+
+
+class SaleRevision(models.Model):
+    """
+    Compact record of one sale edit. changes holds only what differed:
+    {"region": [old, new], "date": [old, new],
+     "added": {drug_id: qty}, "removed": {drug_id: qty},
+     "changed": {drug_id: [old_qty, new_qty]}}
+    """
+    sale = models.ForeignKey(Sale, related_name="revisions", on_delete=models.CASCADE)
+    changed_by = models.CharField(max_length=150, blank=True)
+    changed_at = models.DateTimeField(auto_now_add=True)
+    changes = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ['-changed_at']
+
+    def __str__(self):
+        return f"Sale #{self.sale_id} revision {self.changed_at:%Y-%m-%d %H:%M}"
@@ -1,10 +1,46 @@
-from django.db.models.signals import post_save, post_delete
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 
+from core.activity import refresh_daily_activity
+from core.totals import refresh_header_totals
 from sales.models import Sale, SaleItem
 from doctors.services.financial_calculator import recalculate_doctor_financials
 
 
+_state = threading.local()
+
+
+@contextmanager
+def deferred_sale_recalculation():
+    """
+    Satış/element siqnalları bu blok daxilində heç nə etmir; yekunları və
+    hesablamanı çağıran tərəf özü bir dəfə edir (məs. edit_sale)
+    """
+    _state.deferred = True
+    try:
+        yield
+    finally:
+        _state.deferred = False
+
+
+def _is_deferred():
+    return getattr(_state, 'deferred', False)
+
+
+def recalculate_sale_periods(periods):
+    """Hər (region_id, year, month) üçün bir dəfə hesablama et"""
+    for region_id, year, month in sorted(set(periods)):
+        recalculate_doctor_financials(region_ids=[region_id], month=month, year=year)
+
+
+def _refresh_sale_totals(sale_id):
+    """Satışın saxlanılan yekunlarını (say, miqdar, məbləğ) yenilə"""
+    refresh_header_totals(Sale.objects.filter(pk=sale_id), SaleItem, 'sale')
+
+
 def _recalculate_for_sale_region(sale):
     """Satış əlavə/dəyişdirildikdə həmin satışın ayı üçün hesablama et"""
     if sale and sale.region_id and sale.date:
@@ -15,22 +51,44 @@ def _recalculate_for_sale_region(sale):
         )
 
 
+@receiver(pre_save, sender=Sale)
+def remember_sale_date(sender, instance, **kwargs):
+    """Tarix dəyişərsə köhnə günün fəaliyyəti də yenilənməlidir"""
+    instance._activity_previous_date = None
+    if instance.pk and not _is_deferred():
+        instance._activity_previous_date = Sale.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+
+
 @receiver(post_save, sender=Sale)
 def sale_saved(sender, instance, **kwargs):
+    if _is_deferred():
+        return
+    refresh_daily_activity([instance.date, getattr(instance, '_activity_previous_date', None)])
     _recalculate_for_sale_region(instance)
 
 
 @receiver(post_delete, sender=Sale)
 def sale_deleted(sender, instance, **kwargs):
+    if _is_deferred():
+        return
+    refresh_daily_activity([instance.date])
     _recalculate_for_sale_region(instance)
 
 
 @receiver(post_save, sender=SaleItem)
 def sale_item_saved(sender, instance, **kwargs):
+    if _is_deferred():
+        return
+    _refresh_sale_totals(instance.sale_id)
+    refresh_daily_activity([instance.sale.date])
     _recalculate_for_sale_region(instance.sale)
 
 
 @receiver(post_delete, sender=SaleItem)
 def sale_item_deleted(sender, instance, **kwargs):
+    if _is_deferred():
+        return
+    _refresh_sale_totals(instance.sale_id)
+    refresh_daily_activity([instance.sale.date])
     _recalculate_for_sale_region(instance.sale)
 
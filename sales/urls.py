@@ -1,11 +1,12 @@
 from django.urls import path
 
-from .views import monthly_sales, add_sale, sale_list, edit_sale
+from .views import monthly_sales, export_sales_csv, add_sale, sale_list, edit_sale
 
 app_name = 'sales'
 
 urlpatterns = [
     path('', monthly_sales, name='list'),
+    path('export/csv/', export_sales_csv, name='export_csv'),
     path('add/', add_sale, name='add'),
     path('records/', sale_list, name='sale_list'),
     path('<int:sale_id>/edit/', edit_sale, name='edit'),
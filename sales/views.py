@@ -1,11 +1,18 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Sum
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
+from django.db import router, transaction
 from django.contrib import messages
-
+from datetime import datetime
+
+from core.activity import refresh_daily_activity
+from core.exports import streaming_export_response
+from core.paginators import keyset_paginate
+from core.pivot import PivotTable
+from core.reference_cache import get_active_drugs, get_regions
+from reports.periods import check_period_open
 from subscription.decorators import subscription_required
-from .models import Sale, SaleItem
+from .models import Sale, SaleItem, SaleRevision
+from .signals import deferred_sale_recalculation, recalculate_sale_periods
 from regions.models import Region
 from drugs.models import Drug
 
@@ -24,56 +31,80 @@ MONTH_CHOICES = [
     (12, "Dekabr"),
 ]
 
-def monthly_sales(request):
+SALES_PER_PAGE = 50
+
+def _build_sales_filters(request):
+    """Read region/month/year filters from GET; invalid months and years are dropped"""
     region_id = (request.GET.get("region") or "").strip()
     month = (request.GET.get("month") or "").strip()
+    year = (request.GET.get("year") or "").strip()
 
-    # Base queryset for SaleItem (çünki dərmanlar burdadır)
-    items = SaleItem.objects.select_related("sale", "drug", "sale__region")
-
-    # Region filter
-    if region_id:
-        items = items.filter(sale__region_id=region_id)
-
-    # Month filter
     if month:
         try:
-            month_int = int(month)
-            if 1 <= month_int <= 12:
-                items = items.filter(sale__date__month=month_int)
-            else:
+            if not 1 <= int(month) <= 12:
                 month = ""
         except ValueError:
             month = ""
 
-    drugs = Drug.objects.all()
-    regions_qs = Region.objects.all()
+    if year:
+        try:
+            if not 2000 <= int(year) <= 2100:
+                year = ""
+        except ValueError:
+            year = ""
 
-    if region_id:
-        regions_qs = regions_qs.filter(id=region_id)
+    return {"region": region_id, "month": month, "year": year}
 
-    table_data = []
-    summary_total = 0
 
-    for region in regions_qs:
-        row = {
-            "region": region,
-            "drugs": {},
-            "total": 0,
-        }
+def _filter_sale_items(items, filters):
+    if filters["region"]:
+        items = items.filter(sale__region_id=filters["region"])
+    if filters["month"]:
+        items = items.filter(sale__date__month=int(filters["month"]))
+    if filters.get("year"):
+        items = items.filter(sale__date__year=int(filters["year"]))
+    return items
 
-        for drug in drugs:
-            qty = (
-                items.filter(sale__region=region, drug=drug)
-                .aggregate(total=Sum("quantity"))["total"]
-                or 0
-            )
 
-            row["drugs"][drug.ad] = qty
-            row["total"] += qty
+def _build_sales_pivot(filters, regions, drugs):
+    """Region x drug sold quantities (one grouped query)"""
+    return PivotTable(
+        _filter_sale_items(SaleItem.objects.all(), filters),
+        row="sale__region",
+        column="drug",
+        value="quantity",
+        row_keys=[region.id for region in regions],
+        column_keys=[drug.id for drug in drugs],
+    )
 
-        summary_total += row["total"]
-        table_data.append(row)
+
+def _filtered_regions(filters):
+    regions = get_regions()
+    if filters["region"]:
+        regions = tuple(region for region in regions if str(region.id) == filters["region"])
+    return regions
+
+
+def monthly_sales(request):
+    filters = _build_sales_filters(request)
+    region_id = filters["region"]
+    month = filters["month"]
+    year = filters["year"]
+
+    drugs = list(Drug.objects.all())
+    regions = _filtered_regions(filters)
+
+    pivot = _build_sales_pivot(filters, regions, drugs)
+
+    table_data = [
+        {
+            "region": region,
+            "drugs": {drug.ad: qty for drug, qty in zip(drugs, quantities)},
+            "total": total,
+        }
+        for region, (_, quantities, total) in zip(regions, pivot.rows())
+    ]
+    summary_total = pivot.grand_total
 
     table_info_parts = []
 
@@ -87,22 +118,24 @@ def monthly_sales(request):
     else:
         table_info_parts.append("Bütün aylar")
 
-    if region_id and regions_qs.exists():
-        table_info_parts.append(regions_qs.first().name)
+    if year:
+        table_info_parts.append(year)
+
+    if region_id and regions:
+        table_info_parts.append(regions[0].name)
     else:
         table_info_parts.append("Bütün bölgələr")
 
     table_info_parts.append(f"Ümumi: {summary_total} satış")
 
     context = {
-        "regions": Region.objects.all(),
+        "regions": get_regions(),
         "drugs": drugs,
         "data": table_data,
+        "drug_totals": pivot.column_totals,
         "months": MONTH_CHOICES,
-        "filters": {
-            "region": region_id,
-            "month": month,
-        },
+        "years": [d.year for d in Sale.objects.dates("date", "year", order="DESC")],
+        "filters": filters,
         "table_info": " - ".join(table_info_parts),
         "summary_total": summary_total,
     }
@@ -110,13 +143,40 @@ def monthly_sales(request):
     return render(request, "sales/sales.html", context)
 
 
+@login_required
+@subscription_required
+def export_sales_csv(request):
+    """
+    Stream the monthly sales table (region x drug quantities) as CSV/TSV.
+    ?format=tsv switches the delimiter, ?gzip=1 compresses the transfer.
+    """
+    filters = _build_sales_filters(request)
+
+    drugs = list(Drug.objects.all())
+    regions = _filtered_regions(filters)
+
+    def rows():
+        # One grouped query; result size is bounded by regions x drugs
+        pivot = _build_sales_pivot(filters, regions, drugs)
+
+        yield ["№", "Bölgə"] + [drug.ad for drug in drugs] + ["Total"]
+
+        for row_num, (region, (_, quantities, total)) in enumerate(zip(regions, pivot.rows()), 1):
+            yield [row_num, region.name] + quantities + [total]
+
+        yield ["", "Total"] + pivot.column_totals + [pivot.grand_total]
+
+    return streaming_export_response(request, rows(), "Ayliq_Satis")
+
+
 @login_required
 @subscription_required
 def add_sale(request):
 
     if request.method == "POST":
         try:
-            with transaction.atomic():
+            # Tenant database transaction (a bare atomic would bind 'default')
+            with transaction.atomic(using=router.db_for_write(Sale)):
 
                 region_id = request.POST.get("region_id")
                 date = request.POST.get("date")
@@ -127,10 +187,16 @@ def add_sale(request):
 
                 region = Region.objects.get(id=region_id)
 
+                sale_date = datetime.strptime(date, "%Y-%m-%d").date()
+                period_error = check_period_open(region.id, sale_date)
+                if period_error:
+                    messages.error(request, period_error)
+                    return redirect("sales:add")
+
                 # Create Sale
                 sale = Sale.objects.create(
                     region=region,
-                    date=date
+                    date=sale_date
                 )
 
                 # Collect drug quantities
@@ -167,8 +233,8 @@ def add_sale(request):
             return redirect("sales:add")
 
     # GET
-    regions = Region.objects.all().order_by("name")
-    drugs = Drug.objects.filter(is_active=True).order_by("ad")
+    regions = get_regions()
+    drugs = get_active_drugs()
 
     return render(request, "sales/add.html", {
         "regions": regions,
@@ -183,7 +249,7 @@ def sale_list(request):
     region_id = (request.GET.get("region") or "").strip()
     month = (request.GET.get("month") or "").strip()
 
-    sales = Sale.objects.select_related("region").prefetch_related("items__drug").order_by("-date")
+    sales = Sale.objects.select_related("region")
 
     if region_id:
         sales = sales.filter(region_id=region_id)
@@ -196,8 +262,8 @@ def sale_list(request):
             pass
 
     context = {
-        "sales": sales,
-        "regions": Region.objects.all().order_by("name"),
+        "sales": keyset_paginate(request, sales, ("-date", "-id"), per_page=SALES_PER_PAGE),
+        "regions": get_regions(),
         "months": MONTH_CHOICES,
         "filters": {"region": region_id, "month": month},
     }
@@ -213,7 +279,8 @@ def edit_sale(request, sale_id):
 
     if request.method == "POST":
         try:
-            with transaction.atomic():
+            # Tenant database transaction (a bare atomic would bind 'default')
+            with transaction.atomic(using=router.db_for_write(Sale)):
                 region_id = request.POST.get("region_id")
                 date = request.POST.get("date")
                 if not region_id or not date:
@@ -221,37 +288,95 @@ def edit_sale(request, sale_id):
                     return redirect("sales:edit", sale_id=sale_id)
 
                 region = Region.objects.get(id=region_id)
-                sale.region = region
-                sale.date = date
-                sale.save()
 
-                # Collect drug quantities from form
-                selected_drugs = []
+                # Neither the current nor the new month may be closed
+                sale_date = datetime.strptime(date, "%Y-%m-%d").date()
+                period_error = (
+                    check_period_open(sale.region_id, sale.date) or
+                    check_period_open(region.id, sale_date)
+                )
+                if period_error:
+                    messages.error(request, period_error)
+                    return redirect("sales:edit", sale_id=sale_id)
+
+                # Collect drug quantities from form (0 means the drug is removed)
+                posted_quantities = {}
                 for key, value in request.POST.items():
                     if key.startswith("drug_"):
                         drug_id = int(key.split("_")[1])
-                        qty = int(value) if value else 0
-                        if qty > 0:
-                            selected_drugs.append((drug_id, qty))
+                        posted_quantities[drug_id] = int(value) if value else 0
 
-                if not selected_drugs:
+                if not any(qty > 0 for qty in posted_quantities.values()):
                     messages.error(request, "Ən azı 1 dərman seçilməlidir.")
                     return redirect("sales:edit", sale_id=sale_id)
 
-                drug_ids = [d[0] for d in selected_drugs]
-                drugs_map = {d.id: d for d in Drug.objects.filter(id__in=drug_ids)}
-
-                # Remove old items and create new
-                sale.items.all().delete()
-                for drug_id, qty in selected_drugs:
-                    drug = drugs_map.get(drug_id)
-                    if drug:
-                        SaleItem.objects.create(
-                            sale=sale,
-                            drug=drug,
-                            quantity=qty,
-                            unit_price=drug.qiymet,
+                drugs_map = Drug.objects.in_bulk(list(posted_quantities))
+                current_items = {item.drug_id: item for item in sale.items.all()}
+
+                # Items of drugs missing from the form (e.g. deactivated) are left alone
+                added, removed, changed = {}, {}, {}
+                for drug_id, qty in posted_quantities.items():
+                    item = current_items.get(drug_id)
+                    if item is None:
+                        if qty > 0 and drug_id in drugs_map:
+                            added[drug_id] = qty
+                    elif qty <= 0:
+                        removed[drug_id] = item.quantity
+                    elif qty != item.quantity:
+                        changed[drug_id] = [item.quantity, qty]
+
+                changes = {}
+                if region.id != sale.region_id:
+                    changes["region"] = [sale.region_id, region.id]
+                if sale_date != sale.date:
+                    changes["date"] = [sale.date.isoformat(), sale_date.isoformat()]
+                for name, diff in (("added", added), ("removed", removed), ("changed", changed)):
+                    if diff:
+                        changes[name] = {str(drug_id): value for drug_id, value in diff.items()}
+
+                if not changes:
+                    messages.info(request, "Dəyişiklik edilmədi.")
+                    return redirect("sales:sale_list")
+
+                periods = {
+                    (sale.region_id, sale.date.year, sale.date.month),
+                    (region.id, sale_date.year, sale_date.month),
+                }
+                activity_dates = {sale.date, sale_date}
+
+                # Apply the diff without per-row signals, then refresh once
+                with deferred_sale_recalculation():
+                    if "region" in changes or "date" in changes:
+                        sale.region = region
+                        sale.date = sale_date
+                        sale.save(update_fields=["region", "date"])
+                    if removed:
+                        SaleItem.objects.filter(sale=sale, drug_id__in=list(removed)).delete()
+                    if changed:
+                        for drug_id, (_, qty) in changed.items():
+                            current_items[drug_id].quantity = qty
+                        SaleItem.objects.bulk_update(
+                            [current_items[drug_id] for drug_id in changed], ["quantity"]
                         )
+                    if added:
+                        SaleItem.objects.bulk_create([
+                            SaleItem(
+                                sale=sale,
+                                drug=drugs_map[drug_id],
+                                quantity=qty,
+                                unit_price=drugs_map[drug_id].qiymet,
+                            )
+                            for drug_id, qty in added.items()
+                        ])
+
+                sale.refresh_totals()
+                refresh_daily_activity(activity_dates)
+                SaleRevision.objects.create(
+                    sale=sale,
+                    changed_by=getattr(request.user, "username", "") or "",
+                    changes=changes,
+                )
+                recalculate_sale_periods(periods)
 
                 messages.success(request, "Satış uğurla yeniləndi!")
                 return redirect("sales:sale_list")
@@ -260,8 +385,8 @@ def edit_sale(request, sale_id):
             return redirect("sales:edit", sale_id=sale_id)
 
     # GET: show form with current sale data
-    regions = Region.objects.all().order_by("name")
-    drugs = Drug.objects.filter(is_active=True).order_by("ad")
+    regions = get_regions()
+    drugs = get_active_drugs()
     items_by_drug = {item.drug_id: item.quantity for item in sale.items.select_related("drug")}
 
     return render(request, "sales/edit.html", {
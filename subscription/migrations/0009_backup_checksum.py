@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscription', '0008_backup_backupsettings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backup',
+            name='checksum',
+            field=models.CharField(blank=True, max_length=64, verbose_name='SHA-256'),
+        ),
+    ]
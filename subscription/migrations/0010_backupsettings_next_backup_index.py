@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 04:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscription', '0009_backup_checksum'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backupsettings',
+            name='next_backup',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Növbəti Backup'),
+        ),
+    ]
@@ -377,7 +377,8 @@ class BackupSettings(models.Model):
     )
     
     last_backup = models.DateTimeField(null=True, blank=True, verbose_name='Son Backup')
-    next_backup = models.DateTimeField(null=True, blank=True, verbose_name='Növbəti Backup')
+    # run_scheduled_backups finds due companies through this index
+    next_backup = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name='Növbəti Backup')
     
     is_active = models.BooleanField(default=True, verbose_name='Aktiv')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -411,6 +412,7 @@ class Backup(models.Model):
     file_path = models.CharField(max_length=500, verbose_name='Fayl Yolu')
     file_name = models.CharField(max_length=200, verbose_name='Fayl Adı')
     file_size = models.BigIntegerField(default=0, verbose_name='Fayl Ölçüsü (bytes)')
+    checksum = models.CharField(max_length=64, blank=True, verbose_name='SHA-256')
     
     status = models.CharField(
         max_length=20,